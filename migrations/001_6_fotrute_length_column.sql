@@ -0,0 +1,52 @@
+-- Migration: Store fotrute segment length as a generated column
+-- Created: 2026-10-15
+--
+-- Adds fotrute.length_m = ST_Length(senterlinje), computed once at insert/update
+-- time (GENERATED ALWAYS ... STORED, PostgreSQL 12+). Diagnostics such as
+-- scripts/analyze_loops.py read per-segment lengths repeatedly; reading the
+-- stored column avoids recomputing ST_Length over every vertex on each query.
+--
+-- This should run BEFORE 002_build_topology.sql and 005_create_stable_views.sql
+-- so stiflyt.fotrute (SELECT *) picks up the column on a fresh import.
+
+DO $$
+DECLARE
+    schema_name TEXT;
+BEGIN
+    -- Find the schema with prefix 'turogfriluftsruter_'
+    SELECT nspname INTO schema_name
+    FROM pg_namespace
+    WHERE nspname LIKE 'turogfriluftsruter_%'
+      AND nspname NOT IN ('pg_catalog', 'information_schema', 'pg_toast', 'pg_temp_1', 'pg_toast_temp_1')
+    ORDER BY nspname DESC
+    LIMIT 1;
+
+    IF schema_name IS NULL THEN
+        RAISE WARNING 'Schema with prefix turogfriluftsruter_* not found. Skipping length_m column.';
+        RETURN;
+    END IF;
+
+    -- Verify fotrute table exists
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.tables
+        WHERE table_schema = schema_name AND table_name = 'fotrute'
+    ) THEN
+        RAISE WARNING 'Table %.fotrute does not exist. Skipping length_m column.', schema_name;
+        RETURN;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = schema_name AND table_name = 'fotrute' AND column_name = 'length_m'
+    ) THEN
+        RAISE NOTICE '  ⊙ %.fotrute.length_m already exists', schema_name;
+        RETURN;
+    END IF;
+
+    EXECUTE format('
+        ALTER TABLE %I.fotrute
+        ADD COLUMN length_m DOUBLE PRECISION
+        GENERATED ALWAYS AS (ST_Length(senterlinje)) STORED
+    ', schema_name);
+    RAISE NOTICE '  ✓ Added generated column %.fotrute.length_m', schema_name;
+END $$;
@@ -0,0 +1,73 @@
+-- Migration 022: denormalized node_status materialized view.
+--
+-- scripts/analyze_loops.py checks, per node, whether anchor_nodes membership
+-- agrees with the topology rule "anchor iff degree != 2". Answering that
+-- meant joining node_degree and anchor_nodes on every lookup. node_status
+-- materializes the join once per topology build so the check is a single
+-- index probe on one relation.
+--
+-- Migration 002 drops node_degree/anchor_nodes with CASCADE (which also drops
+-- this view) and 018 may rewrite them; running after both, this migration
+-- rebuilds node_status from scratch every time. Between imports it can be
+-- refreshed with:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY <schema>.node_status;
+-- or `python3 scripts/analyze_loops.py --refresh-node-status`. Idempotent.
+
+DO $$
+DECLARE
+    schema_name TEXT;
+    status_count BIGINT;
+BEGIN
+    -- Find the most recent turogfriluftsruter schema (same heuristic as 002).
+    SELECT nspname INTO schema_name
+    FROM pg_namespace
+    WHERE nspname LIKE 'turogfriluftsruter_%'
+      AND nspname NOT IN ('pg_catalog', 'information_schema', 'pg_toast', 'pg_temp_1', 'pg_toast_temp_1')
+    ORDER BY nspname DESC LIMIT 1;
+
+    IF schema_name IS NULL THEN
+        RAISE NOTICE 'No turogfriluftsruter_* schema found, skipping node_status.';
+        RETURN;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_matviews
+        WHERE schemaname = schema_name AND matviewname IN ('node_degree', 'anchor_nodes')
+        HAVING COUNT(*) = 2
+    ) THEN
+        RAISE NOTICE 'node_degree/anchor_nodes missing in %, skipping node_status.', schema_name;
+        RETURN;
+    END IF;
+
+    EXECUTE format('
+        DROP MATERIALIZED VIEW IF EXISTS %I.node_status;
+
+        CREATE MATERIALIZED VIEW %I.node_status AS
+        SELECT
+            nd.node_id,
+            nd.degree,
+            (an.node_id IS NOT NULL) AS is_anchor,
+            (nd.degree != 2) AS should_be_anchor
+        FROM %I.node_degree nd
+        LEFT JOIN (
+            SELECT DISTINCT node_id FROM %I.anchor_nodes
+        ) an ON an.node_id = nd.node_id;
+
+        -- Unique index: required for REFRESH ... CONCURRENTLY
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_node_status_node_id
+        ON %I.node_status USING BTREE (node_id);
+
+        ANALYZE %I.node_status;
+    ', schema_name, schema_name, schema_name, schema_name, schema_name, schema_name);
+
+    -- Default privileges only cover objects created by stiflyt_owner /
+    -- stiflyt_updater, so grant explicitly (as 010 does for anchor_nodes)
+    BEGIN
+        EXECUTE format('GRANT SELECT ON %I.node_status TO stiflyt_reader', schema_name);
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'Could not grant SELECT on %.node_status: %', schema_name, SQLERRM;
+    END;
+
+    EXECUTE format('SELECT COUNT(*) FROM %I.node_status', schema_name) INTO status_count;
+    RAISE NOTICE '  ✓ Created materialized view: %.node_status (% rows)', schema_name, status_count;
+END $$;
@@ -8,30 +8,70 @@ Investigates whether loops are due to:
 3. Processing errors in the walk algorithm
 
 Usage:
-    python3 scripts/analyze_loops.py [--schema SCHEMA_NAME] [--limit N]
+    python3 scripts/analyze_loops.py [--schema SCHEMA_NAME] [--limit N] [--cycles [--in-memory]]
+    python3 scripts/analyze_loops.py --nodes 109646,112298 [--nodes-file FILE]
+    python3 scripts/analyze_loops.py --explain [PLAN_FILE]
 """
 
+import io
+import json
 import os
 import sys
 import argparse
-from typing import Dict, List, Set, Tuple, Optional
+import atexit
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple, Optional
 
 try:
     import psycopg2
+    from psycopg2.errors import QueryCanceled
     from psycopg2.extras import RealDictCursor
     PSYCOPG_VERSION = 2
 except ImportError:
     try:
         import psycopg
+        from psycopg.errors import QueryCanceled
         from psycopg.rows import dict_row
         PSYCOPG_VERSION = 3
     except ImportError:
         print("Error: psycopg2 or psycopg3 required", file=sys.stderr)
         sys.exit(1)
 
+# Shared helpers live next to this script
+scripts_dir = Path(__file__).resolve().parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
 
-def get_db_connection(schema: Optional[str] = None):
-    """Create database connection from environment variables."""
+# NumPy is only needed for --in-memory cycle detection
+try:
+    import numpy as np
+    from pgcopy import parse_binary_copy
+except ImportError:
+    np = None
+
+# Numba is optional: without it the --in-memory DFS runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Pool bounds for callers that embed the analysis functions and check out
+# connections repeatedly (e.g. CI verification loops).
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 5
+
+# Bounds for the recursive-CTE cycle walk (find_cycles_sql)
+CYCLE_MAX_DEPTH = 32
+CYCLE_TIMEOUT_S = 60
+
+_pool = None
+
+
+def get_connection_params() -> Dict:
+    """Build connection parameters from environment variables."""
     host = os.getenv('PGHOST', 'localhost')
     if host == 'localhost' or host == '127.0.0.1':
         host = None
@@ -52,21 +92,133 @@ def get_db_connection(schema: Optional[str] = None):
     if password:
         db_params['password'] = password
 
+    if PSYCOPG_VERSION == 3:
+        # Prepare every statement on first use: the analysis re-runs the
+        # same few query shapes per node, so skipping parse/plan pays off.
+        # Server-side prepared statements don't survive PgBouncer
+        # transaction pooling (older than 1.21); set PGBOUNCER=1 there.
+        db_params['prepare_threshold'] = None if os.getenv('PGBOUNCER') else 0
+
+    return db_params
+
+
+def get_db_connection():
+    """Create database connection from environment variables.
+
+    No search_path is set: every query schema-qualifies its tables, which
+    keeps connections interchangeable behind a pool or PgBouncer.
+    """
+    db_params = get_connection_params()
+
     try:
         if PSYCOPG_VERSION == 2:
             conn = psycopg2.connect(**db_params)
         else:
             conn = psycopg.connect(**db_params)
-
-        if schema:
-            with conn.cursor() as cur:
-                cur.execute(f'SET search_path TO {schema}, public')
         return conn
     except Exception as e:
         print(f"Error connecting to database: {e}", file=sys.stderr)
         raise
 
 
+def get_connection_pool():
+    """Return the process-wide connection pool, creating it on first use.
+
+    With psycopg 3 this needs the separate psycopg-pool package.
+    """
+    global _pool
+    if _pool is None:
+        db_params = get_connection_params()
+        if PSYCOPG_VERSION == 2:
+            from psycopg2.pool import ThreadedConnectionPool
+            _pool = ThreadedConnectionPool(POOL_MIN_SIZE, POOL_MAX_SIZE, **db_params)
+        else:
+            from psycopg_pool import ConnectionPool
+            _pool = ConnectionPool(
+                kwargs=db_params,
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                open=True,
+            )
+        atexit.register(close_connection_pool)
+    return _pool
+
+
+def close_connection_pool():
+    """Close all pooled connections."""
+    global _pool
+    if _pool is None:
+        return
+    if PSYCOPG_VERSION == 2:
+        _pool.closeall()
+    else:
+        _pool.close()
+    _pool = None
+
+
+@contextmanager
+def pooled_connection():
+    """Check out a warm connection from the pool for the duration of a block.
+
+    Any open transaction is rolled back before the connection is returned.
+    """
+    pool = get_connection_pool()
+    if PSYCOPG_VERSION == 2:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            pool.putconn(conn)
+    else:
+        with pool.connection() as conn:
+            yield conn
+            conn.rollback()
+
+
+# Query plans collected by explain_query() while --explain is active
+_explain_plans: Optional[List[Dict]] = None
+
+
+def enable_explain():
+    """Start collecting EXPLAIN (ANALYZE, BUFFERS) plans for every query."""
+    global _explain_plans
+    _explain_plans = []
+
+
+def explain_query(conn, sql: str, params: Optional[Tuple] = None):
+    """Record the plan of a query about to run, if --explain is active.
+
+    EXPLAIN ANALYZE executes the statement, so each explained query runs
+    twice. It uses its own short-lived cursor so it also works ahead of
+    named cursors and pipelined batches.
+    """
+    if _explain_plans is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]
+    _explain_plans.append({
+        'query': ' '.join(sql.split()),
+        'params': list(params) if params else [],
+        'plan': plan,
+    })
+    top = plan['Plan']
+    print(f"EXPLAIN: {top['Node Type']} (rows={top.get('Actual Rows')}, "
+          f"time={plan.get('Execution Time', 0):.2f}ms)", file=sys.stderr)
+
+
+def write_explain_plans(path: Path):
+    """Persist collected plans as JSON so runs can be diffed."""
+    if _explain_plans is None:
+        return
+    path.write_text(json.dumps(_explain_plans, indent=2, sort_keys=True, default=str) + '\n')
+    print(f"✓ Wrote {len(_explain_plans)} query plans to {path}", file=sys.stderr)
+
+
 def find_schema(conn) -> Optional[str]:
     """Find turrutebasen schema dynamically."""
     with conn.cursor() as cur:
@@ -82,138 +234,696 @@ def find_schema(conn) -> Optional[str]:
         return result[0] if result else None
 
 
-def analyze_loop_node(conn, schema: str, node_id: int) -> Dict:
-    """Analyze a specific node that caused a loop."""
+def schema_exists(conn, schema: str) -> bool:
+    """Check that the given schema exists."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s", (schema,))
+        return cur.fetchone() is not None
+
+
+# Node lookup indexes created by migration 002 (build_topology)
+ANALYSIS_INDEXES = ('idx_fotrute_source_node', 'idx_fotrute_target_node', 'idx_node_degree_node_id')
+
+
+def check_indexes(conn, schema: str) -> List[str]:
+    """Return the ANALYSIS_INDEXES that are missing or invalid in schema.
+
+    Read-only: the indexes belong to migration 002. An index left INVALID
+    by a failed concurrent build is reported like a missing one.
+    """
     with conn.cursor() as cur:
-        # Get node degree
-        cur.execute(f"""
-            SELECT degree
-            FROM {schema}.node_degree
-            WHERE node_id = %s
-        """, (node_id,))
-        degree_row = cur.fetchone()
-        degree = degree_row[0] if degree_row else None
-
-        # Check if it's an anchor node
-        cur.execute(f"""
-            SELECT 1 FROM {schema}.anchor_nodes
-            WHERE node_id = %s
-        """, (node_id,))
-        is_anchor = cur.fetchone() is not None
-
-        # Get all segments connected to this node
-        cur.execute(f"""
+        cur.execute("""
+            SELECT name
+            FROM unnest(%s::text[]) WITH ORDINALITY AS wanted(name, pos)
+            LEFT JOIN pg_index i
+                ON i.indexrelid = to_regclass(quote_ident(%s) || '.' || quote_ident(wanted.name))
+            WHERE i.indisvalid IS NOT TRUE
+            ORDER BY pos
+        """, (list(ANALYSIS_INDEXES), schema))
+        return [row[0] for row in cur.fetchall()]
+
+
+# Schemas checked by has_node_status(); the view only appears via migration 022
+_node_status_exists: Dict[str, bool] = {}
+
+
+def has_node_status(conn, schema: str) -> bool:
+    """Return True if the node_status materialized view exists (cached per schema)."""
+    if schema not in _node_status_exists:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(quote_ident(%s) || '.node_status') IS NOT NULL", (schema,))
+            _node_status_exists[schema] = cur.fetchone()[0]
+    return _node_status_exists[schema]
+
+
+@lru_cache(maxsize=256)
+def _sql_node_status(schema: str, materialized: bool = True) -> str:
+    """Relation with node_id, degree, is_anchor and should_be_anchor.
+
+    Without migration 022 the same columns are derived from node_degree and
+    anchor_nodes, as before the view existed.
+    """
+    if materialized:
+        return f"{schema}.node_status"
+    return f"""(
             SELECT
-                objid as segment_id,
-                source_node,
-                target_node,
-                ST_Length(senterlinje) as length_m
+                nd.node_id,
+                nd.degree,
+                EXISTS (
+                    SELECT 1 FROM {schema}.anchor_nodes an
+                    WHERE an.node_id = nd.node_id
+                ) AS is_anchor,
+                nd.degree <> 2 AS should_be_anchor
+            FROM {schema}.node_degree nd
+        )"""
+
+
+# Schemas checked by has_length_column(); the column comes from migration 001_6
+_length_column_exists: Dict[str, bool] = {}
+
+
+def has_length_column(conn, schema: str) -> bool:
+    """Return True if fotrute has the stored length_m column (cached per schema)."""
+    if schema not in _length_column_exists:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_attribute
+                    WHERE attrelid = to_regclass(quote_ident(%s) || '.fotrute')
+                      AND attname = 'length_m'
+                      AND NOT attisdropped
+                )
+            """, (schema,))
+            _length_column_exists[schema] = cur.fetchone()[0]
+    return _length_column_exists[schema]
+
+
+def _sql_length(stored: bool = True) -> str:
+    """fotrute segment length: the length_m column, or computed without it."""
+    return 'length_m' if stored else 'ST_Length(senterlinje)'
+
+
+@lru_cache(maxsize=256)
+def _sql_loop_node(schema: str, materialized: bool = True, stored_length: bool = True) -> str:
+    """Single-node degree/anchor/geometry-presence/segment lookup."""
+    return f"""
+        SELECT
+            ns.degree,
+            COALESCE(ns.is_anchor, false) AS is_anchor,
+            COALESCE(ns.should_be_anchor, false) AS should_be_anchor,
+            n.geom IS NOT NULL AS has_geometry,
+            f.segment_id,
+            f.source_node,
+            f.target_node,
+            f.length_m
+        FROM (VALUES (%s::bigint)) AS v(id)
+        LEFT JOIN {_sql_node_status(schema, materialized)} ns ON ns.node_id = v.id
+        LEFT JOIN {schema}.nodes n ON n.id = v.id
+        -- Two index probes instead of an OR across columns; the second
+        -- branch skips self-loops already returned by the first
+        LEFT JOIN LATERAL (
+            SELECT objid AS segment_id, source_node, target_node, {_sql_length(stored_length)} AS length_m
+            FROM {schema}.fotrute
+            WHERE source_node = v.id
+            UNION ALL
+            SELECT objid, source_node, target_node, {_sql_length(stored_length)}
             FROM {schema}.fotrute
-            WHERE source_node = %s OR target_node = %s
-            ORDER BY objid
-        """, (node_id, node_id))
-        segments = cur.fetchall()
-
-        # Get node geometry
-        cur.execute(f"""
-            SELECT geom
-            FROM {schema}.nodes
-            WHERE id = %s
-        """, (node_id,))
-        geom_row = cur.fetchone()
-        geom = geom_row[0] if geom_row else None
-
-        return {
+            WHERE target_node = v.id
+              AND source_node IS DISTINCT FROM v.id
+        ) f ON true
+        ORDER BY f.segment_id
+    """
+
+
+def analyze_loop_node(conn, schema: str, node_id: int) -> Dict:
+    """Analyze a specific node that caused a loop.
+
+    Degree, anchor status, node geometry and incident segments are fetched
+    in a single query (one row per connected segment) instead of four
+    separate round trips.
+    """
+    sql = _sql_loop_node(schema, has_node_status(conn, schema), has_length_column(conn, schema))
+    explain_query(conn, sql, (node_id,))
+    with conn.cursor() as cur:
+        cur.execute(sql, (node_id,))
+        rows = cur.fetchall()
+
+    degree, is_anchor, should_be_anchor, has_geometry = rows[0][:4]
+    # LEFT JOIN yields a single all-NULL segment row when nothing is connected
+    segments = [row[4:] for row in rows if row[4] is not None]
+
+    return {
+        'node_id': node_id,
+        'degree': degree,
+        'is_anchor': is_anchor,
+        'should_be_anchor': should_be_anchor,
+        'segment_count': len(segments),
+        'segments': segments,
+        'has_geometry': has_geometry
+    }
+
+
+@lru_cache(maxsize=256)
+def _sql_loop_nodes(schema: str, materialized: bool = True) -> str:
+    """Batched degree/anchor/geometry lookup for analyze_loop_nodes()."""
+    return f"""
+        SELECT
+            v.id,
+            ns.degree,
+            COALESCE(ns.is_anchor, false) AS is_anchor,
+            COALESCE(ns.should_be_anchor, false) AS should_be_anchor,
+            n.geom IS NOT NULL AS has_geometry
+        FROM unnest(%s::bigint[]) AS v(id)
+        LEFT JOIN {_sql_node_status(schema, materialized)} ns ON ns.node_id = v.id
+        LEFT JOIN {schema}.nodes n ON n.id = v.id
+    """
+
+
+@lru_cache(maxsize=256)
+def _sql_loop_node_segments(schema: str, stored_length: bool = True) -> str:
+    """Batched incident-segment lookup for analyze_loop_nodes().
+
+    A single scan (BitmapOr over the two node indexes) returns each segment
+    once, even when both of its endpoints are in the batch; avoids the
+    per-row ``<> ALL(array)`` de-duplication a UNION ALL would need.
+    """
+    return f"""
+        SELECT
+            objid as segment_id,
+            source_node,
+            target_node,
+            {_sql_length(stored_length)} AS length_m
+        FROM {schema}.fotrute
+        WHERE source_node = ANY(%s::bigint[])
+           OR target_node = ANY(%s::bigint[])
+        ORDER BY objid
+    """
+
+
+def analyze_loop_nodes(conn, schema: str, node_ids: List[int]) -> Dict[int, Dict]:
+    """Analyze many loop nodes at once.
+
+    Uses ``= ANY(%s)`` so the whole batch costs two queries regardless of
+    how many nodes are requested; with psycopg3 they are pipelined.
+    Returns {node_id: summary} with the same summary shape as
+    analyze_loop_node().
+    """
+    if not node_ids:
+        return {}
+
+    node_sql = _sql_loop_nodes(schema, has_node_status(conn, schema))
+    segment_sql = _sql_loop_node_segments(schema, has_length_column(conn, schema))
+
+    explain_query(conn, node_sql, (node_ids,))
+    explain_query(conn, segment_sql, (node_ids, node_ids))
+
+    if PSYCOPG_VERSION == 3:
+        # Pipeline mode sends both queries before waiting for either
+        # result, so the batch costs one network round trip. A pipelined
+        # result belongs to the cursor that issued it, hence two cursors.
+        with conn.cursor() as node_cur, conn.cursor() as seg_cur:
+            with conn.pipeline():
+                node_cur.execute(node_sql, (node_ids,))
+                seg_cur.execute(segment_sql, (node_ids, node_ids))
+            node_rows = node_cur.fetchall()
+            segment_rows = seg_cur.fetchall()
+    else:
+        with conn.cursor() as cur:
+            cur.execute(node_sql, (node_ids,))
+            node_rows = cur.fetchall()
+            cur.execute(segment_sql, (node_ids, node_ids))
+            segment_rows = cur.fetchall()
+
+    # Bucket each shared segment under every requested endpoint it touches
+    segments_by_node: Dict[int, List[Tuple]] = {node_id: [] for node_id in node_ids}
+    for seg in segment_rows:
+        for node_id in {seg[1], seg[2]}:
+            if node_id in segments_by_node:
+                segments_by_node[node_id].append(seg)
+
+    results: Dict[int, Dict] = {}
+    for node_id, degree, is_anchor, should_be_anchor, has_geometry in node_rows:
+        segments = segments_by_node[node_id]
+        results[node_id] = {
             'node_id': node_id,
             'degree': degree,
             'is_anchor': is_anchor,
-            'should_be_anchor': degree is not None and degree != 2,
+            'should_be_anchor': should_be_anchor,
             'segment_count': len(segments),
             'segments': segments,
-            'has_geometry': geom is not None
+            'has_geometry': has_geometry
         }
+    return results
+
+
+@lru_cache(maxsize=256)
+def _sql_duplicate_segments(schema: str) -> str:
+    """Segments used by more than one link."""
+    return f"""
+        SELECT
+            ls.segment_id,
+            f.source_node,
+            f.target_node,
+            COUNT(*) as usage_count
+        FROM {schema}.link_segments ls
+        JOIN {schema}.fotrute f ON ls.segment_id = f.objid
+        GROUP BY ls.segment_id, f.source_node, f.target_node
+        HAVING COUNT(*) > 1
+        LIMIT %s
+    """
+
+
+def find_loops_in_data(conn, schema: str, limit: int = 10) -> Iterator[Tuple]:
+    """Find actual circular paths in the data.
+
+    Rows are streamed through a server-side (named) cursor, so the client
+    never holds the whole result set in memory.
+    """
+    explain_query(conn, _sql_duplicate_segments(schema), (limit,))
+    with conn.cursor(name='analyze_loops_duplicates') as cur:
+        cur.itersize = 1000
+        # Find nodes that appear multiple times in link_segments
+        # This indicates we might have processed them incorrectly
+        cur.execute(_sql_duplicate_segments(schema), (limit,))
+        for row in cur:
+            yield row
+
 
+def refresh_node_status(conn, schema: str):
+    """Refresh the node_status materialized view after a topology change.
 
-def find_loops_in_data(conn, schema: str, limit: int = 10) -> List[Dict]:
-    """Find actual circular paths in the data."""
+    CONCURRENTLY keeps the view readable during the refresh; it relies on
+    the unique index idx_node_status_node_id created by migration 022.
+    """
     with conn.cursor() as cur:
-        # Find nodes that appear multiple times in link_segments
-        # This indicates we might have processed them incorrectly
-        cur.execute(f"""
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {schema}.node_status")
+    conn.commit()
+
+
+@lru_cache(maxsize=256)
+def _sql_cycles(schema: str) -> str:
+    """Recursive-CTE cycle walk over fotrute."""
+    return f"""
+        WITH RECURSIVE walk(start_node, start_segment, node, path, segments, is_cycle) AS (
             SELECT
-                ls.segment_id,
                 f.source_node,
+                f.objid,
                 f.target_node,
-                COUNT(*) as usage_count
-            FROM {schema}.link_segments ls
-            JOIN {schema}.fotrute f ON ls.segment_id = f.objid
-            GROUP BY ls.segment_id, f.source_node, f.target_node
-            HAVING COUNT(*) > 1
-            LIMIT %s
-        """, (limit,))
-        return cur.fetchall()
+                ARRAY[f.source_node, f.target_node],
+                ARRAY[f.objid],
+                f.source_node = f.target_node
+            FROM {schema}.fotrute f
+            WHERE f.source_node IS NOT NULL
+              AND f.target_node IS NOT NULL
+            UNION ALL
+            SELECT
+                w.start_node,
+                w.start_segment,
+                nxt.node,
+                w.path || nxt.node,
+                w.segments || f.objid,
+                nxt.node = w.start_node
+            FROM walk w
+            JOIN {schema}.fotrute f
+                ON (f.source_node = w.node OR f.target_node = w.node)
+               -- Never walk a segment twice
+               AND NOT f.objid = ANY(w.segments)
+               -- The start segment is the lowest objid on the cycle
+               AND f.objid > w.start_segment
+            CROSS JOIN LATERAL (
+                SELECT CASE WHEN f.source_node = w.node
+                            THEN f.target_node
+                            ELSE f.source_node END AS node
+            ) nxt
+            WHERE NOT w.is_cycle
+              AND array_length(w.path, 1) < %s
+              -- Simple paths only: the start node is the one node that
+              -- may be reached again, and reaching it closes the cycle
+              AND (nxt.node = w.start_node OR NOT nxt.node = ANY(w.path))
+        )
+        SELECT start_node, path, segments
+        FROM walk
+        WHERE is_cycle
+        ORDER BY start_segment
+        LIMIT %s
+    """
+
+
+def find_cycles_sql(conn, schema: str, limit: int = 10, max_depth: int = CYCLE_MAX_DEPTH,
+                    timeout_s: int = CYCLE_TIMEOUT_S) -> List[Tuple]:
+    """Find circular paths in fotrute with a recursive CTE.
+
+    The segment graph is walked undirected inside PostgreSQL along simple
+    paths: a walk starts with a segment (source to target), only continues
+    over segments with a higher objid, and never revisits a node other than
+    its start node. Reaching the start node again closes a cycle, so every
+    cycle is reported exactly once, from its lowest segment and with a
+    start_node on the cycle. Walks longer than max_depth nodes are abandoned
+    so the recursion stays bounded on densely connected components. Each
+    step is an index probe on idx_fotrute_source_node /
+    idx_fotrute_target_node (migration 002).
+
+    The walk runs under a transaction-local statement_timeout of timeout_s
+    seconds, so one run cannot pin the server; when it fires, QueryCanceled
+    is raised and the caller must roll back.
+
+    Returns rows of (start_node, node_path, segment_path).
+    """
+    with conn.cursor() as cur:
+        # set_config(..., true) is SET LOCAL, but accepts a bound value
+        cur.execute("SELECT current_setting('statement_timeout'), set_config('statement_timeout', %s, true)",
+                    (f"{timeout_s}s",))
+        previous_timeout = cur.fetchone()[0]
+        explain_query(conn, _sql_cycles(schema), (max_depth, limit))
+        cur.execute(_sql_cycles(schema), (max_depth, limit))
+        cycles = cur.fetchall()
+        cur.execute("SELECT set_config('statement_timeout', %s, true)", (previous_timeout,))
+    return cycles
+
+
+def load_segment_graph(conn, schema: str) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Load the fotrute graph as three parallel int64 arrays.
+
+    Streams a binary COPY straight into NumPy, skipping text parsing on both
+    ends. Returns (segment_ids, source_nodes, target_nodes); segments with a
+    NULL endpoint are skipped.
+    """
+    copy_sql = f"""
+        COPY (
+            SELECT objid::int8, source_node::int8, target_node::int8
+            FROM {schema}.fotrute
+            WHERE objid IS NOT NULL
+              AND source_node IS NOT NULL
+              AND target_node IS NOT NULL
+        ) TO STDOUT WITH (FORMAT BINARY)
+    """
+    buf = io.BytesIO()
+    with conn.cursor() as cur:
+        if PSYCOPG_VERSION == 2:
+            cur.copy_expert(copy_sql, buf)
+        else:
+            with cur.copy(copy_sql) as copy:
+                for chunk in copy:
+                    buf.write(chunk)
+    segment_ids, sources, targets = parse_binary_copy(buf.getvalue(), ['>i8', '>i8', '>i8'])
+    return segment_ids, sources, targets
+
+
+def build_adjacency_csr(
+    sources: "np.ndarray", targets: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Build an undirected CSR adjacency over dense node indexes.
+
+    Returns (node_ids, indptr, neighbors, edge_index): the neighbours of
+    dense node i are neighbors[indptr[i]:indptr[i + 1]], reached over the
+    segment at position edge_index[...] in the input arrays. node_ids maps
+    dense indexes back to node IDs.
+    """
+    edge_count = len(sources)
+    node_ids, dense = np.unique(np.concatenate([sources, targets]), return_inverse=True)
+    src, tgt = dense[:edge_count], dense[edge_count:]
+    edges = np.arange(edge_count, dtype=np.int64)
+    # Both directions per segment, but self-loops only once
+    reverse = src != tgt
+    heads = np.concatenate([src, tgt[reverse]])
+    tails = np.concatenate([tgt, src[reverse]])
+    edges = np.concatenate([edges, edges[reverse]])
+
+    order = np.argsort(heads, kind='stable')
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=len(node_ids)), out=indptr[1:])
+    return node_ids, indptr, tails[order], edges[order]
+
+
+# Node colours of the in-memory DFS
+WHITE, GRAY, BLACK = 0, 1, 2
+
+
+def _dfs_back_edges(indptr, neighbors, edge_index, color, parent, parent_edge, next_pos, stack,
+                    max_back):
+    """Iterative DFS over the CSR graph that collects back edges.
+
+    Written for numba.njit like build_links._walk_links(): arrays and ints
+    in, arrays out. Without Numba it runs as plain Python on lists. color
+    (all WHITE), parent and parent_edge (all -1), next_pos (indptr[:-1]) and
+    stack (one slot per node) are updated in place; parent/parent_edge hold
+    the DFS tree afterwards. Stops after max_back back edges.
+
+    Returns rows of (u, v, edge): the segment edge from u closes a cycle at
+    v, an ancestor of u that is still on the stack.
+    """
+    back = np.empty((max_back, 3), dtype=np.int64)
+    n_back = 0
+    for root in range(len(color)):
+        if color[root] != WHITE:
+            continue
+        color[root] = GRAY
+        stack[0] = root
+        top = 1
+        while top > 0:
+            u = stack[top - 1]
+            pos = next_pos[u]
+            if pos == indptr[u + 1]:
+                color[u] = BLACK
+                top -= 1
+                continue
+            next_pos[u] = pos + 1
+
+            v = neighbors[pos]
+            edge = edge_index[pos]
+            if edge == parent_edge[u]:
+                continue
+            if color[v] == WHITE:
+                color[v] = GRAY
+                parent[v] = u
+                parent_edge[v] = edge
+                stack[top] = v
+                top += 1
+            elif color[v] == GRAY:
+                back[n_back, 0] = u
+                back[n_back, 1] = v
+                back[n_back, 2] = edge
+                n_back += 1
+                if n_back == max_back:
+                    return back
+    return back[:n_back]
+
+
+def _tree_path(parent, parent_edge, u, v):
+    """Node and segment indexes of the DFS tree path from ancestor v down to u.
+
+    Written for numba.njit like _dfs_back_edges().
+    """
+    length = 0
+    w = u
+    while w != v:
+        w = parent[w]
+        length += 1
+    nodes = np.empty(length + 1, dtype=np.int64)
+    edges = np.empty(length, dtype=np.int64)
+    w = u
+    for i in range(length, 0, -1):
+        nodes[i] = w
+        edges[i - 1] = parent_edge[w]
+        w = parent[w]
+    nodes[0] = v
+    return nodes, edges
+
+
+_dfs_back_edges_jit = njit(cache=True)(_dfs_back_edges) if njit is not None else None
+_tree_path_jit = njit(cache=True)(_tree_path) if njit is not None else None
+
+
+def find_cycles_in_memory(
+    segment_ids: "np.ndarray",
+    sources: "np.ndarray",
+    targets: "np.ndarray",
+    limit: int = 10,
+) -> List[Tuple]:
+    """Find circular paths with an iterative DFS over an in-memory graph.
+
+    Suitable when fotrute fits in RAM (three int64 arrays, 24 bytes per
+    segment). Uses white/gray/black colouring: reaching a gray node (one on
+    the current DFS stack) over any segment other than the one we arrived
+    by closes a cycle. Each cycle is reported once, as
+    (start_node, node_path, segment_path) like find_cycles_sql(). The DFS
+    is compiled with Numba when installed (the jit extra).
+    """
+    node_ids, indptr, neighbors, edge_index = build_adjacency_csr(sources, targets)
+    max_back = min(limit, len(segment_ids))
+    if max_back <= 0:
+        return []
+
+    node_count = len(node_ids)
+    dfs_args = [
+        indptr,
+        neighbors,
+        edge_index,
+        np.full(node_count, WHITE, dtype=np.int8),
+        np.full(node_count, -1, dtype=np.int64),
+        np.full(node_count, -1, dtype=np.int64),
+        indptr[:-1].copy(),
+        np.empty(node_count, dtype=np.int64),
+    ]
+    if _dfs_back_edges_jit is not None:
+        back = _dfs_back_edges_jit(*dfs_args, max_back)
+        tree_path = _tree_path_jit
+    else:
+        # Plain lists index much faster than NumPy scalars in the Python loop
+        dfs_args = [arr.tolist() for arr in dfs_args]
+        back = _dfs_back_edges(*dfs_args, max_back)
+        tree_path = _tree_path
+    parent, parent_edge = dfs_args[4], dfs_args[5]
+
+    cycles: List[Tuple] = []
+    for u, v, edge in back.tolist():
+        # Tree edges from v down to u, then the back edge closes the loop
+        nodes, edges = tree_path(parent, parent_edge, u, v)
+        start_node = int(node_ids[v])
+        cycles.append((
+            start_node,
+            node_ids[nodes].tolist() + [start_node],
+            segment_ids[edges].tolist() + [int(segment_ids[edge])],
+        ))
+    return cycles
+
+
+@lru_cache(maxsize=256)
+def _sql_degree_inconsistencies(schema: str, materialized: bool = True) -> str:
+    """Nodes whose anchor status disagrees with their degree."""
+    return f"""
+        SELECT
+            ns.node_id,
+            ns.degree,
+            ns.is_anchor,
+            ns.should_be_anchor
+        FROM {_sql_node_status(schema, materialized)} ns
+        WHERE ns.node_id = ANY(%s::bigint[])
+          AND ns.is_anchor <> ns.should_be_anchor
+        ORDER BY ns.node_id
+    """
 
 
 def check_node_degree_consistency(conn, schema: str, node_ids: List[int]) -> Dict:
-    """Check if node degrees are consistent with anchor_nodes."""
+    """Check if node degrees are consistent with anchor_nodes.
+
+    Reads the node_status materialized view (migration 022) when present,
+    so PostgreSQL compares degree and anchor status itself and only returns
+    the inconsistent nodes.
+    """
     if not node_ids:
         return {}
 
+    sql = _sql_degree_inconsistencies(schema, has_node_status(conn, schema))
+    explain_query(conn, sql, (node_ids,))
     with conn.cursor() as cur:
-        # Get degrees for these nodes
-        placeholders = ','.join(['%s'] * len(node_ids))
-        cur.execute(f"""
-            SELECT
-                node_id,
-                degree
-            FROM {schema}.node_degree
-            WHERE node_id IN ({placeholders})
-        """, node_ids)
-        degrees = {row[0]: row[1] for row in cur.fetchall()}
-
-        # Check which are anchors
-        cur.execute(f"""
-            SELECT node_id
-            FROM {schema}.anchor_nodes
-            WHERE node_id IN ({placeholders})
-        """, node_ids)
-        anchors = {row[0] for row in cur.fetchall()}
-
-        # Find inconsistencies
-        inconsistencies = []
-        for node_id in node_ids:
-            degree = degrees.get(node_id)
-            is_anchor = node_id in anchors
-            should_be_anchor = degree is not None and degree != 2
-
-            if is_anchor != should_be_anchor:
-                inconsistencies.append({
-                    'node_id': node_id,
-                    'degree': degree,
-                    'is_anchor': is_anchor,
-                    'should_be_anchor': should_be_anchor
-                })
-
-        return {
-            'total_checked': len(node_ids),
-            'inconsistencies': inconsistencies,
-            'degrees': degrees,
-            'anchors': anchors
-        }
+        cur.execute(sql, (node_ids,))
+        inconsistencies = [
+            {
+                'node_id': row[0],
+                'degree': row[1],
+                'is_anchor': row[2],
+                'should_be_anchor': row[3]
+            }
+            for row in cur.fetchall()
+        ]
+
+    return {
+        'total_checked': len(node_ids),
+        'inconsistencies': inconsistencies
+    }
+
+
+def parse_node_list(value: str) -> List[int]:
+    """Parse a comma-separated list of node IDs (argparse type)."""
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid node ID list: {value!r}")
+
+
+def read_node_file(path: Path) -> List[int]:
+    """Read node IDs from a file, separated by commas and/or whitespace."""
+    return [int(part) for part in path.read_text().replace(',', ' ').split()]
+
+
+def write_lines(lines: List[str]):
+    """Write lines to stdout in a single call instead of one print() per row."""
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+def format_node_result(result: Dict) -> List[str]:
+    """Format the analysis of a single node as output lines."""
+    lines = [
+        f"Node ID: {result['node_id']}",
+        f"Degree: {result['degree']}",
+        f"Is anchor: {result['is_anchor']}",
+        f"Should be anchor: {result['should_be_anchor']}",
+        f"Connected segments: {result['segment_count']}",
+        "\nSegments:",
+    ]
+    lines.extend(
+        f"  Segment {seg[0]}: {seg[1]} → {seg[2]} (length: {seg[3]:.2f}m)"
+        for seg in result['segments']
+    )
+
+    if result['is_anchor'] != result['should_be_anchor']:
+        lines.append(f"\n⚠ INCONSISTENCY: Node is {'anchor' if result['is_anchor'] else 'not anchor'} but degree={result['degree']} (should be {'anchor' if result['should_be_anchor'] else 'not anchor'})")
+    return lines
+
+
+def print_node_result(result: Dict):
+    """Print the analysis of a single node."""
+    write_lines(format_node_result(result))
 
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze loop errors from link building')
     parser.add_argument('--schema', type=str, help='Schema name (default: auto-detect)')
     parser.add_argument('--limit', type=int, default=20, help='Number of loop nodes to analyze')
-    parser.add_argument('--node', type=int, help='Analyze specific node ID')
+    parser.add_argument('--node', type=int, help='Analyze specific node ID (shorthand for --nodes ID)')
+    parser.add_argument('--nodes', type=parse_node_list, default=[],
+                        help='Comma-separated node IDs to analyze in one batch')
+    parser.add_argument('--nodes-file', type=Path,
+                        help='File with node IDs (comma/whitespace separated) to analyze in one batch')
+    parser.add_argument('--max-depth', type=int, default=CYCLE_MAX_DEPTH,
+                        help=f'Maximum path length (nodes) for the SQL cycle walk (default: {CYCLE_MAX_DEPTH})')
+    parser.add_argument('--cycle-timeout', type=int, default=CYCLE_TIMEOUT_S, metavar='SECONDS',
+                        help=f'statement_timeout for the SQL cycle walk (default: {CYCLE_TIMEOUT_S})')
+    parser.add_argument('--cycles', action='store_true',
+                        help='Also search fotrute for circular paths (recursive CTE; can be slow on large schemas)')
+    parser.add_argument('--in-memory', action='store_true',
+                        help='With --cycles: detect cycles with an in-memory DFS (requires numpy) instead of a recursive CTE')
+    parser.add_argument('--refresh-node-status', action='store_true',
+                        help='Refresh the node_status materialized view before analyzing')
+    parser.add_argument('--explain', type=Path, nargs='?', const=Path('analyze_loops_plans.json'),
+                        metavar='PLAN_FILE',
+                        help='Run EXPLAIN (ANALYZE, BUFFERS) before each query and save the plans '
+                             '(default: analyze_loops_plans.json)')
     args = parser.parse_args()
 
-    conn = get_db_connection()
+    if args.in_memory and np is None:
+        print("Error: --in-memory requires numpy (pip install numpy)", file=sys.stderr)
+        sys.exit(1)
 
-    try:
+    node_ids = list(args.nodes)
+    if args.nodes_file:
+        node_ids.extend(read_node_file(args.nodes_file))
+    if args.node:
+        node_ids.append(args.node)
+    node_ids = list(dict.fromkeys(node_ids))
+
+    if args.explain:
+        enable_explain()
+
+    # One-shot CLI: a single direct connection; the pool is for embedders
+    with closing(get_db_connection()) as conn:
         if args.schema:
             schema = args.schema
+            if not schema_exists(conn, schema):
+                print(f"Error: Schema {schema} does not exist.", file=sys.stderr)
+                sys.exit(1)
         else:
             schema = find_schema(conn)
             if not schema:
@@ -222,44 +932,87 @@ def main():
 
         print(f"Analyzing loops in schema: {schema}\n")
 
-        if args.node:
-            # Analyze specific node
-            print(f"Analyzing node {args.node}:")
-            print("="*60)
-            result = analyze_loop_node(conn, schema, args.node)
-            print(f"Node ID: {result['node_id']}")
-            print(f"Degree: {result['degree']}")
-            print(f"Is anchor: {result['is_anchor']}")
-            print(f"Should be anchor: {result['should_be_anchor']}")
-            print(f"Connected segments: {result['segment_count']}")
-            print(f"\nSegments:")
-            for seg in result['segments']:
-                print(f"  Segment {seg[0]}: {seg[1]} → {seg[2]} (length: {seg[3]:.2f}m)")
-
-            if result['is_anchor'] != result['should_be_anchor']:
-                print(f"\n⚠ INCONSISTENCY: Node is {'anchor' if result['is_anchor'] else 'not anchor'} but degree={result['degree']} (should be {'anchor' if result['should_be_anchor'] else 'not anchor'})")
+        missing_indexes = check_indexes(conn, schema)
+        if missing_indexes:
+            print(f"⚠ Missing or invalid indexes in {schema}: {', '.join(missing_indexes)}", file=sys.stderr)
+            print("  Queries will be slow; run migrations (make run-migrations)\n", file=sys.stderr)
+
+        if not has_node_status(conn, schema):
+            if args.refresh_node_status:
+                print(f"Error: {schema}.node_status does not exist; run migrations (make run-migrations)", file=sys.stderr)
+                sys.exit(1)
+            print(f"⚠ {schema}.node_status not found (migration 022); using node_degree/anchor_nodes instead\n",
+                  file=sys.stderr)
+        elif args.refresh_node_status:
+            refresh_node_status(conn, schema)
+            print(f"✓ Refreshed {schema}.node_status\n")
+
+        if not has_length_column(conn, schema):
+            print(f"⚠ {schema}.fotrute.length_m not found (migration 001_6); computing ST_Length(senterlinje)",
+                  file=sys.stderr)
+            print("  Run migrations (make run-migrations) to store it\n", file=sys.stderr)
+
+        if node_ids:
+            # Analyze all requested nodes in one batch
+            results = analyze_loop_nodes(conn, schema, node_ids)
+            lines = []
+            for i, node_id in enumerate(node_ids):
+                if i:
+                    lines.append("")
+                lines.append(f"Analyzing node {node_id}:")
+                lines.append("="*60)
+                lines.extend(format_node_result(results[node_id]))
+            write_lines(lines)
         else:
             # Get loop nodes from recent run (if available)
             # For now, we'll check a sample of nodes that might cause loops
             print("Checking for duplicate segment usage (indicates processing issues):")
             print("="*60)
-            duplicates = find_loops_in_data(conn, schema, limit=args.limit)
-            if duplicates:
-                print(f"Found {len(duplicates)} segments used multiple times:")
-                for dup in duplicates:
-                    print(f"  Segment {dup[0]}: used {dup[3]} times (connects {dup[1]} → {dup[2]})")
+            lines = [
+                f"  Segment {dup[0]}: used {dup[3]} times (connects {dup[1]} → {dup[2]})"
+                for dup in find_loops_in_data(conn, schema, limit=args.limit)
+            ]
+            duplicate_count = len(lines)
+            write_lines(lines)
+            if duplicate_count:
+                print(f"Found {duplicate_count} segments used multiple times.")
             else:
                 print("No duplicate segment usage found.")
 
+            if args.cycles:
+                print("\nChecking for circular paths in fotrute:")
+                print("="*60)
+                if args.in_memory:
+                    segment_ids, sources, targets = load_segment_graph(conn, schema)
+                    cycles = find_cycles_in_memory(segment_ids, sources, targets, limit=args.limit)
+                else:
+                    try:
+                        cycles = find_cycles_sql(conn, schema, limit=args.limit, max_depth=args.max_depth,
+                                                 timeout_s=args.cycle_timeout)
+                    except QueryCanceled:
+                        conn.rollback()
+                        print(f"✗ Cycle search exceeded {args.cycle_timeout}s; "
+                              f"try a lower --max-depth (now {args.max_depth}) or --in-memory", file=sys.stderr)
+                        cycles = None
+                if cycles:
+                    print(f"Found {len(cycles)} circular paths:")
+                    write_lines([
+                        f"  From node {start_node}: {' → '.join(str(n) for n in path)} (segments: {segments})"
+                        for start_node, path, segments in cycles
+                    ])
+                elif cycles is not None:
+                    print("No circular paths found.")
+
             print("\n" + "="*60)
-            print("To analyze a specific loop node, use:")
-            print(f"  python3 scripts/analyze_loops.py --node <node_id>")
+            print("To analyze specific loop nodes, use:")
+            print(f"  python3 scripts/analyze_loops.py --nodes <node_id>[,<node_id>...]")
+            if not args.cycles:
+                print("To search fotrute for circular paths, add --cycles.")
             print("\nExample nodes from error messages:")
-            print("  python3 scripts/analyze_loops.py --node 109646")
-            print("  python3 scripts/analyze_loops.py --node 112298")
+            print("  python3 scripts/analyze_loops.py --nodes 109646,112298")
 
-    finally:
-        conn.close()
+    if args.explain:
+        write_explain_plans(args.explain)
 
 
 if __name__ == '__main__':
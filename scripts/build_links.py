@@ -12,15 +12,31 @@ Environment variables:
     PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD
 """
 
+import io
 import os
 import sys
 import argparse
-import json
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Set, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple, Optional
 from collections import defaultdict
 
+import numpy as np
+
+# Shared helpers live next to this script
+scripts_dir = Path(__file__).resolve().parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+from pgcopy import parse_binary_copy
+
+# Numba is optional: without it the link walk runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -80,6 +96,19 @@ def get_db_connection(schema: Optional[str] = None):
         raise
 
 
+def run_with_connection(func, *args):
+    """Run func(conn, *args) on its own connection (for worker threads).
+
+    A psycopg connection must not be shared by concurrent queries, so each
+    parallel loader gets a dedicated one.
+    """
+    conn = get_db_connection()
+    try:
+        return func(conn, *args)
+    finally:
+        conn.close()
+
+
 def find_schema(conn) -> Optional[str]:
     """Find turrutebasen schema dynamically."""
     if PSYCOPG_VERSION == 2:
@@ -108,6 +137,25 @@ def find_schema(conn) -> Optional[str]:
             return result[0] if result else None
 
 
+# Secondary indexes on the link tables: (name, table, method, column).
+# insert_links() drops them around the bulk load and rebuilds them after.
+LINK_INDEXES = [
+    ('idx_links_a_node', 'links', 'BTREE', 'a_node'),
+    ('idx_links_b_node', 'links', 'BTREE', 'b_node'),
+    ('idx_links_geom_gist', 'links', 'GIST', 'geom'),
+    ('idx_link_segments_segment_id', 'link_segments', 'BTREE', 'segment_id'),
+]
+
+
+def create_link_indexes(cur, schema: str):
+    """Create the LINK_INDEXES (if missing)."""
+    for name, table, method, column in LINK_INDEXES:
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS {name}
+            ON {schema}.{table} USING {method} ({column})
+        """)
+
+
 def create_tables(conn, schema: str):
     """Create links and link_segments tables if they don't exist."""
     cursor_class = RealDictCursor if PSYCOPG_VERSION == 2 else dict_row
@@ -123,6 +171,10 @@ def create_tables(conn, schema: str):
         srid_result = cur.fetchone()
         srid = srid_result[0] if srid_result else 25833  # Default UTM 33N
 
+    # The DDL below needs no intermediate results: with psycopg3 send it
+    # all in one pipeline instead of waiting for each statement
+    pipeline = conn.pipeline() if PSYCOPG_VERSION == 3 else nullcontext()
+    with pipeline, conn.cursor() as cur:
         # Create links table
         cur.execute(f"""
             CREATE TABLE IF NOT EXISTS {schema}.links (
@@ -187,25 +239,10 @@ def create_tables(conn, schema: str):
         """, (schema,))
 
         # Create indexes
-        cur.execute(f"""
-            CREATE INDEX IF NOT EXISTS idx_links_a_node
-            ON {schema}.links USING BTREE (a_node)
-        """)
-        cur.execute(f"""
-            CREATE INDEX IF NOT EXISTS idx_links_b_node
-            ON {schema}.links USING BTREE (b_node)
-        """)
-        cur.execute(f"""
-            CREATE INDEX IF NOT EXISTS idx_links_geom_gist
-            ON {schema}.links USING GIST (geom)
-        """)
-        cur.execute(f"""
-            CREATE INDEX IF NOT EXISTS idx_link_segments_segment_id
-            ON {schema}.link_segments USING BTREE (segment_id)
-        """)
+        create_link_indexes(cur, schema)
 
-        conn.commit()
-        print(f"✓ Created/verified tables in schema: {schema}")
+    conn.commit()
+    print(f"✓ Created/verified tables in schema: {schema}")
 
 
 def load_anchor_nodes(conn, schema: str) -> Set[int]:
@@ -219,52 +256,152 @@ def load_anchor_nodes(conn, schema: str) -> Set[int]:
     return anchors
 
 
-def load_segments(conn, schema: str) -> Tuple[Dict[int, Dict], Dict[int, List[Tuple[int, int]]]]:
+class SegmentArrays(NamedTuple):
+    """Segments as parallel NumPy arrays (structure of arrays).
+
+    Row i is the segment with the i-th smallest objid; this dense segment
+    index is what the segment graph and the link walk refer to.
     """
-    Load all segments and build adjacency structure.
+    objid: np.ndarray   # int64
+    source: np.ndarray  # int64
+    target: np.ndarray  # int64
+    length: np.ndarray  # float64
 
-    Returns:
-        segments_dict: {segment_id: {source_node, target_node, length_m}}
-        adjacency: {node_id: [(segment_id, other_node), ...]}
+
+class SegmentGraph(NamedTuple):
+    """Undirected segment graph in CSR form over dense node indices.
+
+    The segments incident to node index v are nbr_segment[indptr[v]:indptr[v+1]]
+    (sorted by segment index), with the node index at their other end in
+    the same positions of nbr_node.
     """
+    node_ids: np.ndarray        # int64, sorted: node index -> node_id
+    indptr: np.ndarray          # int64, len(node_ids) + 1
+    nbr_segment: np.ndarray     # int64 segment indices
+    nbr_node: np.ndarray        # int64 node indices
+
+
+class LinkSegments(NamedTuple):
+    """link_segments rows as parallel columns, ordered by (link_id, seq).
+
+    Four int64 arrays take 32 bytes per row where a dict per row costs
+    several hundred, which matters at millions of rows.
+    """
+    link_id: np.ndarray         # int64, 1-based, matches links[i]['link_id']
+    seq: np.ndarray             # int64, position within the link
+    segment_id: np.ndarray      # int64 fotrute objid
+    from_node: np.ndarray       # int64 node_id the walk entered the segment from
+
+
+def build_segment_graph(segments: SegmentArrays) -> SegmentGraph:
+    """Build the CSR adjacency for both endpoints of every segment.
+
+    Each node's entries are in segment index (objid) order, so the walk is
+    deterministic. Endpoints are laid out segment by segment (source, then
+    target), so a single stable sort on the node index groups them without
+    disturbing that order.
+    """
+    num_segments = segments.objid.size
+    node_ids, inverse = np.unique(
+        np.concatenate([segments.source, segments.target]), return_inverse=True
+    )
+    source = inverse[:num_segments]
+    target = inverse[num_segments:]
+
+    ends = np.stack([source, target], axis=1).ravel()
+    others = np.stack([target, source], axis=1).ravel()
+    segs = np.repeat(np.arange(num_segments, dtype=np.int64), 2)
+    order = np.argsort(ends, kind='stable')
+
+    indptr = np.zeros(node_ids.size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=node_ids.size), out=indptr[1:])
+    return SegmentGraph(
+        node_ids=node_ids,
+        indptr=indptr,
+        nbr_segment=segs[order],
+        nbr_node=others[order].astype(np.int64),
+    )
+
+
+# A self-loop that is the only segment at a non-anchor node (degree 2 from
+# its two ends) forms a component no walk can enter: it has no anchor, and
+# with a single segment it cannot get a metadata anchor either. Such rows
+# are skipped when loading and only counted. Expects the fotrute alias f.
+ISOLATED_LOOP_CONDITION = """
+    f.source_node = f.target_node
+    AND EXISTS (
+        SELECT 1 FROM {schema}.node_degree d
+        WHERE d.node_id = f.source_node AND d.degree = 2
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {schema}.anchor_nodes a
+        WHERE a.node_id = f.source_node
+    )
+"""
+
+
+def count_isolated_loops(conn, schema: str) -> int:
+    """Count the segments load_segments() skips as unreachable isolated loops."""
     with conn.cursor() as cur:
         cur.execute(f"""
-            SELECT
-                objid,
-                source_node,
-                target_node,
-                COALESCE(ST_Length(senterlinje), 0) as length_m
-            FROM {schema}.fotrute
-            WHERE source_node IS NOT NULL
-              AND target_node IS NOT NULL
-            ORDER BY objid
+            SELECT COUNT(*)
+            FROM {schema}.fotrute f
+            WHERE f.objid IS NOT NULL
+              AND {ISOLATED_LOOP_CONDITION.format(schema=schema)}
         """)
+        return cur.fetchone()[0]
 
-        segments_dict: Dict[int, Dict] = {}
-        adjacency: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
 
-        for row in cur.fetchall():
-            seg_id = row[0]
-            source = row[1]
-            target = row[2]
-            length = float(row[3]) if row[3] else 0.0
-
-            segments_dict[seg_id] = {
-                'source_node': source,
-                'target_node': target,
-                'length_m': length
-            }
+def load_segments(conn, schema: str) -> Tuple[SegmentArrays, SegmentGraph]:
+    """
+    Load all segments that a link walk can reach and build adjacency structure.
 
-            # Add to adjacency for both nodes
-            adjacency[source].append((seg_id, target))
-            adjacency[target].append((seg_id, source))
+    Isolated self-loops (ISOLATED_LOOP_CONDITION) are filtered out in SQL
+    instead of being transferred only to end up unused. Rows arrive as a
+    binary COPY decoded straight into NumPy arrays, so no value goes through
+    a Python type adapter. No ORDER BY: rows are put in objid order by
+    np.unique, which also fixes the adjacency order.
 
-        # Sort adjacency lists for determinism
-        for node_id in adjacency:
-            adjacency[node_id].sort()
+    Returns:
+        segments: SegmentArrays indexed by dense segment index
+        graph: SegmentGraph (CSR adjacency over dense node indices)
+    """
+    copy_sql = f"""
+        COPY (
+            SELECT
+                objid::int8,
+                source_node::int8,
+                target_node::int8,
+                COALESCE(ST_Length(senterlinje), 0)::float8 as length_m
+            FROM {schema}.fotrute f
+            WHERE objid IS NOT NULL
+              AND source_node IS NOT NULL
+              AND target_node IS NOT NULL
+              AND NOT ({ISOLATED_LOOP_CONDITION.format(schema=schema)})
+        ) TO STDOUT WITH (FORMAT BINARY)
+    """
+    buf = io.BytesIO()
+    with conn.cursor() as cur:
+        if PSYCOPG_VERSION == 2:
+            cur.copy_expert(copy_sql, buf)
+        else:
+            with cur.copy(copy_sql) as copy:
+                for chunk in copy:
+                    buf.write(chunk)
+    objids, sources, targets, lengths = parse_binary_copy(
+        buf.getvalue(), ['>i8', '>i8', '>i8', '>f8']
+    )
+
+    objid, order = np.unique(objids, return_index=True)
+    segments = SegmentArrays(
+        objid=objid,
+        source=sources[order],
+        target=targets[order],
+        length=lengths[order],
+    )
 
-    print(f"✓ Loaded {len(segments_dict)} segments")
-    return segments_dict, dict(adjacency)
+    print(f"✓ Loaded {segments.objid.size} segments")
+    return segments, build_segment_graph(segments)
 
 
 def load_route_info(conn, schema: str) -> Dict[int, Set[str]]:
@@ -319,7 +456,8 @@ def load_unmarked_segments(conn) -> Set[int]:
 
 
 def compute_metadata_anchor_nodes(
-    adjacency: Dict[int, List[Tuple[int, int]]],
+    graph: SegmentGraph,
+    segment_objids: np.ndarray,
     segment_routes: Dict[int, Set[str]],
     unmarked_segments: Optional[Set[int]] = None,
 ) -> Set[int]:
@@ -340,27 +478,28 @@ def compute_metadata_anchor_nodes(
     The unmarked dimension matters because ops.route_link_graph aggregates
     is_unmarked per link with bool_or — so a single glacier fotrute merged
     into a 14 km link makes the whole link dotted on the map.
+
+    Each segment's fingerprint is reduced to an int, so the check is a
+    per-node min/max over the CSR adjacency instead of a set per node.
     """
     unmarked_segments = unmarked_segments or set()
+    route_ids = route_set_ids(segment_routes)
+    fingerprints = np.array([
+        2 * route_ids.get(seg_id, 0) + (seg_id in unmarked_segments)
+        for seg_id in segment_objids.tolist()
+    ], dtype=np.int64)
 
-    def fingerprint(seg_id: int) -> Tuple[frozenset, bool]:
-        routes = segment_routes.get(seg_id)
-        route_fp = frozenset(str(r) for r in routes) if routes else frozenset()
-        return (route_fp, seg_id in unmarked_segments)
-
-    metadata_anchors: Set[int] = set()
-    for node_id, incident in adjacency.items():
-        if not incident:
-            continue
-        prints = {fingerprint(seg_id) for seg_id, _other in incident}
-        if len(prints) > 1:
-            metadata_anchors.add(node_id)
-    return metadata_anchors
+    if graph.nbr_segment.size == 0:
+        return set()
+    incident = fingerprints[graph.nbr_segment]
+    starts = graph.indptr[:-1]
+    differs = np.minimum.reduceat(incident, starts) != np.maximum.reduceat(incident, starts)
+    return set(graph.node_ids[differs].tolist())
 
 
 def build_route_continuous_geometries(
     links: List[Dict],
-    link_segments: List[Dict],
+    link_segments: LinkSegments,
     segment_routes: Dict[int, Set[str]],
     conn,
     schema: str,
@@ -373,9 +512,7 @@ def build_route_continuous_geometries(
     
     # Map link_id to routes it belongs to
     link_routes: Dict[int, Set[str]] = defaultdict(set)
-    for ls in link_segments:
-        link_id = ls['link_id']
-        segment_id = ls['segment_id']
+    for link_id, segment_id in zip(link_segments.link_id.tolist(), link_segments.segment_id.tolist()):
         if segment_id in segment_routes:
             link_routes[link_id].update(segment_routes[segment_id])
     
@@ -649,341 +786,558 @@ def build_route_continuous_geometries(
         conn.commit()
 
 
+def route_set_ids(segment_routes: Dict[int, Set[str]]) -> Dict[int, int]:
+    """Map each segment to a small int identifying its route set.
+
+    Segments with equal route sets share an id, so the link walk compares
+    ints instead of building a frozenset per step. Segments without routes
+    map to 0 (and may be left out of the result).
+    """
+    ids: Dict[frozenset, int] = {frozenset(): 0}
+    seg_route_ids: Dict[int, int] = {}
+    for seg_id, routes in segment_routes.items():
+        key = frozenset(str(r) for r in routes)
+        seg_route_ids[seg_id] = ids.setdefault(key, len(ids))
+    return seg_route_ids
+
+
+# Error codes reported by _walk_links()
+ERR_DEAD_END = 0      # no unused segment to continue on
+ERR_BRANCHING = 1     # more than one unused segment at a non-anchor node
+ERR_METADATA = 2      # next segment has a different route set
+ERR_ANCHOR_LOOP = 3   # link returned to its own start anchor
+
+
+def _walk_links(indptr, nbr_segment, nbr_node, anchors, is_anchor, seg_route_id, used,
+                check_routes, num_segments):
+    """Walk links from anchors over the CSR graph (dense indices only).
+
+    Written for numba.njit: arrays and ints in, arrays out. Without Numba it
+    runs as plain Python on lists. used is an all-False mask over segment
+    indices, updated in place. Each link consumes at least one segment
+    and produces at most one error, so num_segments bounds every output.
+
+    No visited-node set is needed: every step consumes an unused segment,
+    and a non-anchor node can only be re-entered over a segment that was
+    already unused (so counted as an alternative) on the first visit, in
+    which case the walk stopped there as branching.
+
+    Returns:
+        link_a, link_b: start/end node index per link
+        link_end: exclusive end offset of each link in link_seg
+        link_seg: segment indices of all links, in walk order
+        link_from: node index each of those segments is entered from
+        err: rows of (code, node index, segment index, detail, link), where
+            link is the position in link_a of the link that raised it
+    """
+
+    link_a = np.empty(num_segments, dtype=np.int64)
+    link_b = np.empty(num_segments, dtype=np.int64)
+    link_end = np.empty(num_segments, dtype=np.int64)
+    link_seg = np.empty(num_segments, dtype=np.int64)
+    link_from = np.empty(num_segments, dtype=np.int64)
+    err = np.empty((num_segments, 5), dtype=np.int64)
+    n_links = 0
+    n_seg = 0
+    n_err = 0
+
+    for anchor in anchors:
+        for first_pos in range(indptr[anchor], indptr[anchor + 1]):
+            first_seg = nbr_segment[first_pos]
+            if used[first_seg]:
+                continue
+
+            # Start new link
+            current = nbr_node[first_pos]
+            last = first_seg
+            link_seg[n_seg] = first_seg
+            link_from[n_seg] = anchor
+            n_seg += 1
+            used[first_seg] = True
+            route_id = seg_route_id[first_seg]
+
+            # Walk until we hit an anchor or error
+            while not is_anchor[current]:
+                # A degree-2 chain node has a fixed next hop: the segment we
+                # did not arrive on. Otherwise count the unused segments.
+                start = indptr[current]
+                stop = indptr[current + 1]
+                next_seg = -1
+                next_node = -1
+                if stop - start == 2 and nbr_segment[start] != nbr_segment[start + 1]:
+                    pos = start + 1 if nbr_segment[start] == last else start
+                    next_seg = nbr_segment[pos]
+                    next_node = nbr_node[pos]
+                    n_available = 0 if used[next_seg] else 1
+                else:
+                    n_available = 0
+                    for pos in range(start, stop):
+                        seg = nbr_segment[pos]
+                        if not used[seg] and seg != last:
+                            n_available += 1
+                            if n_available == 1:
+                                next_seg = seg
+                                next_node = nbr_node[pos]
+
+                if n_available != 1:
+                    err[n_err, 0] = ERR_DEAD_END if n_available == 0 else ERR_BRANCHING
+                    err[n_err, 1] = current
+                    err[n_err, 2] = last
+                    err[n_err, 3] = n_available + 1
+                    err[n_err, 4] = n_links
+                    n_err += 1
+                    break
+
+                # Enforce "equal metadata" within a link
+                if check_routes and seg_route_id[next_seg] != route_id:
+                    err[n_err, 0] = ERR_METADATA
+                    err[n_err, 1] = current
+                    err[n_err, 2] = next_seg
+                    err[n_err, 3] = first_seg
+                    err[n_err, 4] = n_links
+                    n_err += 1
+                    break
+
+                link_seg[n_seg] = next_seg
+                link_from[n_seg] = current
+                n_seg += 1
+                last = next_seg
+                used[next_seg] = True
+                current = next_node
+
+            if current == anchor:
+                err[n_err, 0] = ERR_ANCHOR_LOOP
+                err[n_err, 1] = anchor
+                err[n_err, 2] = first_seg
+                err[n_err, 3] = 0
+                err[n_err, 4] = n_links
+                n_err += 1
+
+            link_a[n_links] = anchor
+            link_b[n_links] = current
+            link_end[n_links] = n_seg
+            n_links += 1
+
+    return (link_a[:n_links], link_b[:n_links], link_end[:n_links],
+            link_seg[:n_seg], link_from[:n_seg], err[:n_err])
+
+
+def _component_labels(indptr, nbr_node, num_nodes):
+    """Label the connected components of the CSR graph (iterative DFS).
+
+    Written for numba.njit like _walk_links(). Returns a component number
+    per node index.
+    """
+    labels = np.full(num_nodes, -1, dtype=np.int64)
+    stack = np.empty(num_nodes, dtype=np.int64)
+    n_components = 0
+    for root in range(num_nodes):
+        if labels[root] != -1:
+            continue
+        labels[root] = n_components
+        stack[0] = root
+        top = 1
+        while top > 0:
+            top -= 1
+            node = stack[top]
+            for pos in range(indptr[node], indptr[node + 1]):
+                other = nbr_node[pos]
+                if labels[other] == -1:
+                    labels[other] = n_components
+                    stack[top] = other
+                    top += 1
+        n_components += 1
+    return labels
+
+
+# nogil: walks over different components run in parallel threads
+_walk_links_jit = njit(cache=True, nogil=True)(_walk_links) if njit is not None else None
+_component_labels_jit = njit(cache=True)(_component_labels) if njit is not None else None
+
+# Threads used for the link walk; only worth it when the walk is compiled
+WALK_WORKERS = min(os.cpu_count() or 1, 8) if njit is not None else 1
+# Below this many anchors the walk is too short to amortize a thread pool
+PARALLEL_WALK_MIN_ANCHORS = 10000
+
+
+def _run_walk(graph: SegmentGraph, anchors, is_anchor, seg_route_id, check_routes, num_segments):
+    """Run _walk_links() for one set of anchors, compiled when available."""
+    walk_args = (graph.indptr, graph.nbr_segment, graph.nbr_node, anchors, is_anchor, seg_route_id,
+                 np.zeros(seg_route_id.size, dtype=np.bool_))
+    if _walk_links_jit is not None:
+        return _walk_links_jit(*walk_args, check_routes, num_segments)
+    return _walk_links(*[arr.tolist() for arr in walk_args], check_routes, num_segments)
+
+
+def _walk_links_parallel(graph: SegmentGraph, anchors, is_anchor, seg_route_id, check_routes,
+                         workers: int):
+    """Run the link walk over disjoint groups of connected components.
+
+    A walk never leaves the component of its start anchor, so anchors are
+    dealt to workers by component and every group walks its own segments.
+    The parts are then merged back into the order a single walk over all
+    anchors produces: links by start anchor, errors by the link that
+    raised them.
+    """
+    if _component_labels_jit is not None:
+        labels = _component_labels_jit(graph.indptr, graph.nbr_node, graph.node_ids.size)
+    else:
+        labels = _component_labels(graph.indptr.tolist(), graph.nbr_node.tolist(), graph.node_ids.size)
+
+    # Segments per group bound that group's output buffers
+    owner = np.repeat(np.arange(graph.node_ids.size), np.diff(graph.indptr))
+    segment_group = np.empty(seg_route_id.size, dtype=np.int64)
+    segment_group[graph.nbr_segment] = labels[owner] % workers
+    group_segments = np.bincount(segment_group, minlength=workers).tolist()
+    anchor_group = labels[anchors] % workers
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(
+            lambda group: _run_walk(graph, anchors[anchor_group == group], is_anchor, seg_route_id,
+                                    check_routes, group_segments[group]),
+            range(workers),
+        ))
+
+    link_a = np.concatenate([part[0] for part in parts])
+    link_b = np.concatenate([part[1] for part in parts])
+    link_seg = np.concatenate([part[3] for part in parts])
+    link_from = np.concatenate([part[4] for part in parts])
+    err = np.concatenate([part[5] for part in parts])
+
+    # Shift each part's offsets (link_end, err link) past the parts before it
+    seg_offsets = np.cumsum([0] + [part[3].size for part in parts])
+    link_offsets = np.cumsum([0] + [part[0].size for part in parts])
+    link_end = np.concatenate([part[2] + offset for part, offset in zip(parts, seg_offsets)])
+    err[:, 4] += np.repeat(link_offsets[:-1], [part[5].shape[0] for part in parts])
+
+    # Anchors are walked in index order and each anchor's links come from
+    # one part, so a stable sort on the start anchor restores that order
+    order = np.argsort(link_a, kind='stable')
+    link_start = np.concatenate(([0], link_end))[:-1]
+    sizes = (link_end - link_start)[order]
+    new_end = np.cumsum(sizes)
+    segment_order = np.repeat(link_start[order] - (new_end - sizes), sizes) + np.arange(link_seg.size)
+
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    err[:, 4] = rank[err[:, 4]]
+    err = err[np.argsort(err[:, 4], kind='stable')]
+
+    return (link_a[order], link_b[order], new_end,
+            link_seg[segment_order], link_from[segment_order], err)
+
+
 def build_links(
-    segments_dict: Dict[int, Dict],
-    adjacency: Dict[int, List[Tuple[int, int]]],
+    segments: SegmentArrays,
+    graph: SegmentGraph,
     anchor_nodes: Set[int],
     segment_routes: Optional[Dict[int, Set[str]]] = None,
-) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    workers: Optional[int] = None,
+) -> Tuple[List[Dict], LinkSegments, List[Dict]]:
     """
     Build links by walking from anchor nodes.
 
+    The walk itself is _walk_links() over the CSR graph, compiled with
+    Numba when it is installed; this wrapper maps its index arrays back
+    to fotrute objids and node IDs. With more than one worker (default
+    WALK_WORKERS for large inputs), connected components are walked in
+    parallel threads; the result is the same as a single walk.
+
     Returns:
         links: List of {a_node, b_node, segment_ids, length_m}
-        link_segments: List of {link_id, seq, segment_id}
+        link_segments: LinkSegments columns {link_id, seq, segment_id, from_node}
         errors: List of {type, node_id, segment_id, message}
     """
-    used_segments: Set[int] = set()
-    links: List[Dict] = []
-    link_segments_list: List[Dict] = []
-    errors: List[Dict] = []
+    objids = segments.objid.tolist()
+    node_ids = graph.node_ids.tolist()
+    num_segments = len(objids)
 
-    def route_set(seg_id: int) -> frozenset[str]:
+    def route_set(seg_idx: int) -> frozenset[str]:
         if not segment_routes:
             return frozenset()
-        routes = segment_routes.get(seg_id)
+        routes = segment_routes.get(objids[seg_idx])
         if not routes:
             return frozenset()
         return frozenset(str(r) for r in routes)
 
-    # Sort anchor nodes for determinism
-    sorted_anchors = sorted(anchor_nodes)
+    # Route sets as ints, computed once; route_set() is only used for messages
+    seg_route_id = np.zeros(num_segments, dtype=np.int64)
+    if segment_routes:
+        route_ids = route_set_ids(segment_routes)
+        seg_route_id = np.array([route_ids.get(objid, 0) for objid in objids], dtype=np.int64)
+
+    # Anchors as node indices; anchors without segments have nothing to walk.
+    # Sorted for determinism (index order is node_id order).
+    candidates = np.fromiter(anchor_nodes, dtype=np.int64, count=len(anchor_nodes))
+    positions = np.searchsorted(graph.node_ids, candidates)
+    in_graph = positions < graph.node_ids.size
+    in_graph[in_graph] = graph.node_ids[positions[in_graph]] == candidates[in_graph]
+    anchors = np.unique(positions[in_graph])
+    # Dense membership mask: one array load per walk step instead of a hash
+    is_anchor = np.zeros(graph.node_ids.size, dtype=np.bool_)
+    is_anchor[anchors] = True
+
+    if workers is None:
+        workers = WALK_WORKERS if anchors.size >= PARALLEL_WALK_MIN_ANCHORS else 1
+    check_routes = segment_routes is not None
+    if workers > 1:
+        link_a, link_b, link_end, link_seg, link_from, err = _walk_links_parallel(
+            graph, anchors, is_anchor, seg_route_id, check_routes, workers
+        )
+    else:
+        link_a, link_b, link_end, link_seg, link_from, err = _run_walk(
+            graph, anchors, is_anchor, seg_route_id, check_routes, num_segments
+        )
 
-    for anchor in sorted_anchors:
-        if anchor not in adjacency:
-            continue
+    links: List[Dict] = []
+    link_segment_objids = segments.objid[link_seg]
+    segment_ids_list = link_segment_objids.tolist()
+
+    # Each link has at least one segment, so the start offsets are strictly
+    # increasing; link ids and in-link positions follow from them directly
+    link_start = np.concatenate(([0], link_end))[:-1]
+    link_sizes = link_end - link_start
+    link_segments = LinkSegments(
+        link_id=np.repeat(np.arange(1, link_end.size + 1, dtype=np.int64), link_sizes),
+        seq=np.arange(link_seg.size, dtype=np.int64) - np.repeat(link_start, link_sizes),
+        segment_id=link_segment_objids,
+        # Stored for geometry orientation
+        from_node=graph.node_ids[link_from],
+    )
+
+    # Total length of every link in one reduction
+    link_lengths = (
+        np.add.reduceat(segments.length[link_seg], link_start).tolist() if link_end.size else []
+    )
+
+    start = 0
+    for a_node, b_node, end, length_m in zip(
+        link_a.tolist(), link_b.tolist(), link_end.tolist(), link_lengths
+    ):
+        links.append({
+            'link_id': len(links) + 1,
+            'a_node': node_ids[a_node],
+            'b_node': node_ids[b_node],
+            'length_m': length_m,
+            'segment_ids': segment_ids_list[start:end]
+        })
+        start = end
 
-        # Get all segments incident to this anchor
-        incident_segments = [seg for seg in adjacency[anchor] if seg[0] not in used_segments]
+    errors: List[Dict] = []
+    for code, node, seg_idx, detail, _ in err.tolist():
+        node_id = node_ids[node]
+        if code == ERR_DEAD_END:
+            error_type, message = 'dangling', f'Dead end at node {node_id}'
+        elif code == ERR_BRANCHING:
+            error_type, message = 'branching', f'Branching at node {node_id} (degree {detail})'
+        elif code == ERR_METADATA:
+            error_type, message = 'metadata_boundary', (
+                f'Metadata boundary at node {node_id}: '
+                f'link routes {sorted(route_set(detail))} vs next segment routes {sorted(route_set(seg_idx))}'
+            )
+        else:
+            error_type, message = 'loop', f'Loop detected: anchor {node_id} to itself'
+        errors.append({
+            'type': error_type,
+            'node_id': node_id,
+            'segment_id': objids[seg_idx],
+            'message': message
+        })
 
-        for seg_id, next_node in incident_segments:
-            if seg_id in used_segments:
-                continue
+    return links, link_segments, errors
 
-            # Start new link
-            current_node = next_node
-            link_segment_ids = [seg_id]
-            used_segments.add(seg_id)
-            visited_nodes = {anchor}  # Track visited nodes for loop detection (start with anchor only)
-            link_route_set = route_set(seg_id)
 
-            # Walk until we hit an anchor or error
-            while current_node not in anchor_nodes:
-                if current_node not in adjacency:
-                    # Dangling segment
-                    errors.append({
-                        'type': 'dangling',
-                        'node_id': current_node,
-                        'segment_id': seg_id,
-                        'message': f'Dangling segment at node {current_node}'
-                    })
-                    break
+def _copy_text(value) -> str:
+    """Format a value for COPY text format (lists become array literals)."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(str(v) for v in value) + '}'
+    return str(value)
 
-                # Check for loop (visited same non-anchor node twice)
-                # Note: We check BEFORE adding to visited_nodes to detect actual loops
-                if current_node in visited_nodes:
-                    errors.append({
-                        'type': 'loop',
-                        'node_id': current_node,
-                        'segment_id': link_segment_ids[-1],
-                        'message': f'Loop detected: revisited node {current_node}'
-                    })
-                    break
 
-                # Find next segment (exclude the one we came from)
-                available = [
-                    (s_id, other_node)
-                    for s_id, other_node in adjacency[current_node]
-                    if s_id not in used_segments and s_id != link_segment_ids[-1]
-                ]
-
-                if len(available) == 0:
-                    # Dead end
-                    errors.append({
-                        'type': 'dangling',
-                        'node_id': current_node,
-                        'segment_id': link_segment_ids[-1],
-                        'message': f'Dead end at node {current_node}'
-                    })
-                    break
-                elif len(available) > 1:
-                    # Branching without anchor
-                    errors.append({
-                        'type': 'branching',
-                        'node_id': current_node,
-                        'segment_id': link_segment_ids[-1],
-                        'message': f'Branching at node {current_node} (degree {len(available) + 1})'
-                    })
-                    break
+def copy_rows(cur, table: str, columns: List[str], rows: Iterable[Tuple]):
+    """Bulk-load rows with COPY ... FROM STDIN.
 
-                # Exactly one segment - continue walking
-                next_seg_id, next_node = available[0]
-                # Optional: enforce "equal metadata" within a link. If route-set changes,
-                # stop the link here (this node should normally be a metadata anchor).
-                if segment_routes is not None and route_set(next_seg_id) != link_route_set:
-                    errors.append({
-                        'type': 'metadata_boundary',
-                        'node_id': current_node,
-                        'segment_id': next_seg_id,
-                        'message': (
-                            f'Metadata boundary at node {current_node}: '
-                            f'link routes {sorted(link_route_set)} vs next segment routes {sorted(route_set(next_seg_id))}'
-                        )
-                    })
-                    break
-                link_segment_ids.append(next_seg_id)
-                used_segments.add(next_seg_id)
-                visited_nodes.add(current_node)
-                current_node = next_node
-
-            # Determine b_node
-            if current_node in anchor_nodes:
-                # Valid link from anchor to anchor
-                b_node = current_node
-                # Check for self-loop (anchor to same anchor)
-                if anchor == b_node and len(link_segment_ids) > 0:
-                    errors.append({
-                        'type': 'loop',
-                        'node_id': anchor,
-                        'segment_id': link_segment_ids[0],
-                        'message': f'Loop detected: anchor {anchor} to itself'
-                    })
-            else:
-                # Incomplete link (error case) - use current_node as b_node anyway
-                b_node = current_node
-
-            # Calculate total length
-            total_length = sum(segments_dict[sid]['length_m'] for sid in link_segment_ids)
-
-            # Store link
-            link_id = len(links) + 1
-            links.append({
-                'link_id': link_id,
-                'a_node': anchor,
-                'b_node': b_node,
-                'length_m': total_length,
-                'segment_ids': link_segment_ids
-            })
+    One COPY stream replaces a round trip per row (executemany). Values must
+    be numbers, None or lists of numbers (BIGINT[] columns).
+    """
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    if PSYCOPG_VERSION == 2:
+        buf = io.StringIO()
+        for row in rows:
+            buf.write('\t'.join(_copy_text(value) for value in row))
+            buf.write('\n')
+        buf.seek(0)
+        cur.copy_expert(copy_sql, buf)
+    else:
+        with cur.copy(copy_sql) as copy:
+            for row in rows:
+                copy.write_row(row)
 
-            # Store link_segments with from_node info for geometry orientation
-            # Track which node we're coming from for each segment
-            prev_node = anchor
-            for seq, seg_id in enumerate(link_segment_ids):
-                seg_info = segments_dict[seg_id]
-                # Store the node we're coming from (for geometry orientation)
-                from_node = prev_node
-
-                # Determine next node for next iteration
-                if seg_info['source_node'] == prev_node:
-                    next_node = seg_info['target_node']
-                else:
-                    next_node = seg_info['source_node']
 
-                link_segments_list.append({
-                    'link_id': link_id,
-                    'seq': seq,
-                    'segment_id': seg_id,
-                    'from_node': from_node  # Store for geometry orientation
-                })
+def insert_links(conn, schema: str, links: List[Dict], link_segments: LinkSegments):
+    """Insert links (with geometries) and link_segments into database.
 
-                prev_node = next_node
+    Links are COPYed into a temporary staging table together with the
+    from_node of each segment, then inserted with their geometry and gap
+    information computed in the same INSERT ... SELECT, so links is written
+    once instead of being inserted and then updated row by row.
 
-    return links, link_segments_list, errors
+    Segments are collected in sequential order (seq) and oriented correctly:
+    - If segment's source_node matches the from_node, use geometry as-is
+    - Otherwise, reverse the geometry with ST_Reverse()
+    - Uses ST_LineMerge() to merge continuous segments into LineString
+    - Records any gaps between consecutive segments in segment_gaps
 
+    This ensures the link geometry flows continuously from a_node to b_node.
+    If segments are continuous, link will be LineString; if gaps exist, MultiLineString.
+    """
+    # link_segments is ordered by (link_id, seq), so each link's from_nodes
+    # are a contiguous slice of the column
+    from_nodes = link_segments.from_node.tolist()
+    link_offsets = np.cumsum([0] + [len(link['segment_ids']) for link in links]).tolist()
+    num_link_segments = link_segments.segment_id.size
 
-def insert_links(conn, schema: str, links: List[Dict], link_segments: List[Dict]):
-    """Insert links and link_segments into database."""
     with conn.cursor() as cur:
+        # One transaction for the whole rebuild. Its commit need not wait for
+        # the WAL flush (a crash can only lose this rebuild, which is simply
+        # rerun), and the geometry aggregation gets more memory.
+        cur.execute("SET LOCAL synchronous_commit = OFF")
+        cur.execute("SET LOCAL work_mem = '256MB'")
+
+        # Building indexes once over the loaded tables (sort + pack) is much
+        # cheaper than maintaining them per row, GIST in particular
+        index_names = ', '.join(f"{schema}.{name}" for name, _, _, _ in LINK_INDEXES)
+        cur.execute(f"DROP INDEX IF EXISTS {index_names}")
+
         # Truncate existing data
         cur.execute(f"TRUNCATE {schema}.link_segments RESTART IDENTITY CASCADE")
         cur.execute(f"TRUNCATE {schema}.links RESTART IDENTITY CASCADE")
 
-        # Insert links with segment_objids array
         if links:
-            cur.executemany(f"""
-                INSERT INTO {schema}.links (link_id, a_node, b_node, length_m, segment_objids)
-                VALUES (%s, %s, %s, %s, %s)
-            """, [
-                (link['link_id'], link['a_node'], link['b_node'], link['length_m'], link['segment_ids'])
-                for link in links
-            ])
+            cur.execute("""
+                CREATE TEMP TABLE links_stage (
+                    link_id BIGINT,
+                    a_node BIGINT,
+                    b_node BIGINT,
+                    length_m DOUBLE PRECISION,
+                    segment_objids BIGINT[],
+                    from_nodes BIGINT[]
+                ) ON COMMIT DROP
+            """)
+            copy_rows(
+                cur, 'links_stage',
+                ['link_id', 'a_node', 'b_node', 'length_m', 'segment_objids', 'from_nodes'],
+                ((link['link_id'], link['a_node'], link['b_node'], link['length_m'],
+                  link['segment_ids'], from_nodes[start:end])
+                 for link, start, end in zip(links, link_offsets, link_offsets[1:])),
+            )
+
+            # Insert links with segment_objids array, geometry and gaps
+            cur.execute(f"""
+                INSERT INTO {schema}.links
+                    (link_id, a_node, b_node, length_m, segment_objids, geom, segment_gaps)
+                SELECT
+                    s.link_id, s.a_node, s.b_node, s.length_m, s.segment_objids,
+                    g.geom, g.segment_gaps
+                FROM links_stage s
+                CROSS JOIN LATERAL (
+                    WITH oriented_segments AS (
+                        SELECT
+                            u.seq,
+                            u.segment_id,
+                            CASE
+                                WHEN f.source_node = u.from_node THEN f.senterlinje
+                                ELSE ST_Reverse(f.senterlinje)
+                            END as oriented_geom
+                        FROM unnest(s.segment_objids, s.from_nodes)
+                            WITH ORDINALITY AS u(segment_id, from_node, seq)
+                        JOIN {schema}.fotrute f ON f.objid = u.segment_id
+                    ),
+                    segment_gaps AS (
+                        SELECT
+                            seq,
+                            segment_id,
+                            ST_Distance(
+                                ST_EndPoint(oriented_geom),
+                                ST_StartPoint(LEAD(oriented_geom) OVER (ORDER BY seq))
+                            ) as gap_distance
+                        FROM oriented_segments
+                    )
+                    SELECT
+                        (SELECT ST_LineMerge(ST_Collect(oriented_geom ORDER BY seq))
+                         FROM oriented_segments) as geom,
+                        (SELECT jsonb_build_object(
+                                    'gap_count', COUNT(*),
+                                    'max_gap_m', MAX(gap_distance),
+                                    'avg_gap_m', AVG(gap_distance),
+                                    'gap_segment_ids', jsonb_agg(segment_id ORDER BY seq))
+                         FROM segment_gaps
+                         WHERE gap_distance > 0.0  -- Any gap, even tiny ones
+                         HAVING COUNT(*) > 0) as segment_gaps
+                ) g
+            """)
 
         # Insert link_segments
-        if link_segments:
-            cur.executemany(f"""
-                INSERT INTO {schema}.link_segments (link_id, seq, segment_id, from_node)
-                VALUES (%s, %s, %s, %s)
-            """, [
-                (ls['link_id'], ls['seq'], ls['segment_id'], ls['from_node'])
-                for ls in link_segments
-            ])
+        if num_link_segments:
+            copy_rows(
+                cur, f"{schema}.link_segments",
+                ['link_id', 'seq', 'segment_id', 'from_node'],
+                zip(link_segments.link_id.tolist(), link_segments.seq.tolist(),
+                    link_segments.segment_id.tolist(), from_nodes),
+            )
+
+        cur.execute("SET LOCAL maintenance_work_mem = '1GB'")
+        cur.execute("SET LOCAL max_parallel_maintenance_workers = 4")
+        create_link_indexes(cur, schema)
 
         conn.commit()
-        print(f"✓ Inserted {len(links)} links and {len(link_segments)} link_segments")
+        print(f"✓ Inserted {len(links)} links and {num_link_segments} link_segments")
 
 
-def update_link_geometries(conn, schema: str):
-    """Update link geometries from segment geometries.
+def report_link_gaps(conn, schema: str):
+    """Log links whose consecutive segments do not meet exactly.
 
-    Segments are collected in sequential order (seq) and oriented correctly:
-    - If segment's source_node matches the from_node, use geometry as-is
-    - Otherwise, reverse the geometry with ST_Reverse()
-    - Uses ST_LineMerge() to merge continuous segments into LineString
-    - Validates that segment endpoints match exactly (no gaps allowed)
-    - Flags and logs any gaps found between consecutive segments
-    
-    This ensures the link geometry flows continuously from a_node to b_node.
-    If segments are continuous, link will be LineString; if gaps exist, MultiLineString.
+    Gap information is computed by insert_links() and stored in
+    links.segment_gaps (NULL when all segment endpoints match).
     """
     with conn.cursor() as cur:
-        # First, validate and detect gaps, then update geometries
         cur.execute(f"""
-            WITH oriented_segments AS (
-                SELECT
-                    ls.link_id,
-                    ls.seq,
-                    ls.segment_id,
-                    CASE
-                        WHEN f.source_node = ls.from_node THEN f.senterlinje
-                        ELSE ST_Reverse(f.senterlinje)
-                    END as oriented_geom
-                FROM {schema}.link_segments ls
-                JOIN {schema}.fotrute f ON ls.segment_id = f.objid
-            ),
-            segment_gaps AS (
-                SELECT
-                    os1.link_id,
-                    os1.seq as seq1,
-                    os1.segment_id as seg1_id,
-                    os2.seq as seq2,
-                    os2.segment_id as seg2_id,
-                    ST_Distance(
-                        ST_EndPoint(os1.oriented_geom),
-                        ST_StartPoint(os2.oriented_geom)
-                    ) as gap_distance
-                FROM oriented_segments os1
-                JOIN oriented_segments os2 
-                    ON os1.link_id = os2.link_id 
-                    AND os2.seq = os1.seq + 1
-            ),
-            link_gaps AS (
-                SELECT
-                    link_id,
-                    COUNT(*) as gap_count,
-                    MAX(gap_distance) as max_gap,
-                    AVG(gap_distance) as avg_gap,
-                    array_agg(seg1_id ORDER BY seq1) as gap_segment_ids
-                FROM segment_gaps
-                WHERE gap_distance > 0.0  -- Any gap, even tiny ones
-                GROUP BY link_id
-            ),
-            updated_geoms AS (
-                SELECT
-                    ls.link_id,
-                    ST_LineMerge(
-                        ST_Collect(
-                            CASE
-                                WHEN f.source_node = ls.from_node THEN f.senterlinje
-                                ELSE ST_Reverse(f.senterlinje)
-                            END
-                            ORDER BY ls.seq
-                        )
-                    ) as geom
-                FROM {schema}.link_segments ls
-                JOIN {schema}.fotrute f ON ls.segment_id = f.objid
-                GROUP BY ls.link_id
-            )
             SELECT
-                ug.link_id,
-                ug.geom,
-                COALESCE(lg.gap_count, 0) as gap_count,
-                COALESCE(lg.max_gap, 0.0) as max_gap,
-                COALESCE(lg.avg_gap, 0.0) as avg_gap,
-                lg.gap_segment_ids
-            FROM updated_geoms ug
-            LEFT JOIN link_gaps lg ON ug.link_id = lg.link_id
+                link_id,
+                (segment_gaps->>'gap_count')::int,
+                (segment_gaps->>'max_gap_m')::float8,
+                (segment_gaps->>'avg_gap_m')::float8,
+                segment_gaps->'gap_segment_ids'
+            FROM {schema}.links
+            WHERE segment_gaps IS NOT NULL
+            ORDER BY link_id
         """)
-        
-        gap_warnings = []
-        for row in cur.fetchall():
-            link_id = row[0]
-            geom = row[1]
-            gap_count = row[2]
-            max_gap = row[3]
-            avg_gap = row[4]
-            gap_segment_ids = row[5]
-            
-            if gap_count > 0:
-                gap_warnings.append({
-                    'link_id': link_id,
-                    'gap_count': gap_count,
-                    'max_gap': max_gap,
-                    'avg_gap': avg_gap,
-                    'segment_ids': gap_segment_ids
-                })
-                
-                # Store gap information as JSONB
-                gap_info = {
-                    'gap_count': gap_count,
-                    'max_gap_m': float(max_gap),
-                    'avg_gap_m': float(avg_gap),
-                    'gap_segment_ids': gap_segment_ids if gap_segment_ids else []
-                }
-            else:
-                gap_info = None  # No gaps - store NULL
-            
-            # Update geometry and gap information
-            cur.execute(f"""
-                UPDATE {schema}.links
-                SET geom = %s, segment_gaps = %s
-                WHERE link_id = %s
-            """, (geom, json.dumps(gap_info) if gap_info else None, link_id))
-        
-        conn.commit()
-        
-        # Log warnings for gaps
-        if gap_warnings:
-            print(f"⚠ WARNING: Found {len(gap_warnings)} link(s) with gaps between segments:")
-            for warning in gap_warnings[:10]:  # Show first 10
-                print(f"  Link {warning['link_id']}: {warning['gap_count']} gap(s), "
-                      f"max gap: {warning['max_gap']:.6f}m, "
-                      f"avg gap: {warning['avg_gap']:.6f}m, "
-                      f"segments: {warning['segment_ids']}")
-            if len(gap_warnings) > 10:
-                print(f"  ... and {len(gap_warnings) - 10} more links with gaps")
-        else:
-            print(f"✓ Updated link geometries (oriented, ordered by seq, and merged where continuous)")
-            print(f"✓ All segment endpoints match exactly - no gaps detected")
+        gap_warnings = [
+            {
+                'link_id': row[0],
+                'gap_count': row[1],
+                'max_gap': row[2],
+                'avg_gap': row[3],
+                'segment_ids': row[4]
+            }
+            for row in cur.fetchall()
+        ]
+
+    # Log warnings for gaps
+    if gap_warnings:
+        print(f"⚠ WARNING: Found {len(gap_warnings)} link(s) with gaps between segments:")
+        for warning in gap_warnings[:10]:  # Show first 10
+            print(f"  Link {warning['link_id']}: {warning['gap_count']} gap(s), "
+                  f"max gap: {warning['max_gap']:.6f}m, "
+                  f"avg gap: {warning['avg_gap']:.6f}m, "
+                  f"segments: {warning['segment_ids']}")
+        if len(gap_warnings) > 10:
+            print(f"  ... and {len(gap_warnings) - 10} more links with gaps")
+    else:
+        print(f"✓ Link geometries oriented, ordered by seq, and merged where continuous")
+        print(f"✓ All segment endpoints match exactly - no gaps detected")
 
 
 def print_qa_report(links: List[Dict], total_segments: int, used_segments: Set[int], errors: List[Dict]):
@@ -1126,25 +1480,27 @@ def validate_prerequisites(conn, schema: str, log_file: Optional[Path] = None) -
 
                 return True
         else:
-            # Similar logic for psycopg3
-            with conn.cursor() as cur:
-                # Check for tables (nodes, fotrute)
-                cur.execute("""
-                    SELECT table_name
-                    FROM information_schema.tables
-                    WHERE table_schema = %s
-                      AND table_name IN ('nodes', 'fotrute')
-                """, (schema,))
+            # Similar logic for psycopg3, with each group of independent
+            # queries pipelined (one cursor per query, one network flight)
+            with conn.cursor() as cur, conn.cursor() as view_cur:
+                with conn.pipeline():
+                    # Check for tables (nodes, fotrute)
+                    cur.execute("""
+                        SELECT table_name
+                        FROM information_schema.tables
+                        WHERE table_schema = %s
+                          AND table_name IN ('nodes', 'fotrute')
+                    """, (schema,))
+
+                    # Check for materialized views (anchor_nodes)
+                    view_cur.execute("""
+                        SELECT matviewname
+                        FROM pg_matviews
+                        WHERE schemaname = %s
+                          AND matviewname = 'anchor_nodes'
+                    """, (schema,))
                 tables = {row[0] for row in cur.fetchall()}
-
-                # Check for materialized views (anchor_nodes)
-                cur.execute("""
-                    SELECT matviewname
-                    FROM pg_matviews
-                    WHERE schemaname = %s
-                      AND matviewname = 'anchor_nodes'
-                """, (schema,))
-                matviews = {row[0] for row in cur.fetchall()}
+                matviews = {row[0] for row in view_cur.fetchall()}
 
                 # Combine found objects
                 found_objects = tables | matviews
@@ -1163,15 +1519,21 @@ def validate_prerequisites(conn, schema: str, log_file: Optional[Path] = None) -
                         log(f"  Run 'make run-migrations' to create anchor_nodes materialized view", log_file)
                     return False
 
-                for name in ['nodes', 'fotrute', 'anchor_nodes']:
-                    # Use parameterized query with identifier quoting for safety
-                    from psycopg import sql
-                    query = sql.SQL("SELECT COUNT(*) FROM {}.{}").format(
-                        sql.Identifier(schema),
-                        sql.Identifier(name)
-                    )
-                    cur.execute(query)
-                    count = cur.fetchone()[0]
+                # Use parameterized query with identifier quoting for safety
+                from psycopg import sql
+                names = ['nodes', 'fotrute', 'anchor_nodes']
+                count_curs = [conn.cursor() for _ in names]
+                with conn.pipeline():
+                    for name, count_cur in zip(names, count_curs):
+                        count_cur.execute(sql.SQL("SELECT COUNT(*) FROM {}.{}").format(
+                            sql.Identifier(schema),
+                            sql.Identifier(name)
+                        ))
+                counts = [count_cur.fetchone()[0] for count_cur in count_curs]
+                for count_cur in count_curs:
+                    count_cur.close()
+
+                for name, count in zip(names, counts):
                     if count == 0:
                         obj_type = 'materialized view' if name == 'anchor_nodes' else 'table'
                         log(f"✗ {obj_type.capitalize()} {schema}.{name} is empty", log_file)
@@ -1258,21 +1620,35 @@ def build_links_main(args=None, log_file=None) -> int:
         # Load data
         log("==> Loading data...", log_file)
         try:
-            anchor_nodes = load_anchor_nodes(conn, schema)
+            # The loads are independent: run them concurrently, one connection
+            # each, so the phase takes as long as the slowest query
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                anchors_future = executor.submit(run_with_connection, load_anchor_nodes, schema)
+                segments_future = executor.submit(run_with_connection, load_segments, schema)
+                # Route info is also used for continuous geometry building
+                routes_future = executor.submit(run_with_connection, load_route_info, schema)
+                unmarked_future = executor.submit(run_with_connection, load_unmarked_segments)
+                isolated_future = executor.submit(run_with_connection, count_isolated_loops, schema)
+
+                anchor_nodes = anchors_future.result()
+                segments, graph = segments_future.result()
+                segment_routes = routes_future.result()
+                unmarked_segments = unmarked_future.result()
+                isolated_loops = isolated_future.result()
+
             log(f"  ✓ Loaded {len(anchor_nodes)} anchor nodes", log_file)
 
-            segments_dict, adjacency = load_segments(conn, schema)
-            log(f"  ✓ Loaded {len(segments_dict)} segments", log_file)
+            log(f"  ✓ Loaded {segments.objid.size} segments", log_file)
+            if isolated_loops:
+                log(f"  ⚠ Skipped {isolated_loops} isolated self-loop segment(s) without an anchor", log_file)
+            # Skipped loops still count towards the QA segment total (never used)
+            total_segments = segments.objid.size + isolated_loops
 
-            if not segments_dict:
+            if segments.objid.size == 0:
                 log("⚠ Warning: No segments found", log_file)
                 return 0  # Not an error, just nothing to do
-            
-            # Load route info for continuous geometry building
-            segment_routes = load_route_info(conn, schema)
-            log(f"  ✓ Loaded route info for {len(segment_routes)} segments", log_file)
 
-            unmarked_segments = load_unmarked_segments(conn)
+            log(f"  ✓ Loaded route info for {len(segment_routes)} segments", log_file)
             log(f"  ✓ Loaded {len(unmarked_segments)} unmarked-tagged segments", log_file)
         except Exception as e:
             log(f"✗ Failed to load data: {e}", log_file)
@@ -1284,15 +1660,15 @@ def build_links_main(args=None, log_file=None) -> int:
             # Add metadata-based anchors so links split when route memberships
             # OR unmarked status changes.
             metadata_anchors = compute_metadata_anchor_nodes(
-                adjacency, segment_routes, unmarked_segments=unmarked_segments,
+                graph, segments.objid, segment_routes, unmarked_segments=unmarked_segments,
             )
             combined_anchors = set(anchor_nodes) | set(metadata_anchors)
             log(f"  ✓ Added {len(metadata_anchors)} metadata anchor nodes (route/unmarked boundary splits)", log_file)
 
             links, link_segments, errors = build_links(
-                segments_dict, adjacency, combined_anchors, segment_routes=segment_routes
+                segments, graph, combined_anchors, segment_routes=segment_routes
             )
-            log(f"  ✓ Built {len(links)} links from {len(link_segments)} segments", log_file)
+            log(f"  ✓ Built {len(links)} links from {link_segments.segment_id.size} segments", log_file)
             if errors:
                 log(f"  ⚠ Found {len(errors)} errors (dangling/branch/loop)", log_file)
 
@@ -1316,18 +1692,18 @@ def build_links_main(args=None, log_file=None) -> int:
         log("==> Inserting links into database...", log_file)
         try:
             insert_links(conn, schema, links, link_segments)
-            log("  ✓ Links inserted", log_file)
+            log("  ✓ Links inserted (with geometries)", log_file)
         except Exception as e:
             log(f"✗ Failed to insert links: {e}", log_file)
             return 1
 
-        # Update geometries
-        log("==> Updating link geometries...", log_file)
+        # Report gaps found while building geometries
+        log("==> Checking link geometries...", log_file)
         try:
-            update_link_geometries(conn, schema)
-            log("  ✓ Link geometries updated", log_file)
+            report_link_gaps(conn, schema)
+            log("  ✓ Link geometries checked", log_file)
         except Exception as e:
-            log(f"✗ Failed to update geometries: {e}", log_file)
+            log(f"✗ Failed to check geometries: {e}", log_file)
             return 1
 
         # Build route continuous geometries using Python (much faster than SQL)
@@ -1345,13 +1721,13 @@ def build_links_main(args=None, log_file=None) -> int:
             log("  (Continuing despite error)", log_file)
 
         # Print QA report (unless quiet mode)
-        used_segment_ids = {ls['segment_id'] for ls in link_segments}
+        used_segment_ids = set(link_segments.segment_id.tolist())
         if not quiet:
             log("==> QA Report", log_file)
-            print_qa_report(links, len(segments_dict), used_segment_ids, errors)
+            print_qa_report(links, total_segments, used_segment_ids, errors)
         else:
             # In quiet mode, just log summary to file
-            log(f"QA Summary: {len(links)} links, {len(used_segment_ids)}/{len(segments_dict)} segments used, {len(errors)} errors", log_file)
+            log(f"QA Summary: {len(links)} links, {len(used_segment_ids)}/{total_segments} segments used, {len(errors)} errors", log_file)
 
         # Always log QA report to file
         with open(log_file, 'a') as f:
@@ -1359,9 +1735,9 @@ def build_links_main(args=None, log_file=None) -> int:
             f.write("QA REPORT\n")
             f.write("="*60 + "\n")
             f.write(f"Total links:              {len(links)}\n")
-            f.write(f"Total segments:           {len(segments_dict)}\n")
+            f.write(f"Total segments:           {total_segments}\n")
             f.write(f"Segments used:            {len(used_segment_ids)}\n")
-            f.write(f"Segments unused:          {len(segments_dict) - len(used_segment_ids)}\n")
+            f.write(f"Segments unused:          {total_segments - len(used_segment_ids)}\n")
             f.write(f"Errors (dangling/branch/loop): {len(errors)}\n")
             f.write("="*60 + "\n")
 
@@ -7,6 +7,7 @@ a quick health overview.
 
 Usage:
     python3 scripts/db_status.py [database_name]
+    python3 scripts/db_status.py [database_name] --no-sizes   # fast path for cron monitors
 
 Environment variables:
     PGHOST       - PostgreSQL host (default: localhost)
@@ -18,55 +19,93 @@ Environment variables:
 import os
 import sys
 import argparse
+import functools
+import time
+import weakref
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List, Tuple
+from types import MappingProxyType
+from typing import Optional, Dict, Iterator, List, Mapping, NamedTuple, Tuple
 
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    import psycopg2.errors
+    from psycopg2.pool import ThreadedConnectionPool
+    dbapi = psycopg2
+    PSYCOPG_VERSION = 2
 except ImportError:
-    print("Feil: psycopg2 ikke installert. Installer med: pip install psycopg2-binary", file=sys.stderr)
-    sys.exit(1)
+    try:
+        import psycopg
+        import psycopg.errors
+        ThreadedConnectionPool = None
+        dbapi = psycopg
+        PSYCOPG_VERSION = 3
+    except ImportError:
+        print("Feil: psycopg2 eller psycopg ikke installert. Installer med: pip install psycopg2-binary", file=sys.stderr)
+        sys.exit(1)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
-def get_db_connection_params() -> dict:
+@functools.lru_cache(maxsize=1)
+def get_db_connection_params() -> Mapping[str, Optional[str]]:
     """Get database connection parameters from environment or defaults.
 
     For localhost, uses None for host to enable Unix socket (peer auth).
+    The environment is read once per process; the result is read-only, so
+    callers overlay changes on a copy: {**get_db_connection_params(), 'database': name}.
     """
     host = os.environ.get('PGHOST', 'localhost')
     # Use None for localhost to enable Unix socket connection (peer auth)
     if host == 'localhost' or host == '127.0.0.1':
         host = None
 
-    return {
+    return MappingProxyType({
         'host': host,
         'port': os.environ.get('PGPORT', '5432') if host else None,
         'user': os.environ.get('PGUSER', os.environ.get('USER', 'postgres')),
         'password': os.environ.get('PGPASSWORD', ''),
         'database': os.environ.get('PGDATABASE', ''),
+    })
+
+
+# Session settings for the status checks' own connections: fail fast on a
+# bloated pg_catalog instead of hanging a monitor, and show up by name in
+# pg_stat_activity
+STATUS_SESSION_OPTIONS = '-c statement_timeout=10000 -c application_name=db_status'
+
+
+def get_connect_kwargs(db_params: dict, options: Optional[str] = None) -> dict:
+    """Build connect() kwargs from db_params, omitting None values."""
+    conn_kwargs = {
+        'user': db_params['user'],
+        # libpq's keyword; psycopg2 also accepts 'database', psycopg 3 does not
+        'dbname': db_params['database'],
+        'connect_timeout': 5
     }
+    if db_params['host']:
+        conn_kwargs['host'] = db_params['host']
+    if db_params['port']:
+        conn_kwargs['port'] = db_params['port']
+    if db_params['password']:
+        conn_kwargs['password'] = db_params['password']
+    if options:
+        conn_kwargs['options'] = options
+    return conn_kwargs
 
 
-def connect_db(db_params: dict) -> Optional[psycopg2.extensions.connection]:
-    """Connect to database and return connection."""
+def connect_db(db_params: dict, options: Optional[str] = None):
+    """Connect to database and return connection.
+
+    options is passed to the server as the libpq options string (-c settings).
+    """
     try:
-        # Build connection kwargs, omitting None values
-        conn_kwargs = {
-            'user': db_params['user'],
-            'database': db_params['database'],
-            'connect_timeout': 5
-        }
-        if db_params['host']:
-            conn_kwargs['host'] = db_params['host']
-        if db_params['port']:
-            conn_kwargs['port'] = db_params['port']
-        if db_params['password']:
-            conn_kwargs['password'] = db_params['password']
-
-        conn = psycopg2.connect(**conn_kwargs)
+        conn = dbapi.connect(**get_connect_kwargs(db_params, options))
         return conn
-    except psycopg2.OperationalError as e:
+    except dbapi.OperationalError as e:
         print(f"✗ Kunne ikke koble til database: {e}", file=sys.stderr)
         return None
     except Exception as e:
@@ -74,83 +113,362 @@ def connect_db(db_params: dict) -> Optional[psycopg2.extensions.connection]:
         return None
 
 
-def check_postgis(conn: psycopg2.extensions.connection) -> Tuple[bool, Optional[str]]:
-    """Check if PostGIS extension is enabled and return version."""
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT EXISTS(
-                    SELECT 1 FROM pg_extension WHERE extname = 'postgis'
-                ) as enabled,
-                (
-                    SELECT extversion FROM pg_extension WHERE extname = 'postgis'
-                ) as version
-            """)
-            result = cur.fetchone()
-            if result and result[0]:
-                return True, result[1]
-            return False, None
-    except Exception:
-        return False, None
+STATUS_BUNDLE_SQL = """
+    WITH scalars AS (
+        SELECT
+            (SELECT extversion FROM pg_extension WHERE extname = 'postgis') AS postgis_version,
+            pg_size_pretty(pg_database_size(current_database())) AS database_size
+    ),
+    tbls AS (
+        -- Tables straight from pg_class (what pg_tables lists, without the
+        -- view's extra joins); sizes by oid, not by re-resolving the name
+        SELECT
+            n.nspname AS schemaname,
+            c.relname AS tablename,
+            {size_expr} as size,
+            c.reltuples::bigint as estimated_rows,
+            -- Display strings built server-side so printing needs no formatting
+            n.nspname || '.' || c.relname AS full_name,
+            to_char(c.reltuples::bigint, 'FM9,999,999,999') AS rows_fmt,
+            -- Spatial if it has a geometry column (what geometry_columns reads)
+            {is_spatial} AS is_spatial
+        {user_tables}
+    )
+    -- One row per table, each carrying the scalars; the LEFT JOIN keeps a
+    -- single row with NULL table columns when there are no tables
+    SELECT
+        s.postgis_version,
+        -- Totals on every row, so they are known from the first one
+        COUNT(t.tablename) FILTER (WHERE t.is_spatial) OVER () AS spatial_table_count,
+        s.database_size,
+        COUNT(t.tablename) OVER () AS table_count,
+        pg_is_in_recovery() AS in_recovery,
+        t.schemaname,
+        t.tablename,
+        t.size,
+        t.estimated_rows,
+        t.full_name,
+        t.rows_fmt,
+        t.is_spatial
+    FROM scalars s
+    LEFT JOIN tbls t ON true
+    ORDER BY t.schemaname, t.tablename
+"""
+
+# Shared by the status and counts queries (c = pg_class, n = pg_namespace)
+IS_SPATIAL_EXPR = """EXISTS (
+                SELECT 1
+                FROM pg_attribute a
+                JOIN pg_type ty ON ty.oid = a.atttypid
+                WHERE a.attrelid = c.oid
+                  AND ty.typname = 'geometry'
+                  AND a.attnum > 0
+                  AND NOT a.attisdropped
+            )"""
+USER_TABLES_SQL = """FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')"""
+
+# Counts only (need_tables=False): one aggregate row in the status query's
+# column layout with NULL table columns, so no per-table size is computed
+# and no table rows are sent
+STATUS_COUNTS_SQL = """
+    SELECT
+        (SELECT extversion FROM pg_extension WHERE extname = 'postgis') AS postgis_version,
+        COUNT(*) FILTER (WHERE {is_spatial}) AS spatial_table_count,
+        pg_size_pretty(pg_database_size(current_database())) AS database_size,
+        COUNT(*) AS table_count,
+        pg_is_in_recovery() AS in_recovery,
+        NULL::name, NULL::name, NULL::text, NULL::bigint, NULL::text, NULL::text, NULL::boolean
+    {user_tables}
+"""
 
+# pg_total_relation_size walks the heap, TOAST and index forks of every
+# table; include_sizes=False (--no-sizes) selects NULL instead, and fast
+# (--fast) the heap size only
+TABLE_SIZE_EXPR = "pg_size_pretty(pg_total_relation_size(c.oid))"
+FAST_TABLE_SIZE_EXPR = "pg_size_pretty(pg_relation_size(c.oid))"
+
+
+def status_bundle_sql(include_sizes: bool = True, fast: bool = False,
+                      need_tables: bool = True) -> Tuple[str, str]:
+    """Return (statement name, SQL) of the status query variant."""
+    parts = {'is_spatial': IS_SPATIAL_EXPR, 'user_tables': USER_TABLES_SQL}
+    if not need_tables:
+        return 'status_counts', STATUS_COUNTS_SQL.format(**parts)
+    if not include_sizes:
+        return 'status_bundle_nosize', STATUS_BUNDLE_SQL.format(size_expr="NULL::text", **parts)
+    if fast:
+        return 'status_bundle_fast', STATUS_BUNDLE_SQL.format(size_expr=FAST_TABLE_SIZE_EXPR, **parts)
+    return 'status_bundle', STATUS_BUNDLE_SQL.format(size_expr=TABLE_SIZE_EXPR, **parts)
+
+
+# Rows fetched per round trip when streaming the table list
+TABLE_ITERSIZE = 500
+
+# Statement names PREPAREd per connection (prepared statements live as long
+# as the server session)
+_prepared_statements = weakref.WeakKeyDictionary()
+
+# Pool for callers that check health repeatedly (check_database_health with
+# persistent=True); created on first use for the db_params it was given
+_POOL: Optional[ThreadedConnectionPool] = None
+_POOL_KEY: Optional[Tuple] = None
+POOL_MAX_SIZE = 2
+POOL_CHECK_ATTEMPTS = 3
+
+
+def close_pool() -> None:
+    """Close all pooled connections."""
+    global _POOL, _POOL_KEY
+    if _POOL is not None:
+        _POOL.closeall()
+    _POOL = None
+    _POOL_KEY = None
+
+
+@contextmanager
+def get_conn(db_params: dict):
+    """Borrow a pooled connection for db_params; yields None if none is usable.
+
+    Each connection is checked with SELECT 1 before it is handed out; a
+    dead one is discarded and replaced, backing off between attempts.
+    On return the transaction is rolled back and the session kept.
+    The pool is psycopg2's; under psycopg 3 each call connects directly.
+    """
+    global _POOL, _POOL_KEY
+    if ThreadedConnectionPool is None:
+        with _single_connection(db_params) as conn:
+            yield conn
+        return
 
-def get_table_info(conn: psycopg2.extensions.connection) -> List[Dict]:
-    """Get list of tables with row counts."""
+    pool_key = tuple(sorted(db_params.items()))
+    conn = None
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT
-                    schemaname,
-                    tablename,
-                    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size,
-                    (SELECT reltuples::bigint
-                     FROM pg_class
-                     WHERE relname = tablename
-                     AND relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = schemaname)
-                    ) as estimated_rows
-                FROM pg_tables
-                WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
-                ORDER BY schemaname, tablename
-            """)
-            return cur.fetchall()
-    except Exception as e:
-        print(f"Advarsel: Kunne ikke hente tabellinfo: {e}", file=sys.stderr)
-        return []
+        if _POOL is None or _POOL_KEY != pool_key:
+            close_pool()
+            _POOL = ThreadedConnectionPool(
+                0, POOL_MAX_SIZE, **get_connect_kwargs(db_params, STATUS_SESSION_OPTIONS)
+            )
+            _POOL_KEY = pool_key
+
+        for attempt in range(POOL_CHECK_ATTEMPTS):
+            conn = _POOL.getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                break
+            except dbapi.Error:
+                _POOL.putconn(conn, close=True)
+                conn = None
+                time.sleep(0.1 * 2 ** attempt)
+        if conn is None:
+            print("✗ Kunne ikke koble til database: ingen brukbar tilkobling i poolen", file=sys.stderr)
+    except dbapi.Error as e:
+        print(f"✗ Kunne ikke koble til database: {e}", file=sys.stderr)
+        conn = None
+
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            if not conn.closed:
+                conn.rollback()
+            _POOL.putconn(conn, close=bool(conn.closed))
 
 
-def get_database_size(conn: psycopg2.extensions.connection) -> Optional[str]:
-    """Get database size in human-readable format."""
+@contextmanager
+def _single_connection(db_params: dict):
+    """Open a connection for one check and close it afterwards."""
+    conn = connect_db(db_params, STATUS_SESSION_OPTIONS)
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT pg_size_pretty(pg_database_size(current_database())) as size
-            """)
-            result = cur.fetchone()
-            return result[0] if result else None
-    except Exception:
-        return None
+        yield conn
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+class TableRow(NamedTuple):
+    """One table of the status query (fields named after its columns)."""
+    schemaname: str
+    tablename: str
+    size: Optional[str]
+    estimated_rows: int
+    full_name: str
+    rows_fmt: str
+    is_spatial: bool
+
 
+# Column positions in the status query's rows
+_SCALAR_COLUMNS = ('postgis_version', 'spatial_table_count', 'database_size', 'table_count',
+                   'in_recovery')
+_TABLE_START = len(_SCALAR_COLUMNS)
 
-def get_spatial_tables(conn: psycopg2.extensions.connection) -> List[str]:
-    """Get list of tables with geometry columns."""
+
+def _status_cursor(conn, name: Optional[str] = None):
+    """Cursor for the status query.
+
+    Under psycopg 3 results come in binary format, so bigint columns are
+    decoded without going through a text representation.
+    """
+    if PSYCOPG_VERSION == 3:
+        return conn.cursor(name, binary=True) if name else conn.cursor(binary=True)
+    return conn.cursor(name=name) if name else conn.cursor()
+
+
+def _report_query_error(e: Exception, message: str, errors: Optional[List[str]]) -> None:
+    """Warn about a failed status query; timeouts also go into errors."""
+    if isinstance(e, dbapi.errors.QueryCanceled):
+        print(f"Advarsel: {message}: katalogen svarer for tregt (statement_timeout). "
+              f"Kjør VACUUM ANALYZE på pg_catalog-tabellene.", file=sys.stderr)
+        if errors is not None:
+            errors.append('Status query timed out; pg_catalog may need VACUUM ANALYZE')
+    else:
+        print(f"Advarsel: {message}: {e}", file=sys.stderr)
+
+
+def _table_rows(cur, first_row, on_close=None,
+                errors: Optional[List[str]] = None) -> Iterator[TableRow]:
+    """Yield TableRows from the status query, starting with first_row."""
+    try:
+        row = first_row
+        while row is not None:
+            if row[_TABLE_START + 1] is not None:
+                yield TableRow(*row[_TABLE_START:])
+            row = cur.fetchone()
+    except Exception as e:
+        _report_query_error(e, "Kunne ikke hente tabellinfo", errors)
+    finally:
+        cur.close()
+        if on_close is not None:
+            on_close()
+
+
+def get_status_bundle(conn, prepare: bool = False,
+                      on_close=None, include_sizes: bool = True,
+                      fast: bool = False, errors: Optional[List[str]] = None,
+                      need_tables: bool = True) -> Dict:
+    """Fetch PostGIS version, table info, spatial table count and database size.
+
+    All four probes run as one statement. It returns one row per table with
+    the scalar results repeated on each; the first row is read here and
+    bundle['tables'] is a generator of TableRow over all rows (plain tuple
+    rows, no dict per row), so the table list is streamed rather than held
+    in memory. A table is spatial if pg_attribute lists a geometry column
+    for it (the source geometry_columns reads), so the query also works
+    before PostGIS is installed.
+
+    The rows come through a named (server-side) cursor, TABLE_ITERSIZE at a
+    time. With prepare=True the statement is PREPAREd on first use per
+    connection and EXECUTEd afterwards instead (a server-side cursor
+    cannot run EXECUTE); only worthwhile on a connection that is reused.
+    on_close is called once the table generator is exhausted or closed.
+    With include_sizes=False every table's size is None; fast reports heap
+    sizes only (pg_relation_size). need_tables=False runs the counts-only
+    query instead: one aggregate row and an empty table generator.
+    A query timeout (statement_timeout) is also appended to errors, even
+    when it happens while the table generator is consumed.
+    """
+    bundle = {
+        'postgis_version': None,
+        'tables': iter(()),
+        'table_count': 0,
+        'spatial_table_count': 0,
+        'database_size': None,
+        'in_recovery': False,
+    }
+    statement, sql = status_bundle_sql(include_sizes, fast, need_tables)
+    cur = None
+    try:
+        if not prepare:
+            cur = _status_cursor(conn, name='status_tables')
+            cur.itersize = TABLE_ITERSIZE
+            cur.execute(sql)
+        else:
+            cur = _status_cursor(conn)
+            # Parse and plan once per session, then only EXECUTE
+            prepared = _prepared_statements.setdefault(conn, set())
+            if statement not in prepared:
+                cur.execute(f"PREPARE {statement} AS {sql}")
+                prepared.add(statement)
+            cur.execute(f"EXECUTE {statement}")
+        first_row = cur.fetchone()
+    except Exception as e:
+        _report_query_error(e, "Kunne ikke hente databasestatus", errors)
+        if cur is not None:
+            cur.close()
+        if on_close is not None:
+            on_close()
+        return bundle
+
+    if first_row is not None:
+        bundle.update(zip(_SCALAR_COLUMNS, first_row))
+    bundle['tables'] = _table_rows(cur, first_row, on_close, errors)
+    return bundle
+
+
+# Status bundles of standbys (pg_is_in_recovery()), by connection
+# parameters and query variant: (time.monotonic() when fetched, bundle).
+# A standby's catalog only changes by replay, so polling it again within
+# STANDBY_CACHE_SECONDS costs one pg_is_in_recovery() probe; promotion
+# drops the entry.
+STANDBY_CACHE_SECONDS = 60
+_standby_bundles: Dict[Tuple, Tuple[float, Dict]] = {}
+
+
+def _cached_standby_bundle(conn, key: Tuple) -> Optional[Dict]:
+    """Return the cached bundle for key if it is fresh and conn is still a standby."""
+    cached = _standby_bundles.get(key)
+    if cached is None:
+        return None
+    fetched_at, bundle = cached
+    if time.monotonic() - fetched_at >= STANDBY_CACHE_SECONDS:
+        del _standby_bundles[key]
+        return None
     try:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT DISTINCT f_table_schema || '.' || f_table_name as table_name
-                FROM geometry_columns
-                ORDER BY table_name
-            """)
-            return [row[0] for row in cur.fetchall()]
+            cur.execute("SELECT pg_is_in_recovery()")
+            in_recovery = cur.fetchone()[0]
     except Exception:
-        return []
+        # Leave it to the status query to report the problem
+        conn.rollback()
+        return None
+    if not in_recovery:
+        # Promoted: the catalog is writable again
+        del _standby_bundles[key]
+        return None
+    return {**bundle, 'tables': iter(bundle['tables'])}
 
 
-def check_database_health(db_params: dict, min_tables: int = 1) -> Tuple[bool, Dict]:
+def check_database_health(db_params: dict, min_tables: int = 1,
+                          persistent: bool = False,
+                          stream_tables: bool = False,
+                          include_sizes: bool = True,
+                          fast: bool = False,
+                          need_tables: bool = True) -> Tuple[bool, Dict]:
     """Check database health and return status.
 
     Args:
         db_params: Database connection parameters
         min_tables: Minimum number of tables expected
+        persistent: Use a pooled connection (and its prepared status query)
+            instead of connecting per call; for callers that poll
+            repeatedly. The CLI runs once and connects directly.
+        stream_tables: Return status['tables'] as a generator that fetches
+            rows while it is consumed; the connection stays open until the
+            generator is exhausted or closed. By default it is a list.
+        include_sizes: Compute per-table sizes (pg_total_relation_size).
+            False is the fast path for monitors that only need counts.
+        fast: Report heap sizes only (pg_relation_size), without walking
+            TOAST and index forks.
+        need_tables: Fetch the per-table list. False only counts tables
+            (status['tables'] is empty); min_tables is checked the same way.
+
+    On a standby (pg_is_in_recovery()) the result is cached for
+    STANDBY_CACHE_SECONDS; calls within that time only probe
+    pg_is_in_recovery() and return the cached counts and tables.
 
     Returns:
         Tuple of (is_healthy, status_dict)
@@ -166,89 +484,140 @@ def check_database_health(db_params: dict, min_tables: int = 1) -> Tuple[bool, D
         'errors': []
     }
 
-    conn = connect_db(db_params)
+    connection = get_conn(db_params) if persistent else _single_connection(db_params)
+    stack = ExitStack()
+    conn = stack.enter_context(connection)
     if not conn:
+        stack.close()
         status['errors'].append('Database connection failed')
         return False, status
 
     status['connected'] = True
 
-    try:
-        # Check PostGIS
-        postgis_enabled, postgis_version = check_postgis(conn)
-        status['postgis_enabled'] = postgis_enabled
-        status['postgis_version'] = postgis_version
-
-        # Get table info
-        tables = get_table_info(conn)
-        status['table_count'] = len(tables)
-        status['tables'] = tables
-
-        # Get spatial tables
-        spatial_tables = get_spatial_tables(conn)
-        status['spatial_table_count'] = len(spatial_tables)
-
-        # Get database size
-        status['database_size'] = get_database_size(conn)
-
-        # Determine health
-        is_healthy = (
-            postgis_enabled and
-            status['table_count'] >= min_tables
-        )
-
-        if not postgis_enabled:
-            status['errors'].append('PostGIS extension not enabled')
-        if status['table_count'] < min_tables:
-            status['errors'].append(f'Too few tables: {status["table_count"]} < {min_tables}')
+    cache_key = (tuple(sorted(db_params.items())), include_sizes, fast, need_tables)
+    bundle = _cached_standby_bundle(conn, cache_key)
+    if bundle is not None:
+        stack.close()
+    else:
+        # PostGIS, tables, spatial tables and size in one statement
+        bundle = get_status_bundle(conn, prepare=persistent, on_close=stack.close,
+                                   include_sizes=include_sizes, fast=fast,
+                                   errors=status['errors'], need_tables=need_tables)
+        if bundle['in_recovery']:
+            # Cached with the table list materialized (no streaming on standbys)
+            tables = tuple(bundle['tables'])
+            if not status['errors']:
+                _standby_bundles[cache_key] = (time.monotonic(), {**bundle, 'tables': tables})
+            bundle['tables'] = iter(tables)
+    postgis_enabled = bundle['postgis_version'] is not None
+    status['postgis_enabled'] = postgis_enabled
+    status['postgis_version'] = bundle['postgis_version']
+    status['table_count'] = bundle['table_count']
+    status['spatial_table_count'] = bundle['spatial_table_count']
+    status['database_size'] = bundle['database_size']
+    # Consuming the generator releases the connection (on_close)
+    status['tables'] = bundle['tables'] if stream_tables else list(bundle['tables'])
+
+    # Determine health
+    is_healthy = (
+        postgis_enabled and
+        status['table_count'] >= min_tables
+    )
 
-    finally:
-        conn.close()
+    if not postgis_enabled:
+        status['errors'].append('PostGIS extension not enabled')
+    if status['table_count'] < min_tables:
+        status['errors'].append(f'Too few tables: {status["table_count"]} < {min_tables}')
 
     return is_healthy, status
 
 
-def format_status(status: Dict, database: str) -> None:
-    """Format and print database status."""
-    print(f"Database: {database}")
-    print(f"Status: {'✓ Connected' if status['connected'] else '✗ Not connected'}")
+def format_status_lines(status: Dict, database: str) -> Iterator[str]:
+    """Yield the lines of the database status report."""
+    yield f"Database: {database}"
+    yield f"Status: {'✓ Connected' if status['connected'] else '✗ Not connected'}"
 
     if not status['connected']:
         if status['errors']:
             for error in status['errors']:
-                print(f"  Error: {error}")
+                yield f"  Error: {error}"
         return
 
     # PostGIS status
     if status['postgis_enabled']:
         version = status['postgis_version'] or 'unknown'
-        print(f"PostGIS: ✓ Enabled (version {version})")
+        yield f"PostGIS: ✓ Enabled (version {version})"
     else:
-        print("PostGIS: ✗ Not enabled")
+        yield "PostGIS: ✗ Not enabled"
 
     # Table counts
-    print(f"Tables: {status['table_count']}")
+    yield f"Tables: {status['table_count']}"
     if status['spatial_table_count'] > 0:
-        print(f"Spatial tables: {status['spatial_table_count']}")
+        yield f"Spatial tables: {status['spatial_table_count']}"
 
     # Database size
     if status['database_size']:
-        print(f"Database size: {status['database_size']}")
+        yield f"Database size: {status['database_size']}"
 
-    # List tables if requested
-    if status['tables']:
-        print("\nTables:")
-        for table in status['tables']:
-            schema_table = f"{table['schemaname']}.{table['tablename']}"
-            rows = table['estimated_rows'] or 0
-            size = table['size'] or 'unknown'
-            print(f"  • {schema_table}: ~{rows:,} rows, {size}")
+    # List tables if requested (formatted as they arrive when streamed)
+    for i, table in enumerate(status['tables']):
+        if i == 0:
+            yield "\nTables:"
+        if table.size is not None:
+            yield f"  • {table.full_name}: ~{table.rows_fmt} rows, {table.size}"
+        else:
+            yield f"  • {table.full_name}: ~{table.rows_fmt} rows"
 
     # Errors
     if status['errors']:
-        print("\n⚠ Issues found:")
+        yield "\n⚠ Issues found:"
         for error in status['errors']:
-            print(f"  • {error}")
+            yield f"  • {error}"
+
+
+# Report lines per sys.stdout.write (bounded even for a streamed table list)
+STATUS_WRITE_BATCH = 1000
+
+
+def format_status(status: Dict, database: str) -> None:
+    """Format and print database status.
+
+    Lines are joined and written in batches, one write per
+    STATUS_WRITE_BATCH lines instead of one print per line.
+    """
+    batch: List[str] = []
+    for line in format_status_lines(status, database):
+        batch.append(line)
+        if len(batch) >= STATUS_WRITE_BATCH:
+            sys.stdout.write('\n'.join(batch) + '\n')
+            batch.clear()
+    if batch:
+        sys.stdout.write('\n'.join(batch) + '\n')
+
+
+def write_status_json(status: Dict, out=sys.stdout):
+    """Write status as a JSON object, one line per table.
+
+    status['tables'] may be an iterator of dicts; each row is encoded and
+    written as it is read, so the tables are never held in memory.
+    """
+    import json
+
+    out.write('{')
+    for i, (key, value) in enumerate(status.items()):
+        out.write(',\n  ' if i else '\n  ')
+        out.write(json.dumps(key) + ': ')
+        if key == 'tables':
+            out.write('[')
+            separator = '\n    '
+            for row in value:
+                out.write(separator + json.dumps(row, default=str))
+                separator = ',\n    '
+            # An empty array stays on one line: []
+            out.write(']' if separator == '\n    ' else '\n  ]')
+        else:
+            out.write(json.dumps(value, indent=2, default=str).replace('\n', '\n  '))
+    out.write('\n}\n')
 
 
 def main():
@@ -262,22 +631,39 @@ def main():
                        help='Minimum number of tables expected (default: 1)')
     parser.add_argument('--json', action='store_true',
                        help='Output as JSON')
+    parser.add_argument('--no-sizes', action='store_true',
+                       help='Skip per-table sizes (fast path for cron monitors)')
+    parser.add_argument('--fast', action='store_true',
+                       help='Report heap-only table sizes (skips TOAST and indexes)')
+    parser.add_argument('--counts-only', '--no-list', dest='counts_only', action='store_true',
+                       help='Only count tables; skips the per-table size/rows query')
 
     args = parser.parse_args()
 
-    db_params = get_db_connection_params()
+    db_params = dict(get_db_connection_params())
     if args.database:
         db_params['database'] = args.database
     elif not db_params['database']:
         print("Feil: Database name må angis eller settes via PGDATABASE", file=sys.stderr)
         sys.exit(1)
 
-    is_healthy, status = check_database_health(db_params, args.min_tables)
+    is_healthy, status = check_database_health(
+        db_params, args.min_tables, stream_tables=True, include_sizes=not args.no_sizes,
+        fast=args.fast, need_tables=not args.counts_only,
+    )
 
-    if args.json:
-        import json
+    if args.json and orjson is not None:
+        # orjson serializes in C but needs the whole list; every value in
+        # status is a plain str/int/bool/None/list/dict
+        status['healthy'] = is_healthy
+        status['tables'] = [table._asdict() for table in status['tables']]
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(status, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        sys.stdout.buffer.flush()
+    elif args.json:
         status['healthy'] = is_healthy
-        print(json.dumps(status, indent=2, default=str))
+        status['tables'] = (table._asdict() for table in status['tables'])
+        write_status_json(status)
     else:
         format_status(status, db_params['database'])
 
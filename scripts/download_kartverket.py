@@ -62,30 +62,54 @@ Environment variables:
                     Default: "Norge" (landsdekkende/nationwide)
     AREA_TYPE     - Filter by area type (optional, e.g., "Fylke", "Kommune")
                     Default: empty (matches any type)
+    KV_WORKERS    - Files downloaded in parallel per dataset (default: 4, max 4)
 """
 
 import os
 import sys
 import argparse
-import urllib.request
+import functools
+import json
+import re
+import shutil
+import tempfile
 import urllib.parse
-import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, Any
+from types import MappingProxyType
+from typing import List, Optional, Tuple, Dict, Any, Iterable, Iterator, Mapping, NamedTuple, Sequence, Set, Callable, AbstractSet
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
-# Try to import yaml for config file support
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# lxml parses in C and keeps the tree out of Python objects; the stdlib
+# ElementTree is the fallback (both offer iterparse/find/findall)
+try:
+    from lxml import etree as ET
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_AVAILABLE = False
+
+# tqdm draws rate-limited progress bars; without it progress is printed
+# every PROGRESS_INTERVAL bytes
 try:
-    import yaml
-    YAML_AVAILABLE = True
+    from tqdm.auto import tqdm
 except ImportError:
-    YAML_AVAILABLE = False
+    tqdm = None
 
 
 # Master catalog feed that lists all available datasets
 TJENESTEFEED_URL = "https://nedlasting.geonorge.no/geonorge/Tjenestefeed.xml"
 
+# Local copy of the catalog feed, revalidated with its ETag/Last-Modified
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'stiflyt-db'
+
 # Default dataset configurations (can be overridden by discovery)
 DATASET_FEEDS: Dict[str, str] = {
     'teig': 'http://nedlasting.geonorge.no/fmedatastreaming/ATOM-feeds/MatrikkelenEiendomskartTeig_AtomFeedPostGIS.fmw?token=13f1a2e9c53d2ba77b527954b767e563213aaf3b',
@@ -107,25 +131,141 @@ DEFAULT_OUTPUT_DIRS: Dict[str, str] = {
     'turrutebasen': './data/turrutebasen',
     'stedsnavn': './data/stedsnavn',
 }
+
+
+def _make_session() -> requests.Session:
+    """HTTP session shared by all requests, so connections to the Geonorge
+    hosts are kept alive and reused instead of reconnecting (TCP + TLS) for
+    every feed, HEAD and download. Connection-level failures and 502/503/504
+    are retried with backoff."""
+    session = requests.Session()
+    session.headers['User-Agent'] = 'Mozilla/5.0'
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,  # Parallel batch downloads share the pool
+        max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_SESSION = _make_session()
+
 NAMESPACES = {
     'atom': 'http://www.w3.org/2005/Atom',
     'georss': 'http://www.georss.org/georss',
     'gml': 'http://www.opengis.net/gml'
 }
+# Clark-notation ({namespace}tag) names of the ATOM elements read per
+# entry; matched directly, without prefix lookups in NAMESPACES
+_ATOM = f"{{{NAMESPACES['atom']}}}"
+_T_ENTRY = f"{_ATOM}entry"
+_T_TITLE = f"{_ATOM}title"
+_T_CATEGORY = f"{_ATOM}category"
+_T_LINK = f"{_ATOM}link"
+_T_UPDATED = f"{_ATOM}updated"
+
+
+def iter_feed_entries(source) -> Iterator[ET.Element]:
+    """Stream the <entry> elements of an ATOM feed.
+
+    Parses source (a file or HTTP response) incrementally; each entry is
+    cleared once the caller moves on, and dropped from the root, so only
+    one entry is held in memory instead of the whole feed.
+    """
+    if LXML_AVAILABLE:
+        # lxml filters on the tag itself; earlier siblings are deleted so
+        # the parent does not keep cleared entries
+        for _, elem in ET.iterparse(source, events=('end',), tag=_T_ENTRY,
+                                    huge_tree=True, remove_blank_text=True):
+            yield elem
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+        return
+
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+        elif event == 'end' and elem.tag == _T_ENTRY:
+            yield elem
+            elem.clear()
+            root.clear()
+
+
+def _get_catalog_xml() -> Path:
+    """Return the path of an up-to-date copy of Tjenestefeed.xml.
+
+    The feed is cached in CACHE_DIR together with the server's ETag and
+    Last-Modified, and revalidated with a conditional GET; on 304 Not
+    Modified the cached copy is used as is. If the server cannot be reached
+    an existing copy is used with a warning.
+    """
+    xml_path = CACHE_DIR / 'tjenestefeed.xml'
+    meta_path = CACHE_DIR / 'tjenestefeed.meta.json'
+
+    headers = {}
+    if xml_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = _SESSION.get(TJENESTEFEED_URL, headers=headers, timeout=30, stream=True)
+    except requests.RequestException as e:
+        if not xml_path.exists():
+            raise
+        _say(f"Advarsel: Bruker lagret katalogfeed ({e})", file=sys.stderr)
+        return xml_path
+
+    with response:
+        if response.status_code == 304:
+            return xml_path
+        response.raise_for_status()
+        response.raw.decode_content = True
+
+        # Written under a unique name and renamed, so parallel batch
+        # downloads never read a partial catalog
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.part', delete=False) as tmp:
+            try:
+                shutil.copyfileobj(response.raw, tmp, 1024 * 1024)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, xml_path)
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        meta_path.write_text(json.dumps(meta), encoding='utf-8')
+
+    return xml_path
 
 
 def discover_feeds_from_catalog(
     dataset_name: Optional[str] = None,
-    format_preference: Optional[List[str]] = None
-) -> Dict[str, Tuple[str, str]]:
+    format_preference: Optional[Sequence[str]] = None
+) -> Mapping[str, Tuple[str, str]]:
     """Discover ATOM feed URLs from Tjenestefeed.xml catalog.
 
+    Results are memoized per (dataset name, format preference) for the
+    life of the process, as a read-only mapping; failures are not cached.
+
     Args:
         dataset_name: Optional dataset name to search for (case-insensitive partial match)
         format_preference: List of format preferences (e.g., ['PostGIS', 'FGDB'])
 
     Returns:
-        Dictionary mapping dataset titles to (feed_url, format_type) tuples
+        Mapping of dataset titles to (feed_url, format_type) tuples
     """
     if format_preference is None:
         if dataset_name:
@@ -136,51 +276,120 @@ def discover_feeds_from_catalog(
         else:
             format_preference = DATASET_FORMAT_PREFERENCE.get('default', ['PostGIS', 'FGDB', 'GML'])
 
+    dataset_name_lower = dataset_name.lower() if dataset_name else None
     try:
-        req = urllib.request.Request(TJENESTEFEED_URL)
-        with urllib.request.urlopen(req, timeout=30) as response:
-            xml_data = response.read()
-        root = ET.fromstring(xml_data)
+        return _discover_feeds(dataset_name_lower, tuple(format_preference))
     except Exception as e:
-        print(f"Advarsel: Kunne ikke hente katalogfeed: {e}", file=sys.stderr)
+        _say(f"Advarsel: Kunne ikke hente katalogfeed: {e}", file=sys.stderr)
         return {}
 
-    feeds = {}
-    dataset_name_lower = dataset_name.lower() if dataset_name else None
 
-    for entry in root.findall('.//atom:entry', NAMESPACES):
-        title_elem = entry.find('.//atom:title', NAMESPACES)
-        title = title_elem.text if title_elem is not None else ""
+@functools.lru_cache(maxsize=32)
+def _discover_feeds(
+    dataset_name_lower: Optional[str],
+    format_preference: Tuple[str, ...]
+) -> Mapping[str, Tuple[str, str]]:
+    """Look up feeds for discover_feeds_from_catalog (memoized; raises on failure)."""
+    index = _catalog_index(format_preference)
+    if not dataset_name_lower:
+        return MappingProxyType(index.feeds)
+    return MappingProxyType({
+        title: index.feeds[title] for title in _match_titles(index, dataset_name_lower)
+    })
 
-        # Filter by dataset name if provided
-        if dataset_name_lower and dataset_name_lower not in title.lower():
-            continue
 
-        # Find alternate link (the actual feed URL)
-        for link in entry.findall('.//atom:link[@rel="alternate"]', NAMESPACES):
-            href = link.get('href', '')
-            if not href:
-                continue
+class _CatalogIndex(NamedTuple):
+    """Catalog feeds with a normalized-title index for name lookups."""
+    feeds: Dict[str, Tuple[str, str]]  # title -> (feed_url, format_type), catalog order
+    titles: List[str]                  # Titles in catalog order
+    keys: List[str]                    # Normalized titles, parallel to titles
+    trigrams: Dict[str, Set[int]]      # Trigram -> positions of the keys containing it
 
-            # Determine format from URL or title
-            format_type = None
-            for fmt in format_preference:
-                if fmt.upper() in href.upper() or fmt.upper() in title.upper():
-                    format_type = fmt
-                    break
 
-            if format_type:
-                # Use first match for each title (preferred format)
-                if title not in feeds:
-                    feeds[title] = (href, format_type)
-                else:
-                    # Prefer formats earlier in preference list
-                    current_format = feeds[title][1]
-                    if format_preference.index(format_type) < format_preference.index(current_format):
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def _normalize_title(text: str) -> str:
+    """Lowercase, with punctuation and whitespace runs collapsed to one space."""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def _trigrams(key: str) -> Set[str]:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _match_titles(index: _CatalogIndex, query: str) -> List[str]:
+    """Titles containing query (after normalization), in catalog order.
+
+    The trigram index narrows the candidates to titles sharing every
+    trigram of the query; only those are checked for the substring.
+    """
+    key = _normalize_title(query)
+    grams = _trigrams(key)
+    if grams:
+        postings = sorted((index.trigrams.get(gram, set()) for gram in grams), key=len)
+        positions = sorted(set.intersection(*postings))
+    else:
+        positions = range(len(index.titles))
+    return [index.titles[i] for i in positions if key in index.keys[i]]
+
+
+@functools.lru_cache(maxsize=8)
+def _catalog_index(format_preference: Tuple[str, ...]) -> _CatalogIndex:
+    """Scan the whole catalog once per format preference and index it."""
+    feeds: Dict[str, Tuple[str, str]] = {}
+    preference_upper = [(fmt, fmt.upper()) for fmt in format_preference]
+    with open(_get_catalog_xml(), 'rb') as catalog:
+        # The same title can reappear later in another format, so the
+        # whole feed is read
+        for entry in iter_feed_entries(catalog):
+            title = entry.findtext(_T_TITLE, "")
+            title_upper = title.upper()
+
+            # Find alternate link (the actual feed URL)
+            for link in entry.iterfind(_T_LINK):
+                href = link.get('href', '')
+                if not href or link.get('rel') != 'alternate':
+                    continue
+
+                # Determine format from URL or title
+                href_upper = href.upper()
+                format_type = None
+                for fmt, fmt_upper in preference_upper:
+                    if fmt_upper in href_upper or fmt_upper in title_upper:
+                        format_type = fmt
+                        break
+
+                if format_type:
+                    # Use first match for each title (preferred format)
+                    if title not in feeds:
                         feeds[title] = (href, format_type)
-                break
+                    else:
+                        # Prefer formats earlier in preference list
+                        current_format = feeds[title][1]
+                        if format_preference.index(format_type) < format_preference.index(current_format):
+                            feeds[title] = (href, format_type)
+                    break
+
+    titles = list(feeds)
+    keys = [_normalize_title(title) for title in titles]
+    trigrams: Dict[str, Set[int]] = {}
+    for position, key in enumerate(keys):
+        for gram in _trigrams(key):
+            trigrams.setdefault(gram, set()).add(position)
+    return _CatalogIndex(feeds, titles, keys, trigrams)
+
+
+def _discover_cache_clear() -> None:
+    """Forget memoized catalog lookups (for tests and long-running callers)."""
+    _discover_feeds.cache_clear()
+    _catalog_index.cache_clear()
+
 
-    return feeds
+# Category labels of area types, and the EPSG labels that are not area names
+_AREA_TYPE_TOKENS = ('Fylke', 'Kommune', 'Grunnkrets')
+_AREA_TYPE_RE = re.compile('|'.join(map(re.escape, _AREA_TYPE_TOKENS)))
+_EPSG_LABELS = frozenset({'EPSG/0/25832', 'EPSG/0/25833', 'EPSG/0/25835'})
 
 
 def list_dataset_download_options(
@@ -205,27 +414,25 @@ def list_dataset_download_options(
     print(f"  ✓ Fant: {title} ({format_type} format)")
     print(f"\n==> Henter nedlastingsalternativer fra feed...")
 
-    # Fetch the dataset's ATOM feed
+    # Collect EPSG codes, area types, and sample URLs while the feed streams
+    all_count = 0
+    norge_count = 0
+    filtered_count = 0
+    epsg_codes = set()
+    area_types = set()
+    area_names = set()
+    sample_urls = []
+    norge_epsg_codes = set()
+
     try:
-        root = fetch_atom_feed(feed_url)
+        entries = fetch_atom_feed(feed_url)
     except Exception as e:
         print(f"Feil: Kunne ikke hente feed: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Extract information from entries
-    all_entries = root.findall('.//atom:entry', NAMESPACES)
-
-    if not all_entries:
-        print("  Ingen nedlastingsalternativer funnet i feeden.")
-        return
-
-    # Filter for Norge-only entries if requested
-    entries = []
-    norge_entries = []
-
-    for entry in all_entries:
-        title_elem = entry.find('.//atom:title', NAMESPACES)
-        title_text = title_elem.text if title_elem is not None else ""
+    for entry in entries:
+        all_count += 1
+        title_text = entry.findtext(_T_TITLE, "")
 
         # Check if this is a Norge (nationwide) entry
         is_norge = (
@@ -233,69 +440,59 @@ def list_dataset_download_options(
             "norge" in title_text.lower() or
             any("/0000_Norge_" in link.get('href', '') or
                 "Basisdata_0000_Norge" in link.get('href', '')
-                for link in entry.findall('.//atom:link', NAMESPACES))
+                for link in entry.iterfind(_T_LINK))
         )
 
         if is_norge:
-            norge_entries.append(entry)
-
-        if not norge_only or is_norge:
-            entries.append(entry)
+            norge_count += 1
 
-    if norge_only and not norge_entries:
-        print("  Ingen landsdekkende (Norge) filer funnet i feeden.")
-        return
-
-    # Collect EPSG codes, area types, and sample URLs
-    epsg_codes = set()
-    area_types = set()
-    area_names = set()
-    sample_urls = []
-    norge_epsg_codes = set()
+        # Filter for Norge-only entries if requested
+        if norge_only and not is_norge:
+            continue
+        filtered_count += 1
 
-    for entry in entries:
         # Extract EPSG codes
-        categories = entry.findall('.//atom:category', NAMESPACES)
-        for category in categories:
+        for category in entry.iterfind(_T_CATEGORY):
             term = category.get('term', '')
             if term.startswith('EPSG:'):
                 epsg_codes.add(term)
                 # Track EPSG codes for Norge entries
-                title_elem = entry.find('.//atom:title', NAMESPACES)
-                title_text = title_elem.text if title_elem is not None else ""
                 if "landsdekkende" in title_text.lower() or "norge" in title_text.lower():
                     norge_epsg_codes.add(term)
             label = category.get('label', '')
             if label:
                 # Try to identify area types (Fylke, Kommune, etc.)
-                if any(t in label for t in ['Fylke', 'Kommune', 'Grunnkrets']):
+                if _AREA_TYPE_RE.search(label):
                     area_types.add(label)
                 # Collect area names
-                if label and label not in ['EPSG/0/25832', 'EPSG/0/25833', 'EPSG/0/25835']:
+                if label not in _EPSG_LABELS:
                     area_names.add(label)
 
         # Extract download URL
-        for link in entry.findall('.//atom:link', NAMESPACES):
+        for link in entry.iterfind(_T_LINK):
             if link.get('rel') == 'alternate':
                 url = link.get('href', '')
                 if url and len(sample_urls) < 3:
                     sample_urls.append(url)
                 break
 
-        # Extract title for area names
-        title_elem = entry.find('.//atom:title', NAMESPACES)
-        if title_elem is not None:
-            title_text = title_elem.text or ""
-            # Look for area names in title
-            if 'Norge' in title_text:
-                area_names.add('Norge')
+        # Look for area names in title
+        if 'Norge' in title_text:
+            area_names.add('Norge')
+
+    if not all_count:
+        print("  Ingen nedlastingsalternativer funnet i feeden.")
+        return
+
+    if norge_only and not norge_count:
+        print("  Ingen landsdekkende (Norge) filer funnet i feeden.")
+        return
 
     # Display results
     filter_note = " (kun landsdekkende/Norge)" if norge_only else ""
     print(f"\n=== Nedlastingsalternativer for {title}{filter_note} ===\n")
 
-    total_count = len(norge_entries) if norge_only else len(all_entries)
-    filtered_count = len(entries)
+    total_count = norge_count if norge_only else all_count
     print(f"Totalt antall filer i feeden: {total_count}")
     if norge_only:
         print(f"Filtrert til landsdekkende filer: {filtered_count}")
@@ -328,8 +525,7 @@ def list_dataset_download_options(
     if sample_urls:
         print("Eksempel på nedlastings-URLer:")
         for i, url in enumerate(sample_urls, 1):
-            filename = os.path.basename(urllib.parse.urlparse(url).path)
-            print(f"  {i}. {filename}")
+            print(f"  {i}. {url_filename(url)}")
             print(f"     {url[:80]}..." if len(url) > 80 else f"     {url}")
         print()
 
@@ -410,118 +606,181 @@ def list_available_datasets(
         print()
 
 
-def fetch_atom_feed(url: str) -> ET.Element:
-    """Fetch and parse the ATOM feed."""
+def _open_stream(url: str) -> requests.Response:
+    """GET url on the shared session, body not yet read (response.raw).
+
+    The body is decoded (gzip/deflate) while it is read from response.raw.
+    """
+    response = _SESSION.get(url, timeout=30, stream=True)
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+    response.raw.decode_content = True
+    return response
+
+
+def fetch_atom_feed(url: str) -> Iterator[ET.Element]:
+    """Open the ATOM feed and stream its entries (see iter_feed_entries).
+
+    The connection stays open until the returned iterator is exhausted.
+    """
     print("==> Henter ATOM feed fra Kartverket ...")
     try:
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=30) as response:
-            xml_data = response.read()
-        root = ET.fromstring(xml_data)
-        print("  ✓ ATOM feed hentet")
-        return root
+        response = _open_stream(url)
     except Exception as e:
         print(f"Feil: Kunne ikke hente ATOM feed fra {url}: {e}", file=sys.stderr)
         sys.exit(1)
+    print("  ✓ ATOM feed hentet")
+    return _stream_feed(response, url)
+
+
+def _stream_feed(response, url: str) -> Iterator[ET.Element]:
+    """Yield the entries of an open feed response, closing it afterwards."""
+    with response:
+        try:
+            yield from iter_feed_entries(response.raw)
+        except ET.ParseError as e:
+            _say(f"Feil: Kunne ikke parse ATOM feed fra {url}: {e}", file=sys.stderr)
+            sys.exit(1)
+        # The body is read while iterating, so a timeout or reset mid-feed
+        # surfaces here rather than in fetch_atom_feed
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            _say(f"Feil: Kunne ikke hente ATOM feed fra {url}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+def url_filename(url: str) -> str:
+    """Last path segment of url, without query or fragment.
+
+    Split by hand; urlparse is only needed for URLs without a path.
+    """
+    path = url.split('?', 1)[0].split('#', 1)[0]
+    head, _, name = path.rpartition('/')
+    if not head or head.endswith(':/'):
+        return os.path.basename(urllib.parse.urlparse(url).path)
+    return name
+
+
+def _make_area_predicate(
+    area_filter: Optional[str],
+    area_type: Optional[str]
+) -> Optional[Callable[[ET.Element, List[ET.Element], str], bool]]:
+    """Build the area test of extract_download_urls for one filter.
+
+    Returns None without an area filter, otherwise a function
+    (entry, categories, download_url) -> bool. The filter strings are
+    lowercased once here rather than per entry.
+    """
+    if not area_filter:
+        return None
+
+    type_needle = area_type.lower() if area_type else None
+
+    def type_matches(categories: List[ET.Element]) -> bool:
+        return type_needle is None or any(
+            type_needle in cat.get('label', '').lower() for cat in categories
+        )
+
+    if area_filter == "Norge":
+        # Only the nationwide entry: "0000_Norge" in the URL (the
+        # nationwide code) or "Landsdekkende" in the title
+        def matches(entry: ET.Element, categories: List[ET.Element], download_url: str) -> bool:
+            is_nationwide = (
+                "/0000_Norge_" in download_url or
+                "Basisdata_0000_Norge" in download_url or
+                "landsdekkende" in entry.findtext(_T_TITLE, "").lower()
+            )
+            return is_nationwide and type_matches(categories)
+        return matches
+
+    needle = area_filter.lower()
+
+    def matches(entry: ET.Element, categories: List[ET.Element], download_url: str) -> bool:
+        # The filter text in the title or category labels, or the URL as fallback
+        if needle not in download_url.lower():
+            title = entry.findtext(_T_TITLE, "")
+            all_text = f"{title} {' '.join(cat.get('label', '') for cat in categories)}"
+            if needle not in all_text.lower():
+                return False
+        return type_matches(categories)
+    return matches
 
 
 def extract_download_urls(
-    root: ET.Element,
+    entries: Iterable[ET.Element],
     utm_zone: str,
     area_filter: Optional[str] = None,
-    area_type: Optional[str] = None
-) -> List[Tuple[str, Optional[str]]]:
+    area_type: Optional[str] = None,
+    available_epsg: Optional[Set[str]] = None
+) -> List[Tuple[str, Optional[str], str]]:
     """Extract download URLs and their last updated timestamps from ATOM feed.
 
+    Args:
+        entries: Feed entries (e.g. streamed by fetch_atom_feed)
+        available_epsg: If given, every EPSG code seen in the feed is added
+
     Returns:
-        List of (url, updated_timestamp) tuples
+        List of (url, updated_timestamp, filename) tuples; filename is the
+        last path segment of the URL ('' if it has none)
     """
-    urls = []
-
-    # Find all entries
-    entries = root.findall('.//atom:entry', NAMESPACES)
+    # URL -> feed timestamp; the first entry listing a URL wins
+    urls: Dict[str, Optional[str]] = {}
+    target_epsg = f'EPSG:{utm_zone}'
+    area_matches = _make_area_predicate(area_filter, area_type)
 
     for entry in entries:
         # Check if entry has the EPSG code we want
-        categories = entry.findall('.//atom:category', NAMESPACES)
+        categories = entry.findall(_T_CATEGORY)
         has_epsg = False
 
         for category in categories:
             term = category.get('term', '')
-            if term == f'EPSG:{utm_zone}':
+            if available_epsg is not None and term.startswith('EPSG:'):
+                available_epsg.add(term)
+            if term == target_epsg:
                 has_epsg = True
-                break
+                if available_epsg is None:
+                    break
 
         if not has_epsg:
             continue
 
         # Get the link with rel="alternate"
-        links = entry.findall('.//atom:link', NAMESPACES)
         download_url = None
 
-        for link in links:
+        for link in entry.iterfind(_T_LINK):
             if link.get('rel') == 'alternate':
                 download_url = link.get('href')
                 break
 
-        if not download_url:
+        if not download_url or download_url in urls:
             continue
 
         # Apply area filter if specified
-        if area_filter:
-            # Get title and categories for matching
-            title_elem = entry.find('.//atom:title', NAMESPACES)
-            title = title_elem.text if title_elem is not None else ""
-
-            category_labels = [cat.get('label', '') for cat in categories]
-            all_text = f"{title} {' '.join(category_labels)}"
-
-            # Special handling for "Norge" - only match the nationwide entry
-            if area_filter == "Norge":
-                # Check if this is the nationwide entry
-                # Must have "0000_Norge" in URL (the nationwide code) OR title contains "Landsdekkende"
-                is_nationwide = (
-                    "landsdekkende" in title.lower() or
-                    "/0000_Norge_" in download_url or
-                    "Basisdata_0000_Norge" in download_url
-                )
-                if not is_nationwide:
-                    continue
-            else:
-                # For other area filters, check if the filter text appears
-                if area_filter.lower() not in all_text.lower():
-                    # Also check URL as fallback
-                    if area_filter.lower() not in download_url.lower():
-                        continue
-
-            # Check area type if specified
-            if area_type:
-                if not any(area_type.lower() in label.lower() for label in category_labels):
-                    continue
+        if area_matches is not None and not area_matches(entry, categories, download_url):
+            continue
 
         # Get updated timestamp from entry
-        updated_elem = entry.find('.//atom:updated', NAMESPACES)
-        updated_timestamp = updated_elem.text if updated_elem is not None else None
-
-        urls.append((download_url, updated_timestamp))
+        updated_timestamp = entry.findtext(_T_UPDATED)
 
-    # Remove duplicates (keep first occurrence) and sort by URL
-    seen = set()
-    unique_urls = []
-    for url, timestamp in urls:
-        if url not in seen:
-            seen.add(url)
-            unique_urls.append((url, timestamp))
+        urls[download_url] = updated_timestamp
 
-    return sorted(unique_urls, key=lambda x: x[0])  # Sort by URL
+    # Sort by URL
+    return [(url, timestamp, url_filename(url)) for url, timestamp in sorted(urls.items())]
 
 
+@functools.lru_cache(maxsize=1024)
 def parse_iso_timestamp(timestamp_str: Optional[str]) -> Optional[float]:
-    """Parse ISO 8601 timestamp to Unix timestamp."""
+    """Parse ISO 8601 timestamp to Unix timestamp.
+
+    Memoized: the tiles of a dataset mostly share a handful of feed
+    timestamps.
+    """
     if not timestamp_str:
         return None
     try:
-        from datetime import datetime
         # Handle ISO 8601 format with timezone
         dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
         return dt.timestamp()
@@ -529,19 +788,99 @@ def parse_iso_timestamp(timestamp_str: Optional[str]) -> Optional[float]:
         return None
 
 
+def _meta_path(file_path: Path) -> Path:
+    """Sidecar written next to a completed download (<filename>.meta.json)."""
+    return file_path.with_name(file_path.name + '.meta.json')
+
+
+def _drop_page_cache(file_path: Path) -> None:
+    """Flush file_path to disk and advise the kernel to drop its cached pages.
+
+    DONTNEED only evicts clean pages, hence the fdatasync first. Best
+    effort: a no-op where posix_fadvise is missing (macOS, Windows).
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _part_path(file_path: Path) -> Path:
+    """Where download_file writes until the download is complete (<filename>.part)."""
+    return file_path.with_name(file_path.name + '.part')
+
+
+def _write_part_meta(part_path: Path, response) -> None:
+    """Record which version of the file a new .part holds, for If-Range.
+
+    If-Range needs a strong ETag; a weak one falls back to Last-Modified.
+    Without either the sidecar is removed and a resume is checked deeply.
+    """
+    etag = response.headers.get('ETag')
+    if_range = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+    if if_range:
+        _meta_path(part_path).write_text(json.dumps({'if_range': if_range}), encoding='utf-8')
+    else:
+        _meta_path(part_path).unlink(missing_ok=True)
+
+
+def _read_part_if_range(part_path: Path) -> Optional[str]:
+    """If-Range validator recorded by _write_part_meta, or None."""
+    try:
+        return json.loads(_meta_path(part_path).read_text(encoding='utf-8')).get('if_range')
+    except (OSError, ValueError):
+        return None
+
+
+def _discard_part(part_path: Path) -> None:
+    """Delete a .part file and its sidecar."""
+    part_path.unlink(missing_ok=True)
+    _meta_path(part_path).unlink(missing_ok=True)
+
+
+def _write_download_meta(file_path: Path, response, feed_updated: Optional[str]) -> None:
+    """Record size, validators and feed timestamp of a completed download."""
+    meta = {
+        'size': file_path.stat().st_size,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'feed_updated': feed_updated,
+    }
+    _meta_path(file_path).write_text(json.dumps(meta), encoding='utf-8')
+
+
 def verify_existing_file(url: str, file_path: Path, feed_updated: Optional[str] = None) -> Tuple[bool, Optional[int], bool]:
     """Verify if an existing file is complete and matches server size.
 
+    If the file's sidecar (written by download_file) records the same feed
+    timestamp and the file still has the recorded size, it is checked
+    locally and no HEAD request is made, unless --force-verify is given.
+
     Returns:
-        (is_valid, expected_size) - is_valid indicates if file is complete,
+        (is_valid, expected_size, is_up_to_date) - is_valid indicates if file is complete,
                                      expected_size is the server's file size or None
     """
+    if feed_updated and not FORCE_VERIFY:
+        try:
+            meta = json.loads(_meta_path(file_path).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            meta = None
+        if (meta and meta.get('feed_updated') == feed_updated
+                and meta.get('size') == file_path.stat().st_size
+                and check_zip_integrity(file_path)):
+            return (True, meta['size'], True)
+
     try:
         # Make a HEAD request to get file size without downloading
-        req = urllib.request.Request(url, method='HEAD')
-        req.add_header('User-Agent', 'Mozilla/5.0')
-
-        with urllib.request.urlopen(req, timeout=30) as response:
+        with _SESSION.head(url, timeout=30, allow_redirects=True) as response:
+            response.raise_for_status()
             content_length = response.headers.get('Content-Length')
             expected_size = int(content_length) if content_length else None
 
@@ -551,13 +890,7 @@ def verify_existing_file(url: str, file_path: Path, feed_updated: Optional[str]
                     # Size matches, verify it's a valid ZIP
                     if check_zip_integrity(file_path):
                         # Check if file is up to date with feed
-                        is_up_to_date = True
-                        if feed_updated:
-                            feed_timestamp = parse_iso_timestamp(feed_updated)
-                            file_timestamp = file_path.stat().st_mtime
-                            if feed_timestamp and feed_timestamp > file_timestamp:
-                                is_up_to_date = False
-                        return (True, expected_size, is_up_to_date)
+                        return (True, expected_size, not _is_stale(file_path, feed_updated))
                     else:
                         return (False, expected_size, False)  # Size matches but ZIP is invalid
                 else:
@@ -565,12 +898,7 @@ def verify_existing_file(url: str, file_path: Path, feed_updated: Optional[str]
             else:
                 # No Content-Length header, just check if ZIP is valid
                 is_valid = check_zip_integrity(file_path)
-                is_up_to_date = True
-                if feed_updated and is_valid:
-                    feed_timestamp = parse_iso_timestamp(feed_updated)
-                    file_timestamp = file_path.stat().st_mtime
-                    if feed_timestamp and feed_timestamp > file_timestamp:
-                        is_up_to_date = False
+                is_up_to_date = is_valid and not _is_stale(file_path, feed_updated)
                 return (is_valid, None, is_up_to_date)
 
     except Exception:
@@ -578,125 +906,367 @@ def verify_existing_file(url: str, file_path: Path, feed_updated: Optional[str]
         return (False, None, False)
 
 
-def check_zip_integrity(zip_path: Path) -> bool:
-    """Check if ZIP file appears to be complete."""
+def _is_stale(file_path: Path, feed_updated: Optional[str]) -> bool:
+    """True if the feed entry was updated after file_path was last written."""
+    feed_timestamp = parse_iso_timestamp(feed_updated)
+    return bool(feed_timestamp and feed_timestamp > file_path.stat().st_mtime)
+
+
+# Set by --deep-verify: check_zip_integrity also CRC-checks every member
+DEEP_VERIFY = False
+
+# Set by --force-verify: verify_existing_file always asks the server (HEAD)
+FORCE_VERIFY = False
+
+# Set by --drop-cache: completed downloads are evicted from the page cache
+DROP_CACHE = False
+
+
+def check_zip_integrity(zip_path: Path, deep: Optional[bool] = None) -> bool:
+    """Check if ZIP file appears to be complete.
+
+    zipfile locates the end-of-central-directory record (scanning back over
+    an archive comment, and following the ZIP64 locator for large files)
+    and reads the central directory; a truncated download fails that. This
+    reads the directory only, not the members. With deep (default:
+    DEEP_VERIFY) every member is also read and CRC-checked (testzip).
+    """
     if zip_path.stat().st_size == 0:
         return False
 
-    # Try to read the end of the file for ZIP signature
+    if deep is None:
+        deep = DEEP_VERIFY
     try:
-        with open(zip_path, 'rb') as f:
-            f.seek(-22, 2)  # ZIP end-of-central-directory is typically last 22 bytes
-            end_bytes = f.read()
-            # Check for ZIP end-of-central-directory signature (0x06054b50)
-            if b'PK\x05\x06' in end_bytes:
-                return True
-    except Exception:
-        pass
+        with zipfile.ZipFile(zip_path) as zf:
+            if deep:
+                return zf.testzip() is None
+            return bool(zf.infolist())
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+# Bytes per read/write when copying a download to disk
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Bytes between progress lines
+PROGRESS_INTERVAL = 50 * 1024 * 1024
+
+
+# Set when the user interrupts (Ctrl-C) process_download_urls: downloads
+# running in worker threads stop at their next read
+_CANCEL = threading.Event()
+
+
+class DownloadCancelled(Exception):
+    """Raised by _CancellableReader once _CANCEL is set."""
+
+
+class _CancellableReader:
+    """Read-through wrapper that stops a download when _CANCEL is set."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        if _CANCEL.is_set():
+            raise DownloadCancelled()
+        return self.raw.read(size)
+
 
-    return False
+class _ProgressReader:
+    """Read-through wrapper that shows download progress.
 
+    Updates a tqdm bar (which limits its own redraw rate) when tqdm is
+    installed; otherwise prints a line every PROGRESS_INTERVAL bytes.
+    close() ends the bar or the progress line.
+    """
 
-def download_file(url: str, output_path: Path, max_retries: int = 3) -> bool:
-    """Download a file from URL to output path using streaming with progress and retries."""
+    def __init__(self, raw, total_size: Optional[int], downloaded: int = 0, desc: Optional[str] = None):
+        self.raw = raw
+        self.total_size = total_size
+        self.downloaded = downloaded
+        self.next_report = downloaded + PROGRESS_INTERVAL
+        self.bar = None
+        if tqdm is not None:
+            self.bar = tqdm(total=total_size, initial=downloaded, unit='B', unit_scale=True,
+                            unit_divisor=1024, mininterval=0.5, desc=desc, leave=False)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.downloaded += len(data)
+        if self.bar is not None:
+            self.bar.update(len(data))
+        elif self.downloaded >= self.next_report:
+            self.next_report = self.downloaded + PROGRESS_INTERVAL
+            if self.total_size:
+                percent = (self.downloaded / self.total_size) * 100
+                line = f"     ... {percent:.1f}% ({format_size(self.downloaded)}/{format_size(self.total_size)})"
+            else:
+                line = f"     ... {format_size(self.downloaded)} nedlastet"
+            with _PRINT_LOCK:
+                print(line, end='\r', flush=True)
+        return data
+
+    def close(self) -> None:
+        if self.bar is not None:
+            self.bar.close()
+        elif self.downloaded >= PROGRESS_INTERVAL:
+            print()  # New line after progress
+
+
+def download_file(url: str, output_path: Path, max_retries: int = 3,
+                  feed_updated: Optional[str] = None) -> bool:
+    """Download a file from URL to output path using streaming with progress and retries.
+
+    The body is written to <output_path>.part, which is renamed to
+    output_path only once it is complete, so an existing output_path is
+    always a finished download. If the .part file is left from an earlier
+    attempt or run, only the rest is requested with an HTTP Range header
+    and appended. The Range carries an If-Range with the ETag (or
+    Last-Modified) the .part was started with, so a changed file comes back
+    whole (200 instead of 206) and replaces the partial one, as it does from
+    a server that ignores the range. A resumed file is checked with
+    check_zip_integrity, CRC-checking every member when there was no
+    validator to send; if it is not a valid ZIP it is deleted and the next
+    attempt starts from byte 0.
+    A completed download gets a sidecar (see verify_existing_file) with
+    feed_updated, the feed timestamp of the entry it came from.
+    """
+    part_path = _part_path(output_path)
     for attempt in range(max_retries):
         if attempt > 0:
-            print(f"     Forsøk {attempt + 1}/{max_retries}...")
+            _say(f"     Forsøk {attempt + 1}/{max_retries}...")
 
         try:
-            req = urllib.request.Request(url)
-            # Add headers to support range requests and large files
-            req.add_header('User-Agent', 'Mozilla/5.0')
-            req.add_header('Accept-Encoding', 'identity')  # Disable compression for large files
+            existing = part_path.stat().st_size if part_path.exists() else 0
+            headers = {'Accept-Encoding': 'identity'}  # Disable compression for large files
+            if_range = None
+            if existing:
+                headers['Range'] = f'bytes={existing}-'
+                if_range = _read_part_if_range(part_path)
+                if if_range:
+                    headers['If-Range'] = if_range
+
+            # Use a longer read timeout for large files (60 minutes)
+            with _SESSION.get(url, headers=headers, stream=True, timeout=(30, 3600)) as response:
+                response.raise_for_status()
+                resumed = existing > 0 and response.status_code == 206
+                if existing and not resumed:
+                    existing = 0  # Full body: start over
+                if not resumed:
+                    _write_part_meta(part_path, response)
 
-            # Use a longer timeout for large files (60 minutes)
-            with urllib.request.urlopen(req, timeout=3600) as response:
                 # Get file size if available for progress indication
                 content_length = response.headers.get('Content-Length')
-                total_size = int(content_length) if content_length else None
-
-                downloaded = 0
-                chunk_size = 1024 * 1024  # 1MB chunks for better performance
-
-                with open(output_path, 'wb', buffering=8 * 1024 * 1024) as f:  # 8MB buffer
-                    while True:
-                        try:
-                            chunk = response.read(chunk_size)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                            downloaded += len(chunk)
-
-                            # Print progress every 50MB to minimize overhead
-                            if downloaded % (50 * 1024 * 1024) == 0:
-                                if total_size:
-                                    percent = (downloaded / total_size) * 100
-                                    print(f"     ... {percent:.1f}% ({format_size(downloaded)}/{format_size(total_size)})", end='\r', flush=True)
-                                else:
-                                    print(f"     ... {format_size(downloaded)} nedlastet", end='\r', flush=True)
-
-                        except Exception as e:
-                            print(f"\n     ✗ Feil under nedlasting: {e}", file=sys.stderr)
-                            if attempt < max_retries - 1:
-                                print(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
-                                if output_path.exists():
-                                    output_path.unlink()  # Remove partial download
-                                break  # Break inner loop to retry
+                total_size = existing + int(content_length) if content_length else None
+                if resumed:
+                    _say(f"     Fortsetter fra {format_size(existing)}")
+
+                # response.raw.decode_content is deliberately left unset: with
+                # Accept-Encoding: identity the ZIP bytes are copied as sent,
+                # so byte offsets match the Range resume and Content-Length.
+                # Progress only goes to a terminal; otherwise the body is
+                # copied without any per-chunk Python bookkeeping
+                show_progress = sys.stdout.isatty()
+                source = _CancellableReader(response.raw)
+                if show_progress:
+                    source = _ProgressReader(source, total_size, existing, output_path.name)
+
+                with open(part_path, 'ab' if resumed else 'wb') as f:
+                    try:
+                        shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+                    except Exception as e:
+                        if show_progress:
+                            source.close()
+                        if isinstance(e, DownloadCancelled):
+                            return False  # Keeps the .part file for the next run
+                        _say(f"\n     ✗ Feil under nedlasting: {e}", file=sys.stderr)
+                        if attempt >= max_retries - 1:
                             return False
+                        _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
+                        continue  # Retry, resuming from what was written
+                    downloaded = f.tell()
+                if show_progress:
+                    source.close()
 
                 # Verify download completed
                 if total_size and downloaded != total_size:
-                    print(f"\n     ✗ Nedlasting ufullstendig: {format_size(downloaded)} / {format_size(total_size)}", file=sys.stderr)
+                    _say(f"\n     ✗ Nedlasting ufullstendig: {format_size(downloaded)} / {format_size(total_size)}", file=sys.stderr)
+                    if downloaded > total_size:
+                        _discard_part(part_path)  # Cannot be resumed
                     if attempt < max_retries - 1:
-                        print(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
-                        if output_path.exists():
-                            output_path.unlink()  # Remove incomplete file
+                        _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
                         continue  # Retry
-                    output_path.unlink()  # Remove incomplete file
                     return False
 
-                print()  # New line after progress
+                # Without If-Range only the member CRCs catch a .part from
+                # another version: the central directory is all new bytes
+                if resumed and not check_zip_integrity(part_path, deep=None if if_range else True):
+                    _say("\n     ✗ Fortsatt nedlasting er ikke en gyldig ZIP-fil", file=sys.stderr)
+                    _discard_part(part_path)
+                    if attempt < max_retries - 1:
+                        _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
+                        continue  # Retry from the start
+                    return False
+
+                _meta_path(output_path).unlink(missing_ok=True)
+                os.replace(part_path, output_path)
+                _meta_path(part_path).unlink(missing_ok=True)
+                _write_download_meta(output_path, response, feed_updated)
+                if DROP_CACHE:
+                    _drop_page_cache(output_path)
                 return True
 
-        except urllib.error.HTTPError as e:
-            print(f"     ✗ HTTP feil ved nedlasting: {e.code} {e.reason}", file=sys.stderr)
+        except requests.HTTPError as e:
+            _say(f"     ✗ HTTP feil ved nedlasting: {e.response.status_code} {e.response.reason}", file=sys.stderr)
+            if e.response.status_code == 416:
+                _discard_part(part_path)  # Server will not resume it
+            # Any other error keeps the .part file; the retry resumes with Range
             if attempt < max_retries - 1:
-                print(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
-                if output_path.exists():
-                    output_path.unlink()
+                _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
                 continue
             return False
-        except urllib.error.URLError as e:
-            print(f"     ✗ URL feil ved nedlasting: {e.reason}", file=sys.stderr)
+        except requests.ConnectionError as e:
+            _say(f"     ✗ URL feil ved nedlasting: {e}", file=sys.stderr)
             if attempt < max_retries - 1:
-                print(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
-                if output_path.exists():
-                    output_path.unlink()
+                _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
                 continue
             return False
         except Exception as e:
-            print(f"     ✗ Feil ved nedlasting: {e}", file=sys.stderr)
+            _say(f"     ✗ Feil ved nedlasting: {e}", file=sys.stderr)
             if attempt < max_retries - 1:
-                print(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
-                if output_path.exists():
-                    output_path.unlink()
+                _say(f"     Prøver på nytt (forsøk {attempt + 2}/{max_retries})...", file=sys.stderr)
                 continue
             return False
 
     return False  # All retries exhausted
 
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
 def format_size(size_bytes: int) -> str:
     """Format file size in human-readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.1f} TB"
+    # Unit from the bit length: each unit is 2**10 times the previous one
+    unit = min((int(size_bytes).bit_length() - 1) // 10, 4) if size_bytes >= 1 else 0
+    return f"{size_bytes / (1 << (10 * unit)):.1f} {_SIZE_UNITS[unit]}"
+
+
+# Files of one dataset downloaded in parallel (KV_WORKERS); capped at 4
+# connections per host to respect Geonorge
+MAX_WORKERS_PER_HOST = 4
+DOWNLOAD_WORKERS = max(1, min(int(os.environ.get('KV_WORKERS', '4')), MAX_WORKERS_PER_HOST))
+
+# Serializes output from parallel downloads (files and batch datasets)
+_PRINT_LOCK = threading.Lock()
+
+# Host name -> semaphore; --config runs datasets in parallel, each with
+# its own file pool, so the per-host cap is enforced across both pools
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    """Semaphore allowing MAX_WORKERS_PER_HOST downloads at a time from url's host."""
+    host = urllib.parse.urlsplit(url).hostname or ''
+    with _HOST_SLOTS_LOCK:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(MAX_WORKERS_PER_HOST)
+    return slot
+
+
+def _say(*lines: str, file=None) -> None:
+    """Print lines together, without output from other threads in between.
+
+    Used by everything that runs in the download threads, so that a line
+    is written in one piece (file defaults to sys.stdout).
+    """
+    with _PRINT_LOCK:
+        print("\n".join(lines), file=file)
+
+
+def _download_one(
+    url: str,
+    feed_updated: Optional[str],
+    filename: str,
+    output_dir: Path,
+    dataset_name: str,
+    utm_zone: str,
+    format_type: str,
+    existing: AbstractSet[str]
+) -> str:
+    """Verify or download one file of process_download_urls.
+
+    existing holds the names of the files in output_dir when the batch
+    started, so no per-file exists() call is needed.
+
+    Returns:
+        'downloaded', 'up_to_date' or 'failed'
+    """
+    # Filename from the URL (see extract_download_urls)
+    if not filename:
+        # Fallback: generate generic filename
+        dataset_suffix = dataset_name.replace('-', '_')
+        filename = f"{dataset_suffix}_{format_type}_{utm_zone}.zip"
+
+    output_path = output_dir / filename
+    part_path = _part_path(output_path)
+
+    # A partial download of an older version of the file cannot be resumed
+    if part_path.name in existing and _is_stale(part_path, feed_updated):
+        _discard_part(part_path)
+
+    # Check if file already exists and verify it's complete and up to date
+    if filename in existing:
+        lines = [f"  ⊙ {filename} (eksisterer, verifiserer ...)"]
+        is_valid, expected_size, is_up_to_date = verify_existing_file(url, output_path, feed_updated)
+        # verify_existing_file does not touch the file: one stat for all branches
+        actual_size = output_path.stat().st_size
+
+        if is_valid and is_up_to_date:
+            file_size = format_size(actual_size)
+            lines.append(f"     ✓ Fil er komplett og oppdatert ({file_size})")
+            _say(*lines)
+            return 'up_to_date'
+        elif is_valid and not is_up_to_date:
+            file_size = format_size(actual_size)
+            lines.append(f"     ⊙ Fil er komplett men utdatert ({file_size})")
+            if feed_updated:
+                lines.append(f"     Feed oppdatert: {feed_updated}")
+            lines.append("     Sletter og laster ned ny versjon ...")
+            output_path.unlink()
+        else:
+            if expected_size and actual_size < expected_size and not _is_stale(output_path, feed_updated):
+                # Same version, cut short (written before .part files):
+                # download_file resumes it
+                lines.append(f"     ✗ Fil er ufullstendig ({format_size(actual_size)} / {format_size(expected_size)})")
+                lines.append("     Fortsetter nedlastingen ...")
+                os.replace(output_path, part_path)
+                _meta_path(part_path).unlink(missing_ok=True)  # No validator for it
+            else:
+                if expected_size:
+                    lines.append(f"     ✗ Fil er ufullstendig ({format_size(actual_size)} / {format_size(expected_size)})")
+                else:
+                    lines.append("     ✗ Fil ser ut til å være korrupt")
+                lines.append("     Sletter og laster ned på nytt ...")
+                output_path.unlink()
+        _say(*lines)
+
+    _say(f"  -> {filename}")
+    with _host_slot(url):
+        downloaded = download_file(url, output_path, feed_updated=feed_updated)
+    if downloaded:
+        file_size = format_size(output_path.stat().st_size)
+        _say(f"     ✓ {filename} nedlastet ({file_size})")
+        return 'downloaded'
+
+    # A partial download is kept in the .part file for the next run
+    return 'failed'
 
 
 def process_download_urls(
-    urls: List[Tuple[str, Optional[str]]],
+    urls: List[Tuple[str, Optional[str], str]],
     output_dir: Path,
     dataset_name: str,
     utm_zone: str,
@@ -704,8 +1274,12 @@ def process_download_urls(
 ) -> Tuple[int, int]:
     """Process list of URLs, download if needed, return counts.
 
+    Files are verified and downloaded DOWNLOAD_WORKERS at a time over the
+    shared HTTP session. On Ctrl-C the queued files are dropped and running
+    downloads stop, keeping their .part files for the next run.
+
     Args:
-        urls: List of (url, feed_updated_timestamp) tuples
+        urls: List of (url, feed_updated_timestamp, filename) tuples
         output_dir: Directory to save files
         dataset_name: Name of dataset (for filename generation)
         utm_zone: UTM zone (for filename generation)
@@ -714,56 +1288,48 @@ def process_download_urls(
     Returns:
         Tuple of (downloaded_count, up_to_date_count)
     """
-    download_count = 0
-    up_to_date_count = 0
+    # One directory read instead of an exists() call per file; is_file()
+    # comes from the directory entry itself, so nothing is stat'ed here
+    try:
+        with os.scandir(output_dir) as entries:
+            existing = frozenset(entry.name for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        existing = frozenset()
+
+    args = (output_dir, dataset_name, utm_zone, format_type, existing)
+    if DOWNLOAD_WORKERS == 1 or len(urls) == 1:
+        results = [_download_one(*url, *args) for url in urls]
+    else:
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(urls))) as executor:
+            futures = [executor.submit(_download_one, *url, *args) for url in urls]
+            try:
+                results = [future.result() for future in futures]
+            except KeyboardInterrupt:
+                # Drop queued files and stop running ones, then re-raise
+                # once the workers have returned
+                for future in futures:
+                    future.cancel()
+                _CANCEL.set()
+                raise
 
-    for url, feed_updated in urls:
-        # Generate filename from URL
-        filename = os.path.basename(urllib.parse.urlparse(url).path)
-        if not filename or filename == "/":
-            # Fallback: generate generic filename
-            dataset_suffix = dataset_name.replace('-', '_')
-            filename = f"{dataset_suffix}_{format_type}_{utm_zone}.zip"
+    return results.count('downloaded'), results.count('up_to_date')
 
-        output_path = output_dir / filename
 
-        # Check if file already exists and verify it's complete and up to date
-        if output_path.exists():
-            print(f"  ⊙ {filename} (eksisterer, verifiserer ...)")
-            is_valid, expected_size, is_up_to_date = verify_existing_file(url, output_path, feed_updated)
+_URL_FORMATS = ('PostGIS', 'FGDB', 'GML', 'SOSI')
+_URL_FORMAT_RE = re.compile('|'.join(_URL_FORMATS), re.IGNORECASE)
 
-            if is_valid and is_up_to_date:
-                file_size = format_size(output_path.stat().st_size)
-                print(f"     ✓ Fil er komplett og oppdatert ({file_size})")
-                up_to_date_count += 1
-                continue
-            elif is_valid and not is_up_to_date:
-                file_size = format_size(output_path.stat().st_size)
-                print(f"     ⊙ Fil er komplett men utdatert ({file_size})")
-                if feed_updated:
-                    print(f"     Feed oppdatert: {feed_updated}")
-                print("     Sletter og laster ned ny versjon ...")
-                output_path.unlink()
-            else:
-                if expected_size:
-                    actual_size = output_path.stat().st_size
-                    print(f"     ✗ Fil er ufullstendig ({format_size(actual_size)} / {format_size(expected_size)})")
-                else:
-                    print("     ✗ Fil ser ut til å være korrupt")
-                print("     Sletter og laster ned på nytt ...")
-                output_path.unlink()
 
-        print(f"  -> {filename}")
-        if download_file(url, output_path):
-            download_count += 1
-            file_size = format_size(output_path.stat().st_size)
-            print(f"     ✓ Nedlastet ({file_size})")
-        else:
-            # Remove partial download on error
-            if output_path.exists():
-                output_path.unlink()
+def _url_format(url: str) -> Optional[str]:
+    """Download format named in a feed URL (PostGIS, FGDB, GML, SOSI), if any.
+
+    If a URL names several, the first in _URL_FORMATS wins.
+    """
+    found = {match.upper() for match in _URL_FORMAT_RE.findall(url)}
+    return next((fmt for fmt in _URL_FORMATS if fmt.upper() in found), None)
+
 
-    return download_count, up_to_date_count
+# Format of each predefined feed, worked out once
+_FEED_FORMATS: Dict[str, Optional[str]] = {name: _url_format(url) for name, url in DATASET_FEEDS.items()}
 
 
 def get_atom_feed_url(
@@ -778,26 +1344,14 @@ def get_atom_feed_url(
     """
     if feed_url:
         # Try to determine format from URL
-        format_type = None
-        for fmt in ['PostGIS', 'FGDB', 'GML', 'SOSI']:
-            if fmt.upper() in feed_url.upper():
-                format_type = fmt
-                break
-        return feed_url, format_type
+        return feed_url, _url_format(feed_url)
 
     if dataset_name:
         dataset_name_lower = dataset_name.lower()
 
         # Check hardcoded feeds first
         if dataset_name_lower in DATASET_FEEDS:
-            url = DATASET_FEEDS[dataset_name_lower]
-            # Determine format from URL
-            format_type = None
-            for fmt in ['PostGIS', 'FGDB', 'GML', 'SOSI']:
-                if fmt.upper() in url.upper():
-                    format_type = fmt
-                    break
-            return url, format_type
+            return DATASET_FEEDS[dataset_name_lower], _FEED_FORMATS[dataset_name_lower]
 
         # Try discovery from catalog
         if format_preference is None:
@@ -820,9 +1374,7 @@ def get_atom_feed_url(
             sys.exit(1)
 
     # Default to teig for backward compatibility
-    url = DATASET_FEEDS['teig']
-    format_type = 'PostGIS' if 'PostGIS' in url.upper() else None
-    return url, format_type
+    return DATASET_FEEDS['teig'], _FEED_FORMATS['teig']
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -866,6 +1418,12 @@ Examples:
                        help='Format preference list (e.g., PostGIS,GML)')
     parser.add_argument('--config', metavar='FILE', type=Path,
                        help='YAML configuration file for batch download')
+    parser.add_argument('--deep-verify', action='store_true',
+                       help='CRC-check every member of existing ZIP files (slow; default: central directory only)')
+    parser.add_argument('--force-verify', action='store_true',
+                       help='Check existing files against the server (HEAD) even when their sidecar matches the feed')
+    parser.add_argument('--drop-cache', action='store_true',
+                       help='Evict downloaded files from the OS page cache (for large batches not loaded right away)')
 
     # Positional arguments
     parser.add_argument('dataset_or_output', nargs='?',
@@ -922,7 +1480,10 @@ def load_config_file(config_path) -> List[Dict[str, Any]]:
     Returns:
         List of dataset configurations
     """
-    if not YAML_AVAILABLE:
+    # Only needed for batch downloads, so not imported at startup
+    try:
+        import yaml
+    except ImportError:
         print("Feil: PyYAML er ikke installert. Installer med: pip install pyyaml", file=sys.stderr)
         sys.exit(1)
 
@@ -972,8 +1533,8 @@ def download_single_dataset(dataset_config: Dict[str, Any], index: int, total: i
     feed_url_override = dataset_config.get('feed_url', None)
     download_url = dataset_config.get('download_url', None)
 
-    # Thread-safe print
-    print_lock = threading.Lock()
+    # Thread-safe print (shared with the other datasets' threads)
+    print_lock = _PRINT_LOCK
     with print_lock:
         print(f"[{index}/{total}] {name}")
         print(f"  Dataset: {dataset_name}")
@@ -991,20 +1552,20 @@ def download_single_dataset(dataset_config: Dict[str, Any], index: int, total: i
         if download_url:
             outdir = Path(output_dir)
             outdir.mkdir(parents=True, exist_ok=True)
-            filename = os.path.basename(urllib.parse.urlparse(download_url).path)
+            filename = url_filename(download_url)
             if not filename:
                 filename = f"{name}.zip"
             output_path = outdir / filename
 
-            if download_file(download_url, output_path):
+            with _host_slot(download_url):
+                downloaded = download_file(download_url, output_path)
+            if downloaded:
                 file_size = format_size(output_path.stat().st_size)
                 with print_lock:
                     print(f"     ✓ Nedlastet ({file_size})")
                     print(f"  ✓ [{name}] Ferdig (1 fil lastet ned)\n")
                 return (name, True, 1, None)
             else:
-                if output_path.exists():
-                    output_path.unlink()
                 with print_lock:
                     print(f"  ✗ [{name}] Feil ved nedlasting\n", file=sys.stderr)
                 return (name, False, 0, "Download failed")
@@ -1035,11 +1596,11 @@ def download_single_dataset(dataset_config: Dict[str, Any], index: int, total: i
         outdir = Path(output_dir)
         outdir.mkdir(parents=True, exist_ok=True)
 
-        # Fetch and parse ATOM feed
-        root = fetch_atom_feed(feed_url)
+        # Stream the ATOM feed
+        entries = fetch_atom_feed(feed_url)
 
         # Extract download URLs (pass parameters directly, no env vars needed)
-        urls = extract_download_urls(root, str(utm_zone), area_filter, area_type if area_type else None)
+        urls = extract_download_urls(entries, str(utm_zone), area_filter, area_type if area_type else None)
 
         if not urls:
             with print_lock:
@@ -1110,12 +1671,19 @@ def download_from_config(config_path, max_workers: Optional[int] = None) -> None
         }
 
         # Process completed downloads as they finish
-        for future in as_completed(future_to_config):
-            name, success, download_count, error_msg = future.result()
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
+        try:
+            for future in as_completed(future_to_config):
+                name, success, download_count, error_msg = future.result()
+                if success:
+                    success_count += 1
+                else:
+                    failed_count += 1
+        except KeyboardInterrupt:
+            # As in process_download_urls: drop queued datasets, stop downloads
+            for future in future_to_config:
+                future.cancel()
+            _CANCEL.set()
+            raise
 
     # Summary
     print("==> Sammendrag")
@@ -1133,6 +1701,11 @@ def main():
     dataset_name = args.dataset_name
     feed_url = args.feed_url
 
+    global DEEP_VERIFY, FORCE_VERIFY, DROP_CACHE
+    DEEP_VERIFY = args.deep_verify
+    FORCE_VERIFY = args.force_verify
+    DROP_CACHE = args.drop_cache
+
     # Handle --config option (batch download from config file)
     if args.config:
         download_from_config(args.config)
@@ -1170,11 +1743,12 @@ def main():
         if format_type:
             print(f"    Format: {format_type}")
 
-    # Fetch and parse ATOM feed
-    root = fetch_atom_feed(atom_feed_url)
+    # Stream the ATOM feed
+    entries = fetch_atom_feed(atom_feed_url)
 
-    # Extract download URLs
-    urls = extract_download_urls(root, utm_zone, area_filter, area_type)
+    # Extract download URLs (and note the feed's EPSG codes for the error message)
+    available_epsg: Set[str] = set()
+    urls = extract_download_urls(entries, utm_zone, area_filter, area_type, available_epsg)
 
     if not urls:
         print(f"Feil: Fant ingen filer som matcher EPSG:{utm_zone}", file=sys.stderr)
@@ -1182,13 +1756,7 @@ def main():
             print(f"       med område-filter: {area_filter}", file=sys.stderr)
         print("", file=sys.stderr)
         print("Tilgjengelige EPSG-koder i feeden:", file=sys.stderr)
-        # Extract available EPSG codes
-        categories = root.findall('.//atom:category[@term]', NAMESPACES)
-        epsg_codes = sorted(set(
-            cat.get('term') for cat in categories
-            if cat.get('term', '').startswith('EPSG:')
-        ))
-        for code in epsg_codes:
+        for code in sorted(available_epsg):
             print(f"  - {code}", file=sys.stderr)
         sys.exit(1)
 
@@ -69,7 +69,10 @@ def connect_db(db_params: dict):
 
 
 def list_tables(conn, include_access: bool = False) -> List[Dict]:
-    """List all tables and views with basic info."""
+    """List all tables and views with basic info.
+
+    Size and row estimate come from pg_class, joined once by oid.
+    """
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         if include_access:
             cur.execute("""
@@ -77,14 +80,10 @@ def list_tables(conn, include_access: bool = False) -> List[Dict]:
                     t.table_schema as schemaname,
                     t.table_name as tablename,
                     t.table_type,
-                    pg_size_pretty(pg_total_relation_size(t.table_schema||'.'||t.table_name)) as size,
-                    (SELECT reltuples::bigint
-                     FROM pg_class c
-                     JOIN pg_namespace n ON n.oid = c.relnamespace
-                     WHERE c.relname = t.table_name
-                     AND n.nspname = t.table_schema
-                     AND c.relkind IN ('r', 'v')  -- 'r' = table, 'v' = view
-                    ) as estimated_rows,
+                    pg_size_pretty(pg_total_relation_size(c.oid)) as size,
+                    CASE WHEN c.relkind IN ('r', 'v')  -- 'r' = table, 'v' = view
+                         THEN c.reltuples::bigint
+                    END as estimated_rows,
                     COALESCE(
                         ARRAY_AGG(
                             DISTINCT g.grantee || ':' || g.privilege_type
@@ -94,11 +93,13 @@ def list_tables(conn, include_access: bool = False) -> List[Dict]:
                         ARRAY[]::text[]
                     ) as privileges
                 FROM information_schema.tables t
+                JOIN pg_namespace n ON n.nspname = t.table_schema
+                JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = t.table_name
                 LEFT JOIN information_schema.role_table_grants g
                     ON g.table_schema = t.table_schema
                    AND g.table_name = t.table_name
                 WHERE t.table_schema NOT IN ('pg_catalog', 'information_schema')
-                GROUP BY t.table_schema, t.table_name, t.table_type
+                GROUP BY t.table_schema, t.table_name, t.table_type, c.oid, c.relkind, c.reltuples
                 ORDER BY t.table_schema, t.table_name
             """)
         else:
@@ -107,15 +108,13 @@ def list_tables(conn, include_access: bool = False) -> List[Dict]:
                     t.table_schema as schemaname,
                     t.table_name as tablename,
                     t.table_type,
-                    pg_size_pretty(pg_total_relation_size(t.table_schema||'.'||t.table_name)) as size,
-                    (SELECT reltuples::bigint
-                     FROM pg_class c
-                     JOIN pg_namespace n ON n.oid = c.relnamespace
-                     WHERE c.relname = t.table_name
-                     AND n.nspname = t.table_schema
-                     AND c.relkind IN ('r', 'v')  -- 'r' = table, 'v' = view
-                    ) as estimated_rows
+                    pg_size_pretty(pg_total_relation_size(c.oid)) as size,
+                    CASE WHEN c.relkind IN ('r', 'v')  -- 'r' = table, 'v' = view
+                         THEN c.reltuples::bigint
+                    END as estimated_rows
                 FROM information_schema.tables t
+                JOIN pg_namespace n ON n.nspname = t.table_schema
+                JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = t.table_name
                 WHERE t.table_schema NOT IN ('pg_catalog', 'information_schema')
                 ORDER BY t.table_schema, t.table_name
             """)
@@ -226,48 +225,42 @@ def show_table_schema(conn, table_name: str):
     schema, table = table_name.split('.') if '.' in table_name else ('public', table_name)
 
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # Get columns
+        # Columns, geometry columns and indexes in one round trip: each
+        # branch tags its rows with a kind and packs the row into JSON
         cur.execute("""
-            SELECT
-                column_name,
-                data_type,
-                character_maximum_length,
-                is_nullable,
-                column_default
+            SELECT 'column' AS kind, ordinal_position::bigint AS seq,
+                   json_build_object(
+                       'column_name', column_name,
+                       'data_type', data_type,
+                       'character_maximum_length', character_maximum_length,
+                       'is_nullable', is_nullable,
+                       'column_default', column_default
+                   ) AS info
             FROM information_schema.columns
-            WHERE table_schema = %s AND table_name = %s
-            ORDER BY ordinal_position
-        """, (schema, table))
-        columns = cur.fetchall()
-
-        # Get geometry columns
-        cur.execute("""
-            SELECT
-                f_geometry_column as column_name,
-                coord_dimension,
-                srid,
-                type as geometry_type
+            WHERE table_schema = %(schema)s AND table_name = %(table)s
+            UNION ALL
+            SELECT 'geometry', 0,
+                   json_build_object(
+                       'column_name', f_geometry_column,
+                       'coord_dimension', coord_dimension,
+                       'srid', srid,
+                       'geometry_type', type
+                   )
             FROM geometry_columns
-            WHERE f_table_schema = %s AND f_table_name = %s
-        """, (schema, table))
-        geometry_cols = cur.fetchall()
-
-        # Get indexes
-        cur.execute("""
-            SELECT
-                indexname,
-                indexdef
+            WHERE f_table_schema = %(schema)s AND f_table_name = %(table)s
+            UNION ALL
+            SELECT 'index', row_number() OVER (ORDER BY indexname),
+                   json_build_object('indexname', indexname, 'indexdef', indexdef)
             FROM pg_indexes
-            WHERE schemaname = %s AND tablename = %s
-            ORDER BY indexname
-        """, (schema, table))
-        indexes = cur.fetchall()
+            WHERE schemaname = %(schema)s AND tablename = %(table)s
+            ORDER BY kind, seq
+        """, {'schema': schema, 'table': table})
 
-        return {
-            'columns': columns,
-            'geometry_columns': geometry_cols,
-            'indexes': indexes
-        }
+        schema_info = {'columns': [], 'geometry_columns': [], 'indexes': []}
+        sections = {'column': 'columns', 'geometry': 'geometry_columns', 'index': 'indexes'}
+        for row in cur.fetchall():
+            schema_info[sections[row['kind']]].append(row['info'])
+        return schema_info
 
 
 def list_indexes(conn) -> List[Dict]:
@@ -301,8 +294,14 @@ def list_srids(conn) -> List[Dict]:
         return cur.fetchall()
 
 
-def show_sample_data(conn, table_name: str, num_rows: int = 5) -> Optional[Dict]:
-    """Show sample data from a table."""
+def show_sample_data(conn, table_name: str, num_rows: int = 5,
+                     exact_count: bool = False) -> Optional[Dict]:
+    """Show sample data from a table.
+
+    The row count is the planner's estimate (pg_class.reltuples, -1 if
+    unknown) unless exact_count is set, which runs COUNT(*) over the
+    whole table.
+    """
     # Parse schema.table or just table
     if '.' in table_name:
         schema, table = table_name.split('.', 1)
@@ -356,7 +355,15 @@ def show_sample_data(conn, table_name: str, num_rows: int = 5) -> Optional[Dict]
         rows = cur.fetchall()
 
         # Get total row count
-        cur.execute(f"SELECT COUNT(*) as count FROM {schema}.{table}")
+        if exact_count:
+            cur.execute(f"SELECT COUNT(*) as count FROM {schema}.{table}")
+        else:
+            # Views have no row estimate; reltuples is -1 before the first ANALYZE
+            cur.execute("""
+                SELECT CASE WHEN relkind IN ('r', 'm') THEN reltuples::bigint ELSE -1 END as count
+                FROM pg_class
+                WHERE oid = %s::regclass
+            """, (f"{schema}.{table}",))
         total_count = cur.fetchone()['count']
 
         return {
@@ -364,7 +371,8 @@ def show_sample_data(conn, table_name: str, num_rows: int = 5) -> Optional[Dict]
             'table': table,
             'columns': columns,
             'rows': rows,
-            'total_count': total_count
+            'total_count': total_count,
+            'count_is_estimate': not exact_count
         }
 
 
@@ -391,6 +399,8 @@ def main():
                        help='Show sample data from a specific table (default: 5 rows)')
     parser.add_argument('--rows', type=int, default=5,
                        help='Number of sample rows to show (default: 5, use with --sample)')
+    parser.add_argument('--exact-count', action='store_true',
+                       help='Count all rows with --sample (slow on large tables; default: estimate)')
     parser.add_argument('--all', action='store_true',
                        help='Show all available information')
 
@@ -527,9 +537,15 @@ def main():
 
         if args.sample:
             print(f"==> Sample data from {args.sample} (showing {args.rows} rows):")
-            sample_data = show_sample_data(conn, args.sample, args.rows)
+            sample_data = show_sample_data(conn, args.sample, args.rows, exact_count=args.exact_count)
             if sample_data:
-                print(f"\nTotal rows in table: {sample_data['total_count']:,}")
+                total_count = sample_data['total_count']
+                if not sample_data['count_is_estimate']:
+                    print(f"\nTotal rows in table: {total_count:,}")
+                elif total_count >= 0:
+                    print(f"\nTotal rows in table: ~{total_count:,} (estimate)")
+                else:
+                    print("\nTotal rows in table: ? (no estimate, use --exact-count)")
                 print(f"\nColumns: {', '.join([col['column_name'] for col in sample_data['columns']])}")
                 print("\nSample data:")
 
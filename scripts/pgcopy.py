@@ -0,0 +1,50 @@
+"""
+Decode PostgreSQL binary COPY output into NumPy arrays.
+
+Shared by build_links.py and analyze_loops.py, which load fotrute with
+COPY ... TO STDOUT (FORMAT BINARY).
+"""
+
+from typing import List
+
+import numpy as np
+
+# PostgreSQL binary COPY framing: 11-byte signature, int32 flags, int32
+# header-extension length (+ extension), tuples, then an int16 -1 trailer.
+PGCOPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+PGCOPY_TRAILER = b'\xff\xff'
+
+
+def parse_binary_copy(data: bytes, column_types: List[str]) -> List[np.ndarray]:
+    """Decode a COPY ... (FORMAT BINARY) stream of non-NULL 8-byte columns.
+
+    column_types are big-endian NumPy type codes ('>i8' for int8, '>f8'
+    for float8). Every tuple then has the same fixed layout (int16 field
+    count, and per field an int32 length of 8 followed by the value), so
+    the payload maps onto a structured dtype without per-row parsing.
+    Returns one native-endian array per column.
+
+    Raises ValueError if the stream does not have that layout: a NULL
+    (length -1) or a short row would shift every later tuple, so each field
+    length and the trailer position are checked.
+    """
+    if len(data) < 19 or not data.startswith(PGCOPY_SIGNATURE):
+        raise ValueError("not a PostgreSQL binary COPY stream")
+    extension_len = int.from_bytes(data[15:19], 'big')
+    offset = 19 + extension_len
+
+    fields = [('field_count', '>i2')]
+    for i, column_type in enumerate(column_types):
+        fields += [(f'len{i}', '>i4'), (f'col{i}', column_type)]
+    tuple_dtype = np.dtype(fields)
+
+    count = max(len(data) - offset - 2, 0) // tuple_dtype.itemsize
+    if data[offset + count * tuple_dtype.itemsize:] != PGCOPY_TRAILER:
+        raise ValueError("binary COPY stream does not end with the trailer after whole tuples")
+    rows = np.frombuffer(data, dtype=tuple_dtype, count=count, offset=offset)
+    if count and (rows['field_count'] != len(column_types)).any():
+        raise ValueError("unexpected field count in binary COPY stream")
+    for i in range(len(column_types)):
+        if count and (rows[f'len{i}'] != 8).any():
+            raise ValueError(f"column {i} has a NULL or non-8-byte value in binary COPY stream")
+    return [rows[f'col{i}'].astype(column_type[1:]) for i, column_type in enumerate(column_types)]
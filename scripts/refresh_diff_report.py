@@ -182,8 +182,7 @@ def run_pre(database: str, log_dir: Path) -> int:
     log_dir.mkdir(parents=True, exist_ok=True)
     out_path = log_dir / PRE_SNAPSHOT_FILENAME
 
-    db_params = get_db_connection_params()
-    db_params["database"] = database
+    db_params = {**get_db_connection_params(), "database": database}
     conn = connect_db(db_params)
     if not conn:
         print("✗ Kunne ikke koble til database for pre-snapshot", file=sys.stderr)
@@ -621,8 +620,7 @@ def run_post(database: str, log_dir: Path) -> int:
     with open(pre_path, encoding="utf-8") as f:
         pre = json.load(f)
 
-    db_params = get_db_connection_params()
-    db_params["database"] = database
+    db_params = {**get_db_connection_params(), "database": database}
     conn = connect_db(db_params)
     if not conn:
         print("✗ Kunne ikke koble til database for post-snapshot", file=sys.stderr)
@@ -663,8 +661,7 @@ def run_after_load(
     log_dir.mkdir(parents=True, exist_ok=True)
     pre_path = log_dir / PRE_SNAPSHOT_FILENAME
 
-    db_params = get_db_connection_params()
-    db_params["database"] = database
+    db_params = {**get_db_connection_params(), "database": database}
     conn = connect_db(db_params)
     if not conn:
         out("  ✗ Kunne ikke koble til database for diff-snapshot")
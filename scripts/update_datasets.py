@@ -151,8 +151,7 @@ def verify_imported_data(database: str, configs: List[Dict[str, Any]], log_file:
     Returns:
         True if all checks pass, False otherwise
     """
-    db_params = get_db_connection_params()
-    db_params['database'] = database
+    db_params = {**get_db_connection_params(), 'database': database}
     conn = connect_db(db_params)
 
     if not conn:
@@ -278,8 +277,7 @@ def check_import_needed(
     zip_mtime = zip_file.stat().st_mtime
 
     # Get database connection
-    db_params = get_db_connection_params()
-    db_params['database'] = database
+    db_params = {**get_db_connection_params(), 'database': database}
     conn = connect_db(db_params)
 
     if not conn:
@@ -664,8 +662,7 @@ def main():
             log(f"  [{name}] Feed URL: will be discovered from catalog (dataset: {dataset_name})", log_file)
         log(f"  [{name}] Format preference: {format_pref}", log_file)
 
-    db_params = get_db_connection_params()
-    db_params['database'] = database
+    db_params = {**get_db_connection_params(), 'database': database}
     if not check_owner_membership(db_params):
         log("ERROR: Missing stiflyt_owner role or membership - aborting", log_file)
         sys.exit(1)
@@ -876,10 +873,10 @@ def main():
     # Post-update health check
     log("==> Verifying database health...", log_file)
     try:
-        db_params = get_db_connection_params()
-        db_params['database'] = database
+        db_params = {**get_db_connection_params(), 'database': database}
 
-        is_healthy, status = check_database_health(db_params, min_tables=len(configs))
+        is_healthy, status = check_database_health(db_params, min_tables=len(configs),
+                                                   need_tables=False)
 
         if is_healthy:
             log("  ✓ Database health check passed", log_file)
@@ -897,8 +894,7 @@ def main():
     # Verify operational schema is intact (critical safeguard)
     log("==> Verifying operational schema integrity...", log_file)
     try:
-        db_params = get_db_connection_params()
-        db_params['database'] = database
+        db_params = {**get_db_connection_params(), 'database': database}
         conn = connect_db(db_params)
 
         if conn:
@@ -0,0 +1,111 @@
+from pathlib import Path
+import json
+import argparse
+
+import pytest
+
+from scripts import analyze_loops
+
+
+def test_parse_node_list():
+    assert analyze_loops.parse_node_list("109646,112298") == [109646, 112298]
+    assert analyze_loops.parse_node_list("42") == [42]
+    assert analyze_loops.parse_node_list("1, 2,") == [1, 2]
+
+
+def test_parse_node_list_rejects_garbage():
+    with pytest.raises(argparse.ArgumentTypeError):
+        analyze_loops.parse_node_list("1,abc")
+
+
+def test_read_node_file(tmp_path: Path):
+    node_file = tmp_path / "nodes.txt"
+    node_file.write_text("109646,112298\n7 8\n", encoding="utf-8")
+    assert analyze_loops.read_node_file(node_file) == [109646, 112298, 7, 8]
+
+
+def test_find_cycles_in_memory():
+    np = pytest.importorskip("numpy")
+    # Triangle 1-2-3, a dangling 3-4, a self-loop at 5, parallel segments 6-7
+    segment_ids = np.array([10, 11, 12, 13, 14, 15, 16])
+    sources = np.array([1, 2, 3, 3, 5, 6, 7])
+    targets = np.array([2, 3, 1, 4, 5, 7, 6])
+
+    cycles = analyze_loops.find_cycles_in_memory(segment_ids, sources, targets, limit=10)
+    assert cycles == [
+        (1, [1, 2, 3, 1], [10, 11, 12]),
+        (5, [5, 5], [14]),
+        (6, [6, 7, 6], [15, 16]),
+    ]
+    assert len(analyze_loops.find_cycles_in_memory(segment_ids, sources, targets, limit=1)) == 1
+
+
+def test_find_cycles_in_memory_tree_has_no_cycles():
+    np = pytest.importorskip("numpy")
+    segment_ids = np.array([1, 2, 3])
+    sources = np.array([1, 2, 2])
+    targets = np.array([2, 3, 4])
+    assert analyze_loops.find_cycles_in_memory(segment_ids, sources, targets) == []
+
+
+def test_find_cycles_in_memory_jit_matches_python(monkeypatch):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(7)
+    sources = rng.integers(0, 200, size=300)
+    targets = rng.integers(0, 200, size=300)
+    segment_ids = np.arange(1000, 1300)
+
+    cycles = analyze_loops.find_cycles_in_memory(segment_ids, sources, targets, limit=50)
+    monkeypatch.setattr(analyze_loops, "_dfs_back_edges_jit", None)
+    assert analyze_loops.find_cycles_in_memory(segment_ids, sources, targets, limit=50) == cycles
+    assert len(cycles) == 50
+
+
+def test_format_node_result_flags_inconsistency():
+    result = {
+        'node_id': 7,
+        'degree': 2,
+        'is_anchor': True,
+        'should_be_anchor': False,
+        'segment_count': 2,
+        'segments': [(1, 6, 7, 10.0), (2, 7, 8, 2.5)],
+    }
+    lines = analyze_loops.format_node_result(result)
+    assert "  Segment 1: 6 → 7 (length: 10.00m)" in lines
+    assert "  Segment 2: 7 → 8 (length: 2.50m)" in lines
+    assert lines[-1].startswith("\n⚠ INCONSISTENCY")
+
+
+def test_explain_query_records_plans(tmp_path: Path, monkeypatch):
+    plan = [{'Plan': {'Node Type': 'Index Scan', 'Actual Rows': 1}, 'Execution Time': 0.5}]
+    executed = []
+
+    class FakeCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            executed.append(sql)
+
+        def fetchone(self):
+            return (plan,)
+
+    class FakeConn:
+        def cursor(self):
+            return FakeCursor()
+
+    monkeypatch.setattr(analyze_loops, "_explain_plans", None)
+    analyze_loops.explain_query(FakeConn(), "SELECT 1", None)
+    assert executed == []
+
+    analyze_loops.enable_explain()
+    analyze_loops.explain_query(FakeConn(), "SELECT\n  %s", (1,))
+    assert executed == ["EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT\n  %s"]
+
+    out = tmp_path / "plans.json"
+    analyze_loops.write_explain_plans(out)
+    saved = json.loads(out.read_text())
+    assert saved == [{'query': 'SELECT %s', 'params': [1], 'plan': plan[0]}]
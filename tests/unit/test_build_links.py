@@ -0,0 +1,132 @@
+import numpy as np
+
+from scripts import build_links
+
+
+def make_graph(rows):
+    """rows: [(objid, source, target, length)] sorted by objid -> (segments, graph)."""
+    objid, source, target, length = zip(*rows)
+    segments = build_links.SegmentArrays(
+        objid=np.array(objid, dtype=np.int64),
+        source=np.array(source, dtype=np.int64),
+        target=np.array(target, dtype=np.int64),
+        length=np.array(length, dtype=np.float64),
+    )
+    return segments, build_links.build_segment_graph(segments)
+
+
+def test_build_links_chains_degree_two_nodes():
+    # 1 -10- 2 -11- 3 -12- 4, with segment 11 stored reversed
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 3, 2, 2.0), (12, 3, 4, 3.0),
+    ])
+    links, link_segments, errors = build_links.build_links(segments, graph, {1, 4})
+
+    assert errors == []
+    assert [(l['a_node'], l['b_node'], l['segment_ids'], l['length_m']) for l in links] == [
+        (1, 4, [10, 11, 12], 6.0),
+    ]
+    assert link_segments.link_id.tolist() == [1, 1, 1]
+    assert list(zip(link_segments.seq.tolist(), link_segments.segment_id.tolist(),
+                    link_segments.from_node.tolist())) == [
+        (0, 10, 1), (1, 11, 2), (2, 12, 3),
+    ]
+
+
+def test_build_links_reports_branching_and_dangling():
+    # Anchor 1 reaches node 2, which branches to anchor 3 and dead end 4.
+    # The walk from 3 later passes through 2 since segment 10 is used.
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 3, 1.0), (12, 2, 4, 1.0), (13, 3, 5, 1.0),
+    ])
+    links, _, errors = build_links.build_links(segments, graph, {1, 3})
+
+    assert [(l['a_node'], l['b_node'], l['segment_ids']) for l in links] == [
+        (1, 2, [10]), (3, 4, [11, 12]), (3, 5, [13]),
+    ]
+    assert [(e['type'], e['node_id']) for e in errors] == [
+        ('branching', 2), ('dangling', 4), ('dangling', 5),
+    ]
+
+
+def test_build_links_splits_on_route_change():
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 3, 1.0),
+    ])
+    routes = {10: {'bre16', '20160407'}, 11: {'bre16'}}
+    links, _, errors = build_links.build_links(segments, graph, {1, 3}, segment_routes=routes)
+
+    assert [l['segment_ids'] for l in links] == [[10], [11]]
+    assert [(e['type'], e['node_id'], e['segment_id']) for e in errors] == [
+        ('metadata_boundary', 2, 11), ('dangling', 2, 11),
+    ]
+
+
+def test_build_links_flags_anchor_self_loop():
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 1, 1.0),
+    ])
+    links, _, errors = build_links.build_links(segments, graph, {1})
+
+    assert [(l['a_node'], l['b_node'], l['segment_ids']) for l in links] == [(1, 1, [10, 11])]
+    assert [(e['type'], e['node_id']) for e in errors] == [('loop', 1)]
+
+
+def test_route_set_ids_shares_ids_for_equal_sets():
+    ids = build_links.route_set_ids({1: {'a', 'b'}, 2: {'b', 'a'}, 3: {'c'}, 4: set()})
+    assert ids[1] == ids[2]
+    assert ids[3] not in (0, ids[1])
+    assert ids[4] == 0
+
+
+def test_compute_metadata_anchor_nodes_uses_objids():
+    # Node 2 joins segments with different route sets; node 3 does not
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 3, 1.0), (12, 3, 4, 1.0),
+    ])
+    routes = {10: {'bre16', '20160407'}, 11: {'bre16'}, 12: {'bre16'}}
+    anchors = build_links.compute_metadata_anchor_nodes(graph, segments.objid, routes)
+    assert anchors == {2}
+
+    anchors = build_links.compute_metadata_anchor_nodes(
+        graph, segments.objid, routes, unmarked_segments={12},
+    )
+    assert anchors == {2, 3}
+
+
+def test_build_links_without_numba(monkeypatch):
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 3, 1.0), (12, 2, 4, 1.0), (13, 3, 5, 1.0),
+    ])
+    links, link_segments, errors = build_links.build_links(segments, graph, {1, 3})
+
+    monkeypatch.setattr(build_links, "_walk_links_jit", None)
+    py_links, py_link_segments, py_errors = build_links.build_links(segments, graph, {1, 3})
+    assert (py_links, py_errors) == (links, errors)
+    for column, py_column in zip(link_segments, py_link_segments):
+        assert py_column.tolist() == column.tolist()
+
+
+def test_build_links_parallel_matches_single_walk():
+    # Three components: a chain, a branching star and a loop through anchor 20
+    segments, graph = make_graph([
+        (10, 1, 2, 1.0), (11, 2, 3, 1.0),
+        (12, 5, 6, 1.0), (13, 6, 7, 1.0), (14, 6, 8, 1.0), (15, 8, 9, 1.0),
+        (16, 20, 21, 1.0), (17, 21, 22, 1.0), (18, 22, 20, 1.0),
+    ])
+    anchors = {1, 3, 5, 9, 20}
+    links, link_segments, errors = build_links.build_links(segments, graph, anchors, workers=1)
+
+    for workers in (2, 3):
+        par_links, par_link_segments, par_errors = build_links.build_links(
+            segments, graph, anchors, workers=workers
+        )
+        assert (par_links, par_errors) == (links, errors)
+        for column, par_column in zip(link_segments, par_link_segments):
+            assert par_column.tolist() == column.tolist()
+
+
+def test_component_labels():
+    _, graph = make_graph([(10, 1, 2, 1.0), (11, 3, 4, 1.0), (12, 4, 5, 1.0)])
+    labels = build_links._component_labels(graph.indptr, graph.nbr_node, graph.node_ids.size)
+    assert labels.tolist() == [0, 0, 1, 1, 1]
@@ -0,0 +1,270 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from scripts import db_status
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.names = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        self.pending = list(self.rows)
+
+    def fetchone(self):
+        return self.pending.pop(0) if self.pending else None
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.cur = FakeCursor(rows)
+        self.closed = False
+
+    def cursor(self, name=None, **kwargs):
+        self.cur.names.append(name)
+        return self.cur
+
+    def close(self):
+        self.closed = True
+
+
+def status_rows(postgis_version, tables, spatial_table_count=0, database_size='8 MB',
+                in_recovery=False):
+    """Rows as the status query returns them: one per table, scalars repeated."""
+    scalars = (postgis_version, spatial_table_count, database_size, len(tables), in_recovery)
+    return [scalars + tuple(table) for table in tables] or [scalars + (None,) * 7]
+
+
+def test_check_database_health_uses_one_query(monkeypatch):
+    tables = [
+        db_status.TableRow('public', 'a', '8192 bytes', 10, 'public.a', '10', True),
+        db_status.TableRow('public', 'b', '16 kB', 0, 'public.b', '0', False),
+    ]
+    conn = FakeConn(status_rows('3.4.2', tables, spatial_table_count=1, database_size='12 MB'))
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    is_healthy, status = db_status.check_database_health({}, min_tables=2)
+
+    assert is_healthy
+    assert len(conn.cur.executed) == 1
+    assert conn.closed
+    assert status['postgis_enabled'] and status['postgis_version'] == '3.4.2'
+    assert status['table_count'] == 2
+    assert status['spatial_table_count'] == 1
+    assert status['database_size'] == '12 MB'
+    assert status['tables'] == tables
+    assert conn.cur.names == ['status_tables']
+
+
+def test_check_database_health_without_postgis(monkeypatch):
+    conn = FakeConn(status_rows(None, []))
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    is_healthy, status = db_status.check_database_health({}, min_tables=1)
+
+    assert not is_healthy
+    assert status['tables'] == []
+    assert status['errors'] == ['PostGIS extension not enabled', 'Too few tables: 0 < 1']
+
+
+def test_persistent_health_check_prepares_once(monkeypatch):
+    conn = FakeConn(status_rows(
+        '3.4.2', [db_status.TableRow('public', 'a', '8 kB', 1, 'public.a', '1', False)],
+    ))
+    conn.rollback = lambda: None
+    returned = []
+
+    class FakePool:
+        def __init__(self, minconn, maxconn, **kwargs):
+            pass
+
+        def getconn(self):
+            return conn
+
+        def putconn(self, c, close=False):
+            returned.append(c)
+
+        def closeall(self):
+            pass
+
+    monkeypatch.setattr(db_status, "ThreadedConnectionPool", FakePool)
+    db_status.close_pool()
+    db_params = {'host': None, 'port': None, 'user': 'u', 'password': '', 'database': 'x'}
+
+    for _ in range(3):
+        is_healthy, _ = db_status.check_database_health(db_params, persistent=True)
+        assert is_healthy
+
+    assert not conn.closed
+    assert returned == [conn] * 3
+    executed = [sql.split()[0] for sql in conn.cur.executed]
+    assert executed == ['SELECT', 'PREPARE', 'EXECUTE', 'SELECT', 'EXECUTE', 'SELECT', 'EXECUTE']
+    db_status.close_pool()
+
+
+def test_streamed_tables_release_connection_when_consumed(monkeypatch, capsys):
+    tables = [db_status.TableRow('public', 'a', '8 kB', 1200, 'public.a', '1,200', False)]
+    conn = FakeConn(status_rows('3.4.2', tables))
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    is_healthy, status = db_status.check_database_health({}, stream_tables=True)
+    assert is_healthy and status['table_count'] == 1
+    assert not conn.closed
+
+    db_status.format_status(status, 'x')
+    assert conn.closed
+    assert "  • public.a: ~1,200 rows, 8 kB" in capsys.readouterr().out
+
+
+def test_status_bundle_sql_without_sizes():
+    name, sql = db_status.status_bundle_sql(include_sizes=False)
+    assert name == 'status_bundle_nosize'
+    assert 'pg_total_relation_size' not in sql
+    assert db_status.TABLE_SIZE_EXPR in db_status.status_bundle_sql()[1]
+
+
+def test_status_bundle_sql_fast():
+    name, sql = db_status.status_bundle_sql(fast=True)
+    assert name == 'status_bundle_fast'
+    assert 'pg_relation_size(c.oid)' in sql and 'pg_total_relation_size' not in sql
+
+
+def test_check_database_health_counts_only(monkeypatch):
+    conn = FakeConn([('3.4.2', 1, '12 MB', 3, False) + (None,) * 7])
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    is_healthy, status = db_status.check_database_health({}, min_tables=3, need_tables=False)
+
+    assert is_healthy
+    assert status['table_count'] == 3 and status['spatial_table_count'] == 1
+    assert status['tables'] == []
+    assert 'pg_total_relation_size' not in conn.cur.executed[0]
+    assert conn.closed
+    assert db_status.status_bundle_sql(need_tables=False)[0] == 'status_counts'
+
+
+def test_standby_status_is_cached_until_promotion(monkeypatch):
+    tables = [db_status.TableRow('public', 'a', '8 kB', 1, 'public.a', '1', True)]
+    conn = FakeConn(status_rows('3.4.2', tables, in_recovery=True))
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+    monkeypatch.setattr(db_status, "_standby_bundles", {})
+
+    _, status = db_status.check_database_health({'database': 'x'})
+    assert status['tables'] == tables
+
+    # Still in recovery: only the probe runs
+    conn.cur.rows = [(True,)]
+    _, cached = db_status.check_database_health({'database': 'x'})
+    assert conn.cur.executed[-1] == "SELECT pg_is_in_recovery()"
+    assert cached['tables'] == tables and cached['table_count'] == 1
+
+    # Promoted: the full status query runs again
+    conn.cur.rows = [(False,)]
+    db_status.check_database_health({'database': 'x'})
+    assert conn.cur.executed[-2:][0] == "SELECT pg_is_in_recovery()"
+    assert "pg_class" in conn.cur.executed[-1]
+    assert db_status._standby_bundles == {}
+
+
+def test_status_query_timeout_is_reported(monkeypatch):
+    class TimeoutCursor(FakeCursor):
+        def execute(self, sql, params=None):
+            raise db_status.dbapi.errors.QueryCanceled("canceling statement due to statement timeout")
+
+    conn = FakeConn([])
+    conn.cur = TimeoutCursor([])
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    is_healthy, status = db_status.check_database_health({})
+
+    assert not is_healthy
+    assert status['errors'][0] == 'Status query timed out; pg_catalog may need VACUUM ANALYZE'
+    assert conn.closed
+
+
+def test_status_connections_set_timeout_and_name():
+    db_params = {'host': None, 'port': None, 'user': 'u', 'password': '', 'database': 'x'}
+    kwargs = db_status.get_connect_kwargs(db_params, db_status.STATUS_SESSION_OPTIONS)
+    assert 'statement_timeout=' in kwargs['options']
+    assert 'application_name=db_status' in kwargs['options']
+    assert 'options' not in db_status.get_connect_kwargs(db_params)
+
+
+def test_closing_streamed_tables_early_releases_connection(monkeypatch):
+    tables = [db_status.TableRow('public', name, '8 kB', 1, f'public.{name}', '1', False) for name in 'abc']
+    conn = FakeConn(status_rows('3.4.2', tables))
+    monkeypatch.setattr(db_status, "connect_db", lambda db_params, options=None: conn)
+
+    _, status = db_status.check_database_health({}, stream_tables=True)
+    assert status['table_count'] == 3
+    assert next(status['tables']) == tables[0]
+
+    status['tables'].close()
+    assert conn.closed
+
+
+def test_connection_params_are_cached_and_read_only(monkeypatch):
+    monkeypatch.setenv('PGDATABASE', 'stiflyt')
+    db_status.get_db_connection_params.cache_clear()
+    try:
+        params = db_status.get_db_connection_params()
+        assert db_status.get_db_connection_params() is params
+        with pytest.raises(TypeError):
+            params['database'] = 'other'
+        assert {**params, 'database': 'other'}['database'] == 'other'
+        assert params['database'] == 'stiflyt'
+    finally:
+        db_status.get_db_connection_params.cache_clear()
+
+
+def test_format_status_lines():
+    status = {
+        'connected': True,
+        'postgis_enabled': True,
+        'postgis_version': '3.4.2',
+        'table_count': 1,
+        'spatial_table_count': 1,
+        'database_size': '12 MB',
+        'tables': [db_status.TableRow('public', 'a', None, 5, 'public.a', '5', True)],
+        'errors': [],
+    }
+    assert list(db_status.format_status_lines(status, 'stiflyt')) == [
+        "Database: stiflyt",
+        "Status: ✓ Connected",
+        "PostGIS: ✓ Enabled (version 3.4.2)",
+        "Tables: 1",
+        "Spatial tables: 1",
+        "Database size: 12 MB",
+        "\nTables:",
+        "  • public.a: ~5 rows",
+    ]
+
+
+def test_write_status_json_streams_tables():
+    rows = [db_status.TableRow('public', 'a', None, 5, 'public.a', '5', True),
+            db_status.TableRow('public', 'b', '8 kB', 0, 'public.b', '0', False)]
+    for tables in (rows, []):
+        out = io.StringIO()
+        status = {'connected': True, 'tables': (row._asdict() for row in tables),
+                  'errors': ['x'], 'healthy': True}
+        db_status.write_status_json(status, out)
+        assert json.loads(out.getvalue()) == {
+            'connected': True, 'tables': [row._asdict() for row in tables],
+            'errors': ['x'], 'healthy': True,
+        }
@@ -0,0 +1,399 @@
+import io
+
+import pytest
+import requests
+
+from scripts import download_kartverket
+
+
+FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Turrutebasen</title>
+  <entry>
+    <title>Turrutebasen Landsdekkende</title>
+    <category term="EPSG:25833" label="EPSG/0/25833"/>
+    <link rel="alternate" href="https://example.org/Basisdata_0000_Norge_25833_Turrutebasen_PostGIS.zip"/>
+    <updated>2024-01-02T03:04:05Z</updated>
+  </entry>
+  <entry>
+    <title>Turrutebasen Oslo</title>
+    <category term="EPSG:25833" label="EPSG/0/25833"/>
+    <category term="0301" label="Kommune Oslo"/>
+    <link rel="alternate" href="https://example.org/Basisdata_0301_Oslo_25833_Turrutebasen_PostGIS.zip"/>
+    <updated>2024-01-01T00:00:00Z</updated>
+  </entry>
+  <entry>
+    <title>Turrutebasen Landsdekkende</title>
+    <category term="EPSG:25832" label="EPSG/0/25832"/>
+    <link rel="alternate" href="https://example.org/Basisdata_0000_Norge_25832_Turrutebasen_PostGIS.zip"/>
+  </entry>
+</feed>
+"""
+
+
+def feed_entries():
+    return download_kartverket.iter_feed_entries(io.BytesIO(FEED))
+
+
+def test_iter_feed_entries_streams_entries():
+    titles = [entry.find('atom:title', download_kartverket.NAMESPACES).text
+              for entry in feed_entries()]
+    assert titles == ['Turrutebasen Landsdekkende', 'Turrutebasen Oslo',
+                      'Turrutebasen Landsdekkende']
+
+
+def test_extract_download_urls_norge():
+    epsg = set()
+    urls = download_kartverket.extract_download_urls(feed_entries(), '25833', 'Norge',
+                                                     available_epsg=epsg)
+    assert urls == [
+        ('https://example.org/Basisdata_0000_Norge_25833_Turrutebasen_PostGIS.zip',
+         '2024-01-02T03:04:05Z', 'Basisdata_0000_Norge_25833_Turrutebasen_PostGIS.zip'),
+    ]
+    assert epsg == {'EPSG:25832', 'EPSG:25833'}
+
+
+def test_extract_download_urls_area_type():
+    urls = download_kartverket.extract_download_urls(feed_entries(), '25833', 'Oslo', 'Kommune')
+    assert [url for url, _, _ in urls] == [
+        'https://example.org/Basisdata_0301_Oslo_25833_Turrutebasen_PostGIS.zip',
+    ]
+    assert download_kartverket.extract_download_urls(feed_entries(), '25833', 'Oslo', 'Fylke') == []
+
+
+def test_process_download_urls_counts_parallel_results(tmp_path, monkeypatch):
+    (tmp_path / "current.zip").write_bytes(b"x")
+    monkeypatch.setattr(download_kartverket, "verify_existing_file",
+                        lambda url, path, updated: (True, 1, True))
+
+    def fake_download(url, output_path, feed_updated=None):
+        if "broken" in url:
+            return False
+        output_path.write_bytes(b"data")
+        return True
+
+    monkeypatch.setattr(download_kartverket, "download_file", fake_download)
+    urls = [(f"https://example.org/{name}.zip", None, f"{name}.zip")
+            for name in ("a", "b", "broken", "current")]
+
+    assert download_kartverket.process_download_urls(urls, tmp_path, "tur", "25833") == (2, 1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.zip", "b.zip", "current.zip"]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = io.BytesIO(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.reason = 'Error'
+            raise requests.HTTPError(response=self)
+
+
+def test_stream_feed_reports_connection_reset(capsys):
+    import urllib3
+
+    class ResetReader(io.BytesIO):
+        def read(self, *args):
+            if self.tell():
+                raise urllib3.exceptions.ProtocolError("Connection reset by peer")
+            return super().read(200)
+
+    response = FakeResponse(200)
+    response.raw = ResetReader(FEED)
+    with pytest.raises(SystemExit) as exc:
+        list(download_kartverket._stream_feed(response, "https://example.org/feed.xml"))
+    assert exc.value.code == 1
+    assert "Kunne ikke hente ATOM feed" in capsys.readouterr().err
+
+
+def test_catalog_is_cached_and_revalidated(tmp_path, monkeypatch):
+    sent = []
+    responses = [FakeResponse(200, FEED, {'ETag': '"v1"'}), FakeResponse(304)]
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            sent.append(headers)
+            return responses.pop(0)
+
+    monkeypatch.setattr(download_kartverket, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+    download_kartverket._discover_cache_clear()
+
+    first = download_kartverket.discover_feeds_from_catalog('turrutebasen')
+    # Memoized within the process: no request at all
+    assert download_kartverket.discover_feeds_from_catalog('Turrutebasen') is first
+    assert len(sent) == 1
+
+    download_kartverket._discover_cache_clear()
+    second = download_kartverket.discover_feeds_from_catalog('turrutebasen')
+    download_kartverket._discover_cache_clear()
+
+    assert first == second == {
+        'Turrutebasen Landsdekkende': (
+            'https://example.org/Basisdata_0000_Norge_25833_Turrutebasen_PostGIS.zip', 'PostGIS'),
+        'Turrutebasen Oslo': (
+            'https://example.org/Basisdata_0301_Oslo_25833_Turrutebasen_PostGIS.zip', 'PostGIS'),
+    }
+    assert sent == [{}, {'If-None-Match': '"v1"'}]
+    assert (tmp_path / 'tjenestefeed.xml').read_bytes() == FEED
+
+
+def test_download_file_copies_body(tmp_path, monkeypatch):
+    body = b"PK" + b"x" * 5000
+
+    class FakeSession:
+        def get(self, url, **kwargs):
+            return FakeResponse(200, body, {'Content-Length': str(len(body))})
+
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+    monkeypatch.setattr(download_kartverket, "COPY_CHUNK_SIZE", 1024)
+    output_path = tmp_path / "tile.zip"
+
+    assert download_kartverket.download_file("https://example.org/tile.zip", output_path)
+    assert output_path.read_bytes() == body
+
+
+def test_progress_reader_counts_bytes(monkeypatch, capsys):
+    monkeypatch.setattr(download_kartverket, "tqdm", None)
+    monkeypatch.setattr(download_kartverket, "PROGRESS_INTERVAL", 4)
+    reader = download_kartverket._ProgressReader(io.BytesIO(b"abcdefghij"), 10)
+    assert reader.read(5) == b"abcde"
+    assert reader.read(-1) == b"fghij"
+    assert reader.downloaded == 10
+    assert "100.0%" in capsys.readouterr().out
+
+
+def test_progress_reader_updates_tqdm_bar():
+    pytest.importorskip("tqdm")
+    reader = download_kartverket._ProgressReader(io.BytesIO(b"abcdefghij"), 14, 4, "x.zip")
+    assert reader.read(-1) == b"abcdefghij"
+    assert reader.bar.n == 14 and reader.downloaded == 14
+    reader.close()
+
+
+def test_download_file_resumes_partial_file(tmp_path, monkeypatch):
+    import zipfile
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("data.sql", "x" * 1000)
+    body = buffer.getvalue()
+    output_path = tmp_path / "tile.zip"
+    (tmp_path / "tile.zip.part").write_bytes(body[:100])
+    sent = []
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            sent.append(headers.get('Range'))
+            rest = body[100:]
+            return FakeResponse(206, rest, {'Content-Length': str(len(rest))})
+
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+
+    assert download_kartverket.download_file("https://example.org/tile.zip", output_path,
+                                             feed_updated='2024-01-02T03:04:05Z')
+    assert sent == ['bytes=100-']
+    assert output_path.read_bytes() == body
+    assert not (tmp_path / "tile.zip.part").exists()
+
+    # The sidecar lets a later run verify the file without a HEAD request
+    monkeypatch.setattr(download_kartverket, "_SESSION", None)
+    assert download_kartverket.verify_existing_file(
+        "https://example.org/tile.zip", output_path, '2024-01-02T03:04:05Z'
+    ) == (True, len(body), True)
+
+    monkeypatch.setattr(download_kartverket, "FORCE_VERIFY", True)
+    assert download_kartverket.verify_existing_file(
+        "https://example.org/tile.zip", output_path, '2024-01-02T03:04:05Z'
+    ) == (False, None, False)  # HEAD attempted (and failed without a session)
+
+
+def test_download_file_keeps_partial_file_on_http_error(tmp_path, monkeypatch):
+    output_path = tmp_path / "tile.zip"
+    part_path = tmp_path / "tile.zip.part"
+    part_path.write_bytes(b"PK" + b"x" * 98)
+    sent = []
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            sent.append(headers.get('Range'))
+            return FakeResponse(statuses.pop(0))
+
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+
+    statuses = [503, 503]
+    assert not download_kartverket.download_file("https://example.org/tile.zip", output_path, max_retries=2)
+    assert sent == ['bytes=100-', 'bytes=100-']
+    assert part_path.stat().st_size == 100
+
+    # 416: the server will not resume this file, so start over
+    statuses = [416]
+    assert not download_kartverket.download_file("https://example.org/tile.zip", output_path, max_retries=1)
+    assert not part_path.exists()
+
+
+def zip_bytes(content):
+    import zipfile
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("data.sql", content)
+    return buffer.getvalue()
+
+
+def test_download_file_resumes_with_if_range(tmp_path, monkeypatch):
+    old, new = zip_bytes("x" * 1000), zip_bytes("y" * 1000)
+    output_path = tmp_path / "tile.zip"
+    sent = []
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            sent.append((headers.get('Range'), headers.get('If-Range')))
+            return responses.pop(0)
+
+    class Interrupted(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() >= 100:
+                raise requests.ConnectionError("reset")
+            return super().read(100)
+
+    interrupted = FakeResponse(200, headers={'ETag': '"v1"', 'Content-Length': str(len(old))})
+    interrupted.raw = Interrupted(old)
+    # The file changed between runs: the server answers If-Range with 200
+    responses = [interrupted, FakeResponse(200, new, {'ETag': '"v2"', 'Content-Length': str(len(new))})]
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+
+    assert not download_kartverket.download_file("https://example.org/tile.zip", output_path, max_retries=1)
+    assert (tmp_path / "tile.zip.part").stat().st_size == 100
+    assert download_kartverket.download_file("https://example.org/tile.zip", output_path, max_retries=1)
+    assert sent == [(None, None), ('bytes=100-', '"v1"')]
+    assert output_path.read_bytes() == new
+    assert not (tmp_path / "tile.zip.part.meta.json").exists()
+
+
+def test_download_file_rejects_spliced_resume_without_validator(tmp_path, monkeypatch):
+    old, new = zip_bytes("x" * 1000), zip_bytes("y" * 1000)
+    output_path = tmp_path / "tile.zip"
+    part_path = tmp_path / "tile.zip.part"
+    part_path.write_bytes(old[:100])
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            assert 'If-Range' not in headers
+            return FakeResponse(206, new[100:], {'Content-Length': str(len(new) - 100)})
+
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+
+    # The central directory comes from the new tail; only the CRCs differ
+    assert not download_kartverket.download_file("https://example.org/tile.zip", output_path, max_retries=1)
+    assert not part_path.exists() and not output_path.exists()
+
+
+def test_check_zip_integrity(tmp_path):
+    import zipfile
+
+    zip_path = tmp_path / "tile.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("data.sql", "x" * 1000)
+        # A trailing comment pushes the EOCD record off the last 22 bytes
+        zf.comment = b"c" * 200
+    assert download_kartverket.check_zip_integrity(zip_path)
+    assert download_kartverket.check_zip_integrity(zip_path, deep=True)
+
+    truncated = tmp_path / "truncated.zip"
+    truncated.write_bytes(zip_path.read_bytes()[:-300])
+    assert not download_kartverket.check_zip_integrity(truncated)
+
+
+def test_match_titles_uses_normalized_index(tmp_path, monkeypatch):
+    catalog = b"""<feed xmlns="http://www.w3.org/2005/Atom">
+      <entry><title>Matrikkelen - Eiendomskart Teig</title>
+        <link rel="alternate" href="https://example.org/Teig_PostGIS.fmw"/></entry>
+      <entry><title>Turrutebasen</title>
+        <link rel="alternate" href="https://example.org/Tur_PostGIS.fmw"/></entry>
+      <entry><title>Matrikkelen - Adresse</title>
+        <link rel="alternate" href="https://example.org/Adresse_GML.fmw"/></entry>
+    </feed>"""
+    (tmp_path / "tjenestefeed.xml").write_bytes(catalog)
+    monkeypatch.setattr(download_kartverket, "_get_catalog_xml", lambda: tmp_path / "tjenestefeed.xml")
+    download_kartverket._discover_cache_clear()
+    try:
+        index = download_kartverket._catalog_index(('PostGIS', 'GML'))
+        match = download_kartverket._match_titles
+        assert match(index, "matrikkelen  eiendomskart-teig") == ["Matrikkelen - Eiendomskart Teig"]
+        assert match(index, "Matrikkelen") == ["Matrikkelen - Eiendomskart Teig", "Matrikkelen - Adresse"]
+        assert match(index, "tu") == ["Turrutebasen"]
+        assert match(index, "stedsnavn") == []
+        assert dict(download_kartverket.discover_feeds_from_catalog("adresse", ['PostGIS', 'GML'])) == {
+            "Matrikkelen - Adresse": ("https://example.org/Adresse_GML.fmw", "GML"),
+        }
+    finally:
+        download_kartverket._discover_cache_clear()
+
+
+def test_extract_download_urls_keeps_first_duplicate():
+    duplicate = FEED.replace(b"</feed>", b"""
+  <entry>
+    <title>Turrutebasen Landsdekkende (kopi)</title>
+    <category term="EPSG:25833"/>
+    <link rel="alternate" href="https://example.org/Basisdata_0000_Norge_25833_Turrutebasen_PostGIS.zip"/>
+    <updated>2025-01-01T00:00:00Z</updated>
+  </entry>
+</feed>""")
+    entries = download_kartverket.iter_feed_entries(io.BytesIO(duplicate))
+    urls = download_kartverket.extract_download_urls(entries, '25833')
+    assert [timestamp for _, timestamp, _ in urls] == ['2024-01-02T03:04:05Z', '2024-01-01T00:00:00Z']
+    assert [url for url, _, _ in urls] == sorted(url for url, _, _ in urls)
+
+
+def test_url_filename():
+    url_filename = download_kartverket.url_filename
+    assert url_filename("https://example.org/a/tile.zip?token=x/y") == "tile.zip"
+    assert url_filename("https://example.org/a/tile.zip#part") == "tile.zip"
+    assert url_filename("https://example.org/dir/") == ""
+    assert url_filename("https://example.org") == ""
+
+
+def test_format_size_unit_boundaries():
+    assert download_kartverket.format_size(0) == "0.0 B"
+    assert download_kartverket.format_size(1023) == "1023.0 B"
+    assert download_kartverket.format_size(1024) == "1.0 KB"
+    assert download_kartverket.format_size(1536 * 1024) == "1.5 MB"
+    assert download_kartverket.format_size(2 ** 50) == "1024.0 TB"
+
+
+def test_download_file_stops_when_cancelled(tmp_path, monkeypatch):
+    class FakeSession:
+        def get(self, url, **kwargs):
+            return FakeResponse(200, b"PK" + b"x" * 100)
+
+    monkeypatch.setattr(download_kartverket, "_SESSION", FakeSession())
+    monkeypatch.setattr(download_kartverket, "_CANCEL", download_kartverket.threading.Event())
+    download_kartverket._CANCEL.set()
+    output_path = tmp_path / "tile.zip"
+
+    assert not download_kartverket.download_file("https://example.org/tile.zip", output_path)
+    assert not output_path.exists()
+
+
+def test_host_slots_are_shared_per_host():
+    slot = download_kartverket._host_slot("https://nedlasting.geonorge.no/a.zip")
+    assert download_kartverket._host_slot("https://nedlasting.geonorge.no/b/c.zip") is slot
+    assert download_kartverket._host_slot("https://example.org/a.zip") is not slot
+
+
+def test_get_atom_feed_url_formats():
+    assert download_kartverket.get_atom_feed_url('Stedsnavn')[1] == 'FGDB'
+    assert download_kartverket.get_atom_feed_url()[1] == 'PostGIS'
+    assert download_kartverket.get_atom_feed_url(
+        feed_url='https://example.org/Dataset_AtomFeedGML.fmw') == (
+        'https://example.org/Dataset_AtomFeedGML.fmw', 'GML')
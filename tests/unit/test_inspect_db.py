@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from scripts import inspect_db
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.rows = self.results.pop(0)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+class FakeConn:
+    def __init__(self, *results):
+        """One list of rows per query, in execution order."""
+        self.cur = FakeCursor(results)
+
+    def cursor(self, **kwargs):
+        return self.cur
+
+
+def test_show_table_schema_uses_one_query():
+    column = {'column_name': 'objid', 'data_type': 'integer', 'character_maximum_length': None,
+              'is_nullable': 'NO', 'column_default': None}
+    geometry = {'column_name': 'geom', 'coord_dimension': 2, 'srid': 25833,
+                'geometry_type': 'LINESTRING'}
+    index = {'indexname': 'fotrute_pkey', 'indexdef': 'CREATE UNIQUE INDEX ...'}
+    conn = FakeConn([
+        {'kind': 'column', 'seq': 1, 'info': column},
+        {'kind': 'geometry', 'seq': 0, 'info': geometry},
+        {'kind': 'index', 'seq': 1, 'info': index},
+    ])
+
+    schema_info = inspect_db.show_table_schema(conn, 'turrutebasen.fotrute')
+
+    assert len(conn.cur.executed) == 1
+    assert conn.cur.executed[0][1] == {'schema': 'turrutebasen', 'table': 'fotrute'}
+    assert schema_info == {'columns': [column], 'geometry_columns': [geometry], 'indexes': [index]}
+
+
+def sample_results(count):
+    return (
+        [{'exists': True}],
+        [{'column_name': 'objid', 'data_type': 'integer'}],
+        [{'objid': 1}],
+        [{'count': count}],
+    )
+
+
+def test_show_sample_data_estimates_row_count():
+    conn = FakeConn(*sample_results(120000))
+
+    sample = inspect_db.show_sample_data(conn, 'teig', num_rows=1)
+
+    assert sample['total_count'] == 120000 and sample['count_is_estimate']
+    sql, params = conn.cur.executed[-1]
+    assert 'reltuples' in sql and 'COUNT' not in sql
+    assert params == ('public.teig',)
+
+
+def test_show_sample_data_exact_count():
+    conn = FakeConn(*sample_results(119873))
+
+    sample = inspect_db.show_sample_data(conn, 'public.teig', num_rows=1, exact_count=True)
+
+    assert sample['total_count'] == 119873 and not sample['count_is_estimate']
+    assert conn.cur.executed[-1][0] == "SELECT COUNT(*) as count FROM public.teig"
+
+
+def test_list_tables_joins_pg_class_once():
+    conn = FakeConn([], [])
+
+    inspect_db.list_tables(conn)
+    inspect_db.list_tables(conn, include_access=True)
+
+    for sql, _ in conn.cur.executed:
+        assert 'pg_total_relation_size(c.oid)' in sql
+        assert sql.count('pg_class') == 1
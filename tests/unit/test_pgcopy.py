@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts import pgcopy
+
+
+def copy_stream(rows, trailer=True):
+    """Binary COPY bytes for rows of ints/floats; None is written as NULL."""
+    data = pgcopy.PGCOPY_SIGNATURE + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+    for row in rows:
+        data += len(row).to_bytes(2, "big")
+        for value in row:
+            if value is None:
+                data += (-1).to_bytes(4, "big", signed=True)
+            elif isinstance(value, float):
+                data += (8).to_bytes(4, "big") + np.array(value, dtype=">f8").tobytes()
+            else:
+                data += (8).to_bytes(4, "big") + value.to_bytes(8, "big", signed=True)
+    if trailer:
+        data += (-1).to_bytes(2, "big", signed=True)
+    return data
+
+
+def test_parse_binary_copy_mixed_columns():
+    data = copy_stream([(10, 1, 2, 1.5), (11, 2, 3, 0.25)])
+
+    objids, sources, targets, lengths = pgcopy.parse_binary_copy(
+        data, ['>i8', '>i8', '>i8', '>f8']
+    )
+    assert objids.dtype == np.int64 and lengths.dtype == np.float64
+    assert objids.tolist() == [10, 11]
+    assert targets.tolist() == [2, 3]
+    assert lengths.tolist() == [1.5, 0.25]
+
+
+def test_parse_binary_copy_empty():
+    columns = pgcopy.parse_binary_copy(copy_stream([]), ['>i8', '>i8', '>i8'])
+    assert [column.tolist() for column in columns] == [[], [], []]
+
+
+def test_parse_binary_copy_rejects_text():
+    with pytest.raises(ValueError):
+        pgcopy.parse_binary_copy(b"10\t1\t2\n", ['>i8', '>i8', '>i8'])
+
+
+@pytest.mark.parametrize("rows, trailer", [
+    # A NULL is 8 bytes shorter and shifts every later tuple
+    ([(10, None, 2), (11, 2, 3), (12, 3, 4), (13, 4, 5)], True),
+    ([(10, 1, 2), (None, 1, 2, 3)], True),
+    ([(10, 1, 2), (11, 2)], True),
+    ([(10, 1, 2)], False),
+])
+def test_parse_binary_copy_rejects_shifted_layout(rows, trailer):
+    with pytest.raises(ValueError):
+        pgcopy.parse_binary_copy(copy_stream(rows, trailer), ['>i8', '>i8', '>i8'])
+
+
+def test_parse_binary_copy_checks_field_lengths():
+    data = copy_stream([(10, 1, 2)])
+    # Same tuple size and trailer, but the second field length is not 8
+    length_at = len(pgcopy.PGCOPY_SIGNATURE) + 8 + 2 + 12
+    data = data[:length_at] + (4).to_bytes(4, "big") + data[length_at + 4:]
+    with pytest.raises(ValueError, match="column 1"):
+        pgcopy.parse_binary_copy(data, ['>i8', '>i8', '>i8'])